@@ -0,0 +1,354 @@
+"""
+Benchmark de rendimiento con gate de regresión.
+
+Corre cada caso (market × pasajeros) N veces contra un objetivo determinista —por defecto el
+sitio simulado de tools/mock_sky levantado en este proceso con latencia fija— y calcula p50/p95
+por etapa del pipeline, por helpers clave (_seleccionar_fechas, _rellenar_todos_los_pasajeros y
+cada entrada de PAYMENT_DISPATCH) y del total, a partir de las líneas de tiempo de core/timing.py.
+El resultado se compara contra un baseline JSON guardado y el comando sale con código 1 si alguna
+métrica empeora más allá del umbral.
+
+Ejemplos:
+  python bench.py --guardar-baseline                 # genera bench_baseline.json
+  python bench.py                                    # compara contra bench_baseline.json
+  python bench.py --markets PE CL --repeticiones 3 --umbral 0.3
+  python bench.py --sin-mock --markets PE -- --ambiente qa
+"""
+
+import argparse
+import json
+import math
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from cli import MARKETS_VALIDOS
+from matrix import EVIDENCIAS_ROOT, PROJECT_ROOT, _ejecutar_caso, _parsear_pax, _resolver_caso
+
+BASELINE_PATH = PROJECT_ROOT / "bench_baseline.json"
+REPETICIONES = 5
+UMBRAL_RELATIVO = 0.20
+UMBRAL_MINIMO_MS = 500
+PAX_BENCH = ({"adultos": 1, "ninos": 0, "infantes": 0}, {"adultos": 9, "ninos": 0, "infantes": 0})
+TIMEOUT_CORRIDA_SEGUNDOS = 600
+
+# Helpers medidos con @medir() (nombre de span = función sin '_' inicial) que el bench sigue aparte
+HELPERS_BENCH = ("seleccionar_fechas", "rellenar_todos_los_pasajeros")
+PREFIJO_HELPERS_PAGO = "pagar_"  # una función por entrada de PAYMENT_DISPATCH
+
+# Latencia fija y semilla para que dos corridas del bench sean comparables
+LATENCIA_MOCK = {"latencia_ms": 50, "latencia_api_ms": 300, "latencia_pasarela_ms": 500, "jitter_ms": 0, "semilla": 1}
+RUTA_MOCK_POR_MARKET = {"PE": "/es/peru", "CL": "/es/chile", "AR": "/es/argentina", "BR": "/pt/brasil"}
+
+
+def _percentil(valores, percentil):
+    """Percentil con interpolación lineal (como numpy 'linear'); None si no hay valores."""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    posicion = (len(ordenados) - 1) * percentil / 100
+    inferior = math.floor(posicion)
+    superior = math.ceil(posicion)
+    if inferior == superior:
+        return ordenados[inferior]
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicion - inferior)
+
+
+def metricas_desde_timeline(timeline):
+    """ms por métrica de una corrida: 'total', 'etapa:<nombre>' y 'helper:<nombre>' (sumados si se repiten)."""
+    spans = [span for span in timeline.get("spans", []) if span.get("total_ms") is not None]
+    raiz = next((span for span in spans if span["padre"] is None), None)
+    metricas = {}
+    if raiz is not None:
+        metricas["total"] = raiz["total_ms"]
+    for span in spans:
+        if raiz is not None and span["padre"] == raiz["id"]:
+            clave = f"etapa:{span['nombre']}"
+        elif span["nombre"] in HELPERS_BENCH or span["nombre"].startswith(PREFIJO_HELPERS_PAGO):
+            clave = f"helper:{span['nombre']}"
+        else:
+            continue
+        metricas[clave] = metricas.get(clave, 0.0) + span["total_ms"]
+    return metricas
+
+
+def _clave_caso(cfg):
+    pax = cfg["pasajeros"]
+    return f"{cfg['market']}_{cfg['tipo_viaje']}_{pax['adultos']}-{pax['ninos']}-{pax['infantes']}"
+
+
+def _resumir_caso(muestras):
+    """{metrica: {n, p50_ms, p95_ms}} a partir de la lista de dicts de metricas_desde_timeline."""
+    resumen = {}
+    for metrica in sorted({clave for muestra in muestras for clave in muestra}):
+        valores = [muestra[metrica] for muestra in muestras if metrica in muestra]
+        resumen[metrica] = {
+            "n": len(valores),
+            "p50_ms": round(_percentil(valores, 50), 1),
+            "p95_ms": round(_percentil(valores, 95), 1),
+        }
+    return resumen
+
+
+def comparar_con_baseline(casos, baseline, umbral=UMBRAL_RELATIVO, umbral_minimo_ms=UMBRAL_MINIMO_MS, percentil="p50"):
+    """
+    Lista de regresiones: métricas cuyo percentil supera el del baseline en más de `umbral`
+    (relativo) y en más de `umbral_minimo_ms` (absoluto, para no saltar con spans de pocos ms).
+    Métricas o casos ausentes en el baseline no cuentan como regresión.
+    """
+    campo = f"{percentil}_ms"
+    regresiones = []
+    for clave_caso, metricas in casos.items():
+        base_caso = baseline.get("casos", {}).get(clave_caso, {}).get("metricas", {})
+        for metrica, valores in metricas.items():
+            base = base_caso.get(metrica, {}).get(campo)
+            actual = valores.get(campo)
+            if base is None or actual is None:
+                continue
+            delta = actual - base
+            if delta > umbral_minimo_ms and delta > base * umbral:
+                regresiones.append({
+                    "caso": clave_caso,
+                    "metrica": metrica,
+                    "baseline_ms": base,
+                    "actual_ms": actual,
+                    "delta_ms": round(delta, 1),
+                    "delta_pct": round(delta / base * 100, 1) if base else None,
+                })
+    return regresiones
+
+
+def _imprimir_tabla(casos, baseline, percentil):
+    campo = f"{percentil}_ms"
+    encabezado = f"{'Caso / métrica':<52} {'p50':>9} {'p95':>9} {'Base':>9} {'Δ':>8}"
+    print(encabezado)
+    print("-" * len(encabezado))
+    for clave_caso, metricas in casos.items():
+        print(clave_caso)
+        base_caso = baseline.get("casos", {}).get(clave_caso, {}).get("metricas", {}) if baseline else {}
+        for metrica, valores in metricas.items():
+            base = base_caso.get(metrica, {}).get(campo)
+            delta = f"{(valores[campo] - base) / base * 100:+7.0f}%" if base else f"{'-':>8}"
+            base_txt = f"{base / 1000:>8.1f}s" if base is not None else f"{'-':>9}"
+            print(
+                f"  {metrica[:50]:<50} {valores['p50_ms'] / 1000:>8.1f}s {valores['p95_ms'] / 1000:>8.1f}s "
+                f"{base_txt} {delta}"
+            )
+
+
+def _cargar_baseline(path):
+    try:
+        with open(path, "r", encoding="utf-8") as archivo:
+            return json.load(archivo)
+    except FileNotFoundError:
+        return None
+
+
+def ejecutar_bench(
+    markets,
+    pax=PAX_BENCH,
+    repeticiones=REPETICIONES,
+    args_extra=(),
+    usar_mock=True,
+    timeout_segundos=TIMEOUT_CORRIDA_SEGUNDOS,
+):
+    """
+    Corre cada caso `repeticiones` veces en serie (sin competir por CPU) y retorna el resultado
+    (dict) con métricas por caso. Cada corrida es un test_sky.py aislado, igual que matrix.py.
+    """
+    prefijo = datetime.now().strftime("%Y%m%d_%H%M%S")
+    directorio_salida = EVIDENCIAS_ROOT / f"bench_{prefijo}"
+    directorio_salida.mkdir(parents=True, exist_ok=True)
+
+    servidor = None
+    url_base = None
+    if usar_mock:
+        from tools.mock_sky import LatenciaMock, iniciar_en_hilo
+
+        servidor, url_base = iniciar_en_hilo(latencia=LatenciaMock(**LATENCIA_MOCK))
+        print(f"🧪 Sitio simulado en {url_base}")
+
+    casos = {}
+    fallidas = []
+    inicio = time.monotonic()
+    try:
+        for market in markets:
+            for pasajeros in pax:
+                caso = {"market": market, "tipo_viaje": "ONE_WAY", **pasajeros}
+                if url_base:
+                    caso["url"] = url_base + RUTA_MOCK_POR_MARKET[market]
+                argv, cfg = _resolver_caso(caso, args_extra)
+                clave = _clave_caso(cfg)
+                muestras = []
+                for numero in range(1, repeticiones + 1):
+                    id_corrida = f"bench_{prefijo}_{clave}_r{numero:02d}"
+                    resultado = _ejecutar_caso(id_corrida, argv, cfg, directorio_salida, timeout_segundos)
+                    timeline = _leer_timeline(resultado.get("timeline"))
+                    if resultado["estado"] != "ok" or timeline is None:
+                        fallidas.append(
+                            {"caso": clave, "corrida": numero, "error": resultado.get("error"), "log": resultado["log"]}
+                        )
+                        print(f"❌ {clave} r{numero:02d}: {resultado.get('error') or resultado['estado']}")
+                        continue
+                    muestras.append(metricas_desde_timeline(timeline))
+                    print(f"✅ {clave} r{numero:02d}: {resultado['duracion_segundos']:.1f}s")
+                casos[clave] = {"corridas_ok": len(muestras), "metricas": _resumir_caso(muestras)}
+    finally:
+        if servidor is not None:
+            servidor.shutdown()
+            servidor.server_close()
+
+    return {
+        "id_bench": prefijo,
+        "objetivo": "mock" if usar_mock else "sitio",
+        "latencia_mock": LATENCIA_MOCK if usar_mock else None,
+        "repeticiones": repeticiones,
+        "duracion_pared_segundos": round(time.monotonic() - inicio, 2),
+        "fallidas": fallidas,
+        "casos": casos,
+        "directorio": str(directorio_salida),
+    }
+
+
+def _leer_timeline(path):
+    if not path:
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as archivo:
+            return json.load(archivo)
+    except Exception:
+        return None
+
+
+def parse_args_bench(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    args_extra = []
+    if "--" in argv:
+        corte = argv.index("--")
+        argv, args_extra = argv[:corte], argv[corte + 1:]
+
+    parser = argparse.ArgumentParser(
+        description="⏱️ Benchmark por etapa con gate de regresión contra un baseline",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="Todo lo que vaya después de '--' se pasa tal cual a cada test_sky.py.",
+    )
+    parser.add_argument(
+        "--markets",
+        nargs="+",
+        choices=MARKETS_VALIDOS,
+        default=list(MARKETS_VALIDOS),
+        help="Markets a medir (default: todos)",
+    )
+    parser.add_argument(
+        "--pax",
+        nargs="+",
+        type=_parsear_pax,
+        metavar="A,N,I",
+        help="Mezclas de pasajeros (default: 1,0,0 y 9,0,0)",
+    )
+    parser.add_argument(
+        "--repeticiones",
+        type=int,
+        default=REPETICIONES,
+        metavar="N",
+        help=f"Corridas por caso (default: {REPETICIONES})",
+    )
+    parser.add_argument("--baseline", default=str(BASELINE_PATH), metavar="JSON", help="Baseline a comparar/guardar")
+    parser.add_argument(
+        "--guardar-baseline",
+        action="store_true",
+        help="Guarda el resultado como nuevo baseline en vez de comparar",
+    )
+    parser.add_argument(
+        "--umbral",
+        type=float,
+        default=UMBRAL_RELATIVO,
+        metavar="FRACCION",
+        help=f"Regresión relativa tolerada por métrica (default: {UMBRAL_RELATIVO} = {UMBRAL_RELATIVO:.0%}%)",
+    )
+    parser.add_argument(
+        "--umbral-minimo-ms",
+        type=int,
+        default=UMBRAL_MINIMO_MS,
+        metavar="MS",
+        help=f"Diferencia absoluta mínima para considerar regresión (default: {UMBRAL_MINIMO_MS})",
+    )
+    parser.add_argument("--percentil", choices=["p50", "p95"], default="p50", help="Percentil a comparar")
+    parser.add_argument(
+        "--sin-mock",
+        action="store_true",
+        help="Corre contra el sitio real (ambiente de CFG) en vez de tools/mock_sky",
+    )
+    parser.add_argument(
+        "--timeout-corrida",
+        type=int,
+        default=TIMEOUT_CORRIDA_SEGUNDOS,
+        metavar="SEG",
+        help=f"Tiempo máximo por corrida (default: {TIMEOUT_CORRIDA_SEGUNDOS}s)",
+    )
+    args = parser.parse_args(argv)
+    if args.repeticiones < 1:
+        parser.error("--repeticiones debe ser >= 1.")
+    return args, args_extra
+
+
+def main(argv=None):
+    args, args_extra = parse_args_bench(argv)
+    try:
+        resultado = ejecutar_bench(
+            args.markets,
+            pax=args.pax or PAX_BENCH,
+            repeticiones=args.repeticiones,
+            args_extra=args_extra,
+            usar_mock=not args.sin_mock,
+            timeout_segundos=args.timeout_corrida,
+        )
+    except ValueError as error:
+        print(f"❌ {error}")
+        return 2
+
+    baseline = None if args.guardar_baseline else _cargar_baseline(args.baseline)
+    regresiones = comparar_con_baseline(
+        resultado["casos"], baseline or {}, args.umbral, args.umbral_minimo_ms, args.percentil
+    )
+    resultado["baseline"] = None if args.guardar_baseline else args.baseline
+    resultado["regresiones"] = regresiones
+    resultado_path = Path(resultado["directorio"]) / "resultado.json"
+    with open(resultado_path, "w", encoding="utf-8") as archivo:
+        json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+
+    print()
+    _imprimir_tabla(resultado["casos"], baseline, args.percentil)
+    print(f"\n🧾 Resultado bench -> {resultado_path}")
+
+    if resultado["fallidas"]:
+        print(f"❌ {len(resultado['fallidas'])} corridas fallidas; ver logs en {resultado['directorio']}")
+        return 1
+    if args.guardar_baseline:
+        claves_baseline = ("id_bench", "objetivo", "latencia_mock", "repeticiones", "casos")
+        with open(args.baseline, "w", encoding="utf-8") as archivo:
+            json.dump({clave: resultado[clave] for clave in claves_baseline}, archivo, ensure_ascii=False, indent=2)
+        print(f"📌 Baseline guardado -> {args.baseline}")
+        return 0
+    if baseline is None:
+        print(f"⚠️ No existe baseline en '{args.baseline}'; generar uno con --guardar-baseline.")
+        return 0
+    if regresiones:
+        print(
+            f"\n❌ {len(regresiones)} regresiones "
+            f"(> {args.umbral:.0%} y > {args.umbral_minimo_ms} ms en {args.percentil}):"
+        )
+        for regresion in regresiones:
+            print(
+                f"   {regresion['caso']} {regresion['metrica']}: "
+                f"{regresion['baseline_ms'] / 1000:.1f}s -> {regresion['actual_ms'] / 1000:.1f}s "
+                f"({regresion['delta_pct']:+.0f}%)"
+            )
+        return 1
+    print("✅ Sin regresiones respecto del baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
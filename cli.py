@@ -17,6 +17,8 @@ MARKETS_VALIDOS = list(_MEDIO_PAGO.keys())
 TIPOS_VIAJE_VALIDOS = ["ONE_WAY", "ROUND_TRIP"]
 AMBIENTES_VALIDOS = list(AMBIENTES_DISPONIBLES.keys())
 SELECCION_ASIENTO_VALIDA = ["SKIP", "AUTO"]
+PERFILES_BLOQUEO_RED = ["off", "light", "aggressive"]
+FORMATOS_EVIDENCIA = ["png", "jpeg", "webp"]
 
 
 def _int_positivo(value):
@@ -33,6 +35,21 @@ def _int_no_negativo(value):
     return entero
 
 
+def _pillow_disponible():
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _calidad_imagen(value):
+    entero = int(value)
+    if not 1 <= entero <= 100:
+        raise argparse.ArgumentTypeError("Debe estar entre 1 y 100")
+    return entero
+
+
 def _fecha_hace_anios(anios):
     hoy = date.today()
     try:
@@ -117,8 +134,11 @@ def _generar_pasajeros(base, adultos, ninos, infantes):
     return pasajeros
 
 
-def parse_args():
-    """Parsea argumentos de línea de comandos para sobreescribir la configuración."""
+def parse_args(argv=None):
+    """Parsea argumentos de línea de comandos para sobreescribir la configuración.
+
+    Con argv=None usa sys.argv; matrix.py pasa listas explícitas para validar cada caso.
+    """
     parser = argparse.ArgumentParser(
         description="🤖 Sky TestBot — Automatización de compra de vuelos Sky Airline (QA/TSTS/Stage)",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -170,6 +190,11 @@ Ejemplos:
         metavar="N",
         help="Espera final antes del screenshot/cierre (segundos)",
     )
+    grupo_rutas.add_argument(
+        "--esperas-fijas",
+        action="store_true",
+        help="Desactiva las esperas adaptativas y duerme siempre el tope fijo (diagnóstico de flakiness)",
+    )
     grupo_rutas.add_argument(
         "--usar-chrome-existente",
         action="store_true",
@@ -201,6 +226,25 @@ Ejemplos:
         type=str,
         help="Directorio temporal de control para pausa/reanudación desde la GUI",
     )
+    grupo_rutas.add_argument(
+        "--sin-bus-control",
+        dest="bus_control",
+        action="store_false",
+        default=None,
+        help="No abre el socket de control; la GUI solo se comunica por los archivos de --control-dir",
+    )
+    grupo_rutas.add_argument(
+        "--id-ejecucion",
+        type=str,
+        metavar="ID",
+        help="Identificador de la ejecución (carpeta de exploración). Por defecto: timestamp",
+    )
+    grupo_rutas.add_argument(
+        "--resumen-json",
+        type=str,
+        metavar="PATH",
+        help="Escribe un resumen JSON de la ejecución (estado, etapa final, duración) al terminar",
+    )
     grupo_limpieza = grupo_rutas.add_mutually_exclusive_group()
     grupo_limpieza.add_argument(
         "--limpiar-evidencias-antiguas",
@@ -221,11 +265,108 @@ Ejemplos:
         metavar="N",
         help="Cantidad de semanas a conservar en screenshots_pruebas",
     )
+    grupo_rutas.add_argument(
+        "--repeticiones",
+        type=_int_positivo,
+        metavar="N",
+        help="Corre el flujo N veces seguidas reutilizando el mismo Chromium (contexto nuevo por corrida)",
+    )
+    grupo_rutas.add_argument(
+        "--reciclar-navegador-cada",
+        type=_int_positivo,
+        metavar="N",
+        help="Relanza Chromium tras N contextos del pool (o antes si el navegador se cae)",
+    )
+    grupo_rutas.add_argument(
+        "--trace-chrome",
+        action="store_true",
+        help="Escribe screenshots_pruebas/trace_<id>.json (chrome://tracing / Perfetto) con etapas y red",
+    )
+    grupo_rutas.add_argument(
+        "--bloqueo-red",
+        choices=PERFILES_BLOQUEO_RED,
+        help="Bloquea requests innecesarios: light (analítica, chat, media) o aggressive (+ imágenes y fuentes)",
+    )
+    grupo_rutas.add_argument(
+        "--perfil-persistente",
+        action="store_true",
+        help="Perfil Chromium persistente por market/ambiente: reutiliza caché HTTP y service workers entre corridas",
+    )
+    grupo_rutas.add_argument(
+        "--resume-from",
+        type=str,
+        metavar="SNAPSHOT",
+        help="Reanuda desde un snapshot de checkpoint (path o nombre, ej: DATOS_PASAJERO) sin rehacer búsqueda",
+    )
+    grupo_snapshots = grupo_rutas.add_mutually_exclusive_group()
+    grupo_snapshots.add_argument(
+        "--guardar-snapshots",
+        dest="guardar_snapshots",
+        action="store_true",
+        default=None,
+        help="Guarda storage_state + URL al pasar por cada checkpoint (para --resume-from)",
+    )
+    grupo_snapshots.add_argument(
+        "--no-guardar-snapshots",
+        dest="guardar_snapshots",
+        action="store_false",
+        help="No guarda storage_state + URL al pasar por cada checkpoint",
+    )
+    grupo_rutas.add_argument(
+        "--sin-selectores-aprendidos",
+        dest="selectores_aprendidos",
+        action="store_false",
+        default=None,
+        help="Prueba los selectores de respaldo en el orden original, sin la caché del ganador previo",
+    )
+    grupo_rutas.add_argument(
+        "--formato-evidencia",
+        choices=FORMATOS_EVIDENCIA,
+        help="Formato de screenshots de evidencia (default: png; webp requiere Pillow)",
+    )
+    grupo_rutas.add_argument(
+        "--calidad-evidencia", type=_calidad_imagen, metavar="1-100", help="Calidad JPEG/WebP (default: 80)"
+    )
+    grupo_rutas.add_argument(
+        "--dimension-max-evidencia",
+        type=_int_no_negativo,
+        metavar="PX",
+        help="Reduce screenshots a este lado mayor en px (0 = tamaño original)",
+    )
+    grupo_rutas.add_argument(
+        "--evidencia-viewport",
+        action="store_true",
+        help="Screenshots solo del viewport en todas las etapas (default: exploración y final en página completa)",
+    )
+    grupo_har = grupo_rutas.add_mutually_exclusive_group()
+    grupo_har.add_argument(
+        "--har-record",
+        action="store_true",
+        help="Graba en un HAR el tráfico de búsqueda/tarifas (uno por market/ruta/fecha/pax)",
+    )
+    grupo_har.add_argument(
+        "--har-replay",
+        action="store_true",
+        help="Sirve búsqueda/tarifas desde el HAR grabado; lo no grabado sigue a la red",
+    )
+    grupo_rutas.add_argument("--har-archivo", type=str, metavar="PATH", help="HAR a grabar/reproducir (override)")
+    grupo_rutas.add_argument("--har-url", type=str, metavar="GLOB", help="Patrón de URLs del HAR (default: **/api/**)")
 
     # --- 2. Datos del Vuelo ---
     grupo_vuelo = parser.add_argument_group("Datos del Vuelo")
     grupo_vuelo.add_argument("--origen", type=str, help="Ciudad de origen")
     grupo_vuelo.add_argument("--destino", type=str, help="Ciudad de destino")
+    grupo_vuelo.add_argument(
+        "--busqueda-directa",
+        action="store_true",
+        help="Va directo a la URL de resultados (IATA, fechas, pax) sin el formulario del home; si falla usa la UI",
+    )
+    grupo_vuelo.add_argument(
+        "--url-busqueda",
+        type=str,
+        metavar="PLANTILLA",
+        help="Plantilla de la URL de resultados ({base} {origen} {destino} {ida} {vuelta} {adultos} ...)",
+    )
     grupo_vuelo.add_argument("--dias", type=int, metavar="N", help="Días a futuro para seleccionar fecha")
     grupo_vuelo.add_argument(
         "--tipo-viaje",
@@ -305,7 +446,12 @@ Ejemplos:
         help="Punto de pausa para inspección manual",
     )
 
-    return parser.parse_args()
+    args = parser.parse_args(argv)
+    if (args.formato_evidencia == "webp" or args.dimension_max_evidencia) and not _pillow_disponible():
+        parser.error(
+            "--formato-evidencia webp y --dimension-max-evidencia requieren Pillow (pip install -r requirements.txt)"
+        )
+    return args
 
 
 def aplicar_args(args):
@@ -323,16 +469,41 @@ def aplicar_args(args):
         pausa           int   ms de pausa de seguridad entre pasos
         slow_mo         int   ms de slow_mo de Playwright
         espera_final_segundos int
+        esperas_adaptativas bool  False con --esperas-fijas
         limpiar_evidencias_antiguas bool
         retencion_evidencias_semanas int
+        repeticiones    int   corridas consecutivas con el pool de navegador
+        reciclar_navegador_cada int
+        trace_chrome    bool  exportar trace_<id>.json en Chrome Trace Event Format
+        bloqueo_red     str   "off"|"light"|"aggressive" (pasarela del market siempre permitida)
+        perfil_persistente bool  launch_persistent_context (caché HTTP conservada, cookies/storage limpios)
+        perfil_persistente_dir str  carpeta raíz de los perfiles (<dir>/<market>_<ambiente>)
+        snapshots_checkpoint bool  guardar storage_state + URL en cada checkpoint
+        snapshots_dir   str   carpeta de snapshots (<dir>/<market>_<ambiente>/<CHECKPOINT>.json)
+        snapshots_ttl_horas int  antigüedad máxima de un snapshot; los vencidos se borran
+        resume_from     str|None  path del snapshot desde el que se reanuda
+        selectores_aprendidos bool  probar primero el selector que ganó antes por helper/market/ambiente
+        evidencia_formato str  "png"|"jpeg"|"webp"
+        evidencia_calidad int  calidad JPEG/WebP
+        evidencia_dimension_max int  lado mayor máximo de los screenshots (0 = sin reducir)
+        evidencia_pagina_completa dict  {exploracion, error, final} -> página completa (True) o viewport
+        har_modo        str|None  "record"|"replay"
+        har_archivo     str|None  HAR de búsqueda/tarifas (default en HAR_DIR por market/ruta/fecha/pax)
+        har_url         str   glob de URLs grabadas/servidas desde el HAR
         usar_chrome_existente bool
         cdp_url         str
         cdp_reutilizar_primera_pestana bool
         headless        bool
         modo_exploracion bool
         solo_exploracion bool
+        control_dir     str|None
+        bus_control     bool  socket local de control (pausa/continuar/etapa/progreso) además de control_dir
+        id_ejecucion    str|None
+        resumen_json    str|None
         origen          str
         destino         str
+        busqueda_directa bool  deep link a resultados con fallback al formulario del home
+        url_busqueda_directa str  plantilla de la URL de resultados
         dias            int
         tipo_viaje      str   "ONE_WAY"|"ROUND_TRIP"
         dias_retorno    int
@@ -347,10 +518,30 @@ def aplicar_args(args):
         TIEMPO_PAUSA_SEGURIDAD,
         VELOCIDAD_VISUAL,
         ESPERA_FINAL_SEGUNDOS,
+        ESPERAS_ADAPTATIVAS,
         LIMPIAR_EVIDENCIAS_ANTIGUAS,
         SEMANAS_RETENCION_EVIDENCIAS,
+        REPETICIONES,
+        RECICLAR_NAVEGADOR_CADA,
+        TRACE_CHROME,
+        BLOQUEO_RED,
+        HAR_DIR,
+        HAR_URL_PATRON,
+        PERFIL_PERSISTENTE,
+        PERFIL_PERSISTENTE_DIR,
+        SNAPSHOTS_CHECKPOINT,
+        SNAPSHOTS_DIR,
+        SNAPSHOTS_TTL_HORAS,
+        SELECTORES_APRENDIDOS,
+        BUS_CONTROL,
+        EVIDENCIAS_FORMATO,
+        EVIDENCIAS_CALIDAD,
+        EVIDENCIAS_DIMENSION_MAX,
+        EVIDENCIAS_PAGINA_COMPLETA,
         VUELO_ORIGEN,
         VUELO_DESTINO,
+        BUSQUEDA_DIRECTA,
+        URL_BUSQUEDA_DIRECTA,
         MIN_DIAS_A_FUTURO,
         DIAS_A_FUTURO,
         TIPO_VIAJE,
@@ -391,6 +582,14 @@ def aplicar_args(args):
     if infantes > adultos:
         raise ValueError("La cantidad de infantes no puede ser mayor a la cantidad de adultos.")
 
+    perfil_persistente = PERFIL_PERSISTENTE or args.perfil_persistente
+    if perfil_persistente and args.usar_chrome_existente:
+        raise ValueError("--perfil-persistente no aplica con --usar-chrome-existente (CDP usa el perfil de Chrome).")
+
+    har_modo = "record" if args.har_record else "replay" if args.har_replay else None
+    if har_modo and args.usar_chrome_existente:
+        raise ValueError("--har-record/--har-replay no están soportados con --usar-chrome-existente (CDP).")
+
     dias_retorno = args.dias_retorno if args.dias_retorno is not None else DIAS_RETORNO_DESDE_IDA
     seleccion_asiento = _normalizar_seleccion_asiento(args.seleccion_asiento or SELECCION_ASIENTO)
     maletas_cabina = args.maletas_cabina if args.maletas_cabina is not None else MALETAS_CABINA
@@ -419,6 +618,7 @@ def aplicar_args(args):
         "espera_final_segundos": (
             args.espera_final_segundos if args.espera_final_segundos is not None else ESPERA_FINAL_SEGUNDOS
         ),
+        "esperas_adaptativas": ESPERAS_ADAPTATIVAS and not args.esperas_fijas,
         "limpiar_evidencias_antiguas": (
             args.limpiar_evidencias_antiguas
             if args.limpiar_evidencias_antiguas is not None
@@ -429,15 +629,47 @@ def aplicar_args(args):
             if args.retencion_evidencias_semanas is not None
             else SEMANAS_RETENCION_EVIDENCIAS
         ),
+        "repeticiones": args.repeticiones if args.repeticiones is not None else REPETICIONES,
+        "reciclar_navegador_cada": (
+            args.reciclar_navegador_cada if args.reciclar_navegador_cada is not None else RECICLAR_NAVEGADOR_CADA
+        ),
+        "trace_chrome": TRACE_CHROME or args.trace_chrome,
+        "bloqueo_red": args.bloqueo_red or BLOQUEO_RED,
+        "perfil_persistente": perfil_persistente,
+        "perfil_persistente_dir": PERFIL_PERSISTENTE_DIR,
+        "snapshots_checkpoint": SNAPSHOTS_CHECKPOINT if args.guardar_snapshots is None else args.guardar_snapshots,
+        "snapshots_dir": SNAPSHOTS_DIR,
+        "snapshots_ttl_horas": SNAPSHOTS_TTL_HORAS,
+        "resume_from": None,
+        "selectores_aprendidos": (
+            SELECTORES_APRENDIDOS if args.selectores_aprendidos is None else args.selectores_aprendidos
+        ),
+        "evidencia_formato": args.formato_evidencia or EVIDENCIAS_FORMATO,
+        "evidencia_calidad": args.calidad_evidencia if args.calidad_evidencia is not None else EVIDENCIAS_CALIDAD,
+        "evidencia_dimension_max": (
+            args.dimension_max_evidencia if args.dimension_max_evidencia is not None else EVIDENCIAS_DIMENSION_MAX
+        ),
+        "evidencia_pagina_completa": (
+            {tipo: False for tipo in EVIDENCIAS_PAGINA_COMPLETA}
+            if args.evidencia_viewport
+            else dict(EVIDENCIAS_PAGINA_COMPLETA)
+        ),
+        "har_modo": har_modo,
+        "har_url": args.har_url or HAR_URL_PATRON,
         "usar_chrome_existente": args.usar_chrome_existente,
         "cdp_url": args.cdp_url or CDP_URL_DEFAULT,
         "cdp_reutilizar_primera_pestana": args.cdp_reutilizar_primera_pestana,
         "control_dir": args.control_dir,
+        "bus_control": BUS_CONTROL if args.bus_control is None else args.bus_control,
+        "id_ejecucion": args.id_ejecucion,
+        "resumen_json": args.resumen_json,
         "headless": args.headless,
         "modo_exploracion": args.modo_exploracion or args.solo_exploracion,
         "solo_exploracion": args.solo_exploracion,
         "origen": args.origen or VUELO_ORIGEN,
         "destino": args.destino or VUELO_DESTINO,
+        "busqueda_directa": BUSQUEDA_DIRECTA or args.busqueda_directa,
+        "url_busqueda_directa": args.url_busqueda or URL_BUSQUEDA_DIRECTA,
         "dias": dias,
         "tipo_viaje": tipo_viaje,
         "dias_retorno": dias_retorno,
@@ -461,5 +693,16 @@ def aplicar_args(args):
             **{k: v for k, v in tarjeta_market.items() if k not in ("numero", "fecha", "cvv")},
         },
     }
+    if args.resume_from:
+        from core.snapshots import resolver_snapshot
+
+        cfg["resume_from"] = resolver_snapshot(
+            args.resume_from, market, ambiente, SNAPSHOTS_DIR, CHECKPOINTS_VALIDOS, ttl_horas=SNAPSHOTS_TTL_HORAS
+        )
+    cfg["har_archivo"] = None
+    if har_modo:
+        from core.har import ruta_har_por_defecto
+
+        cfg["har_archivo"] = args.har_archivo or ruta_har_por_defecto(cfg, HAR_DIR)
 
     return cfg
@@ -2,12 +2,53 @@ from config.rutas import (
     TIEMPO_PAUSA_SEGURIDAD,
     VELOCIDAD_VISUAL,
     ESPERA_FINAL_SEGUNDOS,
+    ESPERAS_ADAPTATIVAS,
+    XHR_BUSQUEDA_PATRON,
+    XHR_TARIFA_PATRON,
     LIMPIAR_EVIDENCIAS_ANTIGUAS,
     SEMANAS_RETENCION_EVIDENCIAS,
+    REPETICIONES,
+    RECICLAR_NAVEGADOR_CADA,
+    TRACE_CHROME,
+    BLOQUEO_RED,
+    HAR_DIR,
+    HAR_URL_PATRON,
+    PERFIL_PERSISTENTE,
+    PERFIL_PERSISTENTE_DIR,
+    SNAPSHOTS_CHECKPOINT,
+    SNAPSHOTS_DIR,
+    SNAPSHOTS_TTL_HORAS,
+    CACHE_CIUDADES,
+    SELECTORES_APRENDIDOS,
+    CACHE_SELECTORES,
+    CACHE_SELECTORES_TTL_DIAS,
+    INDICE_EXPLORACION,
+    EVIDENCIAS_EN_SEGUNDO_PLANO,
+    EVIDENCIAS_HILOS,
+    EVIDENCIAS_COLA_MAX,
+    EVIDENCIAS_FORMATO,
+    EVIDENCIAS_CALIDAD,
+    EVIDENCIAS_DIMENSION_MAX,
+    EVIDENCIAS_PAGINA_COMPLETA,
+    EVIDENCIAS_HTML_GZIP,
+    HASH_VISUAL,
+    HASH_VISUAL_INDICE,
+    HASH_VISUAL_UMBRAL_DUPLICADO,
+    HASH_VISUAL_UMBRAL_DERIVA,
+    EVIDENCIAS_BASE_DIR,
+    EVIDENCIAS_DEDUPLICADAS,
+    BARRIDO_EVIDENCIAS_HORAS,
+    BUS_CONTROL,
+    BUS_CONTROL_SONDEO_ARCHIVOS_S,
+    ORQUESTADOR_MAX_CONCURRENTES,
+    ORQUESTADOR_PUERTOS_CDP,
 )
 from config.vuelo import (
     VUELO_ORIGEN,
     VUELO_DESTINO,
+    BUSQUEDA_DIRECTA,
+    URL_BUSQUEDA_DIRECTA,
+    CODIGOS_IATA,
     MIN_DIAS_A_FUTURO,
     DIAS_A_FUTURO,
     TIPO_VIAJE,
@@ -25,6 +66,7 @@ from config.pago import (
     AMBIENTE,
     AMBIENTES_DISPONIBLES,
     MEDIO_PAGO_POR_MARKET,
+    DOMINIOS_PASARELA_POR_MARKET,
     TARJETA_POR_MARKET,
     get_urls_por_market,
 )
@@ -34,10 +76,51 @@ __all__ = [
     "TIEMPO_PAUSA_SEGURIDAD",
     "VELOCIDAD_VISUAL",
     "ESPERA_FINAL_SEGUNDOS",
+    "ESPERAS_ADAPTATIVAS",
+    "XHR_BUSQUEDA_PATRON",
+    "XHR_TARIFA_PATRON",
     "LIMPIAR_EVIDENCIAS_ANTIGUAS",
     "SEMANAS_RETENCION_EVIDENCIAS",
+    "REPETICIONES",
+    "RECICLAR_NAVEGADOR_CADA",
+    "TRACE_CHROME",
+    "BLOQUEO_RED",
+    "HAR_DIR",
+    "HAR_URL_PATRON",
+    "PERFIL_PERSISTENTE",
+    "PERFIL_PERSISTENTE_DIR",
+    "SNAPSHOTS_CHECKPOINT",
+    "SNAPSHOTS_DIR",
+    "SNAPSHOTS_TTL_HORAS",
+    "CACHE_CIUDADES",
+    "SELECTORES_APRENDIDOS",
+    "CACHE_SELECTORES",
+    "CACHE_SELECTORES_TTL_DIAS",
+    "INDICE_EXPLORACION",
+    "EVIDENCIAS_EN_SEGUNDO_PLANO",
+    "EVIDENCIAS_HILOS",
+    "EVIDENCIAS_COLA_MAX",
+    "EVIDENCIAS_FORMATO",
+    "EVIDENCIAS_CALIDAD",
+    "EVIDENCIAS_DIMENSION_MAX",
+    "EVIDENCIAS_PAGINA_COMPLETA",
+    "EVIDENCIAS_HTML_GZIP",
+    "HASH_VISUAL",
+    "HASH_VISUAL_INDICE",
+    "HASH_VISUAL_UMBRAL_DUPLICADO",
+    "HASH_VISUAL_UMBRAL_DERIVA",
+    "EVIDENCIAS_BASE_DIR",
+    "EVIDENCIAS_DEDUPLICADAS",
+    "BARRIDO_EVIDENCIAS_HORAS",
+    "BUS_CONTROL",
+    "BUS_CONTROL_SONDEO_ARCHIVOS_S",
+    "ORQUESTADOR_MAX_CONCURRENTES",
+    "ORQUESTADOR_PUERTOS_CDP",
     "VUELO_ORIGEN",
     "VUELO_DESTINO",
+    "BUSQUEDA_DIRECTA",
+    "URL_BUSQUEDA_DIRECTA",
+    "CODIGOS_IATA",
     "MIN_DIAS_A_FUTURO",
     "DIAS_A_FUTURO",
     "TIPO_VIAJE",
@@ -53,6 +136,7 @@ __all__ = [
     "AMBIENTE",
     "AMBIENTES_DISPONIBLES",
     "MEDIO_PAGO_POR_MARKET",
+    "DOMINIOS_PASARELA_POR_MARKET",
     "TARJETA_POR_MARKET",
     "get_urls_por_market",
     "CHECKPOINT",
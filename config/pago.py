@@ -38,6 +38,15 @@ MEDIO_PAGO_POR_MARKET = {
     "BR": "Cielo",
 }
 
+# Dominios de la pasarela de cada market que el bloqueo de red (--bloqueo-red) nunca aborta.
+# Coinciden por sufijo: "transbank.cl" cubre webpay3gint.transbank.cl.
+DOMINIOS_PASARELA_POR_MARKET = {
+    "CL": ("transbank.cl",),
+    "PE": ("niubiz.com.pe", "vnforapps.com", "vnforappstest.com"),
+    "AR": ("mercadopago.com", "mercadopago.com.ar", "mercadolibre.com", "mlstatic.com"),
+    "BR": ("cielo.com.br", "braspag.com.br", "cardinalcommerce.com"),
+}
+
 # Datos de prueba de tarjeta/pago por market
 TARJETA_POR_MARKET = {
     "CL": {
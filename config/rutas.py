@@ -6,5 +6,83 @@
 TIEMPO_PAUSA_SEGURIDAD = 1500  # 1.5 segundos (en milisegundos)
 VELOCIDAD_VISUAL = 500         # Slow_mo para ver qué hace
 ESPERA_FINAL_SEGUNDOS = 600    # Espera final para revisión antes de screenshot/cierre
+ESPERAS_ADAPTATIVAS = True     # Esperas por condición (red inactiva/elemento estable); False = sleeps fijos
+# Fragmento de URL del XHR que esperan el botón Buscar y la elección de tarifa (core/waits.py::esperar_xhr).
+# None = espera previa (red inactiva 1,5 s / 1 s fijo). Tomar la ruta exacta de un HAR grabado con
+# --har-record: python -m core.har <archivo.har> lista las rutas XHR en orden.
+XHR_BUSQUEDA_PATRON = None
+XHR_TARIFA_PATRON = None
 LIMPIAR_EVIDENCIAS_ANTIGUAS = True
 SEMANAS_RETENCION_EVIDENCIAS = 2
+
+# Pool de navegador: un solo Chromium reutilizado entre repeticiones (contexto nuevo por corrida)
+REPETICIONES = 1               # Corridas consecutivas dentro del mismo proceso
+RECICLAR_NAVEGADOR_CADA = 20   # Relanza Chromium tras N contextos (o antes si se cae)
+
+# Trace Chrome (chrome://tracing / Perfetto) con spans de etapas y timing de red por corrida
+TRACE_CHROME = False
+
+# Bloqueo de red: "off" | "light" (analítica, chat, media) | "aggressive" (+ imágenes y fuentes)
+BLOQUEO_RED = "off"
+
+# HAR de búsqueda/tarifas (--har-record / --har-replay): carpeta y patrón de URLs grabadas
+HAR_DIR = ".cache_bot/har"
+HAR_URL_PATRON = "**/api/**"
+
+# Perfil persistente por market/ambiente (launch_persistent_context): conserva caché HTTP y service workers
+PERFIL_PERSISTENTE = False
+PERFIL_PERSISTENTE_DIR = ".cache_bot/perfiles"
+
+# Snapshots de sesión (storage_state + URL) en cada checkpoint, para --resume-from. Guardan cookies de
+# sesión: apagados por defecto (--guardar-snapshots) y se borran al vencer el TTL
+SNAPSHOTS_CHECKPOINT = False
+SNAPSHOTS_DIR = ".cache_bot/snapshots"
+SNAPSHOTS_TTL_HORAS = 24
+
+# Tabla aprendida ciudad -> (IATA, etiqueta del autocompletado) por idioma del sitio
+CACHE_CIUDADES = ".cache_bot/ciudades.json"
+
+# Caché del selector ganador por (helper, market, ambiente): se prueba primero; sin uso en N días se descarta
+SELECTORES_APRENDIDOS = True
+CACHE_SELECTORES = ".cache_bot/selectores.json"
+CACHE_SELECTORES_TTL_DIAS = 14
+
+# Índice incremental de reportes de exploración (python -m tools.diff_exploracion)
+INDICE_EXPLORACION = ".cache_bot/indice_exploracion.json"
+
+# Screenshots/HTML de evidencia: escritura a disco en hilos de fondo con cola acotada (se vacía al salir)
+EVIDENCIAS_EN_SEGUNDO_PLANO = True
+EVIDENCIAS_HILOS = 2
+EVIDENCIAS_COLA_MAX = 16
+
+# Formato de screenshots de evidencia: "png" | "jpeg" | "webp" (webp y reducción exacta requieren Pillow)
+EVIDENCIAS_FORMATO = "png"
+EVIDENCIAS_CALIDAD = 80
+# Lado mayor máximo en px (0 = sin reducir)
+EVIDENCIAS_DIMENSION_MAX = 0
+# Página completa (True) o solo viewport (False) por tipo de screenshot
+EVIDENCIAS_PAGINA_COMPLETA = {"exploracion": True, "error": False, "final": True}
+# Dumps HTML de debug comprimidos como .html.gz
+EVIDENCIAS_HTML_GZIP = True
+
+# Hash perceptual de screenshots de exploración (requiere Pillow): omite casi-duplicados y avisa deriva por etapa
+HASH_VISUAL = True
+HASH_VISUAL_INDICE = ".cache_bot/hash_visual.json"
+# Distancia Hamming sobre 256 bits (dHash 16x16 del viewport) vs la referencia (última corrida OK del market/ambiente)
+HASH_VISUAL_UMBRAL_DUPLICADO = 4
+HASH_VISUAL_UMBRAL_DERIVA = 48
+
+# Almacén direccionado por contenido (blobs por sha256 + hardlinks + índice SQLite en <base>/.almacen)
+EVIDENCIAS_BASE_DIR = "screenshots_pruebas"
+EVIDENCIAS_DEDUPLICADAS = True
+# Barrido de archivos fuera del índice (timelines, resúmenes, evidencia previa al almacén): cada cuántas horas
+BARRIDO_EVIDENCIAS_HORAS = 24
+
+# Control GUI <-> bot por socket local (pausa/continuar/etapa/progreso); <control_dir>/bus.port anuncia el puerto.
+# Los archivos pause.request/continue.request se siguen leyendo sin cliente conectado, cada N segundos
+BUS_CONTROL = True
+BUS_CONTROL_SONDEO_ARCHIVOS_S = 1.0
+
+# Orquestador de la GUI: ejecuciones simultáneas y puertos CDP consecutivos desde el de la CDP URL (9222, 9223, ...)
+ORQUESTADOR_MAX_CONCURRENTES = 2
+ORQUESTADOR_PUERTOS_CDP = 5
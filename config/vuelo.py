@@ -5,6 +5,47 @@
 VUELO_ORIGEN = "Santiago"
 VUELO_DESTINO = "Buenos Aires"
 
+# Búsqueda directa (--busqueda-directa): navega a la URL de resultados armada desde CFG en vez de
+# usar el formulario del home; si la página no muestra vuelos se vuelve al camino por UI.
+# SIN VERIFICAR: del sitio real solo está documentado `departureDate=` en la URL de resultados
+# (docs/REGRESSION_MATRIX.md); ruta y resto de parámetros son una suposición. Confirmar con una
+# búsqueda manual en QA y ajustar aquí o con --url-busqueda antes de confiar en el modo.
+BUSQUEDA_DIRECTA = False
+URL_BUSQUEDA_DIRECTA = (
+    "{base}/booking?origin={origen}&destination={destino}&departureDate={ida}&returnDate={vuelta}"
+    "&ADT={adultos}&CHD={ninos}&INF={infantes}&flightType={tipo_viaje}"
+)
+
+# Ciudad (como se escribe en --origen/--destino) -> código IATA. También se acepta el código directo.
+CODIGOS_IATA = {
+    "Santiago": "SCL",
+    "Buenos Aires": "AEP",
+    "Lima": "LIM",
+    "Cusco": "CUZ",
+    "Arequipa": "AQP",
+    "Trujillo": "TRU",
+    "Piura": "PIU",
+    "Tacna": "TCQ",
+    "Juliaca": "JUL",
+    "Antofagasta": "ANF",
+    "Calama": "CJC",
+    "Iquique": "IQQ",
+    "Arica": "ARI",
+    "La Serena": "LSC",
+    "Copiapó": "CPO",
+    "Concepción": "CCP",
+    "Temuco": "ZCO",
+    "Valdivia": "ZAL",
+    "Puerto Montt": "PMC",
+    "Balmaceda": "BBA",
+    "Punta Arenas": "PUQ",
+    "Montevideo": "MVD",
+    "Mendoza": "MDZ",
+    "Florianópolis": "FLN",
+    "Río de Janeiro": "GIG",
+    "São Paulo": "GRU",
+}
+
 # Antifraude: umbral sugerido para evitar rechazos de pago
 # (si se usa menos de 16 días, CLI advierte pero no modifica el valor).
 MIN_DIAS_A_FUTURO = 16
@@ -0,0 +1,183 @@
+"""
+Almacén de evidencias direccionado por contenido con índice SQLite.
+
+Cada evidencia (screenshot, HTML) se guarda una sola vez como blob en
+screenshots_pruebas/.almacen/blobs/<aa>/<sha256>.<ext>; el path legible de siempre
+(exploracion_<id>/..., error_pago_<ts>.png, ...) es un hardlink al blob, así que un screenshot
+idéntico al de otra corrida (landing, home) no ocupa espacio extra. Si el filesystem no
+permite hardlinks se copia.
+
+El índice (.almacen/indice.sqlite) registra blobs (hash, bytes, creado) y evidencias
+(path, hash, id de corrida, creado). La retención pasa a ser una consulta: se borran los paths
+vencidos y luego los blobs que ya nadie referencia, sin recorrer el árbol de evidencias.
+Un hardlink comparte inode y mtime con su blob: una evidencia nueva que deduplica contra un
+blob viejo "parece" vieja por mtime, así que su vencimiento sale siempre de `creado` del índice.
+"""
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+from datetime import datetime
+
+DIRECTORIO_ALMACEN = ".almacen"
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    ruta TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    creado TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS evidencias (
+    path TEXT PRIMARY KEY,
+    hash TEXT NOT NULL REFERENCES blobs(hash),
+    id_ejecucion TEXT,
+    creado TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS evidencias_creado ON evidencias(creado);
+CREATE INDEX IF NOT EXISTS evidencias_hash ON evidencias(hash);
+CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT);
+"""
+
+_lock = threading.Lock()
+_almacenes = {}
+
+
+class AlmacenEvidencias:
+    """Un almacén por carpeta base; seguro entre hilos (un lock) y entre procesos (SQLite en WAL)."""
+
+    def __init__(self, base_dir):
+        self.directorio = os.path.join(base_dir, DIRECTORIO_ALMACEN)
+        os.makedirs(os.path.join(self.directorio, "blobs"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(
+            os.path.join(self.directorio, "indice.sqlite"),
+            timeout=30,
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.executescript(_ESQUEMA)
+
+    def _ruta_blob(self, digest, extension):
+        return os.path.join(self.directorio, "blobs", digest[:2], f"{digest}{extension}")
+
+    def guardar(self, path, contenido, id_ejecucion=None):
+        """Escribe `contenido` (bytes) como blob si no existe y deja `path` como hardlink. Retorna el hash."""
+        digest = hashlib.sha256(contenido).hexdigest()
+        ruta_blob = self._ruta_blob(digest, os.path.splitext(path)[1].lower())
+        ahora = datetime.now().isoformat(timespec="seconds")
+        if not os.path.exists(ruta_blob):
+            os.makedirs(os.path.dirname(ruta_blob), exist_ok=True)
+            temporal = f"{ruta_blob}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporal, "wb") as archivo:
+                archivo.write(contenido)
+            os.replace(temporal, ruta_blob)
+
+        directorio = os.path.dirname(path)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        if os.path.lexists(path):
+            os.remove(path)
+        try:
+            os.link(ruta_blob, path)
+        except OSError:
+            shutil.copyfile(ruta_blob, path)
+
+        with self._lock:
+            self._conexion.execute("BEGIN IMMEDIATE")
+            try:
+                self._conexion.execute(
+                    "INSERT OR IGNORE INTO blobs (hash, ruta, bytes, creado) VALUES (?, ?, ?, ?)",
+                    (digest, ruta_blob, len(contenido), ahora),
+                )
+                self._conexion.execute(
+                    "INSERT OR REPLACE INTO evidencias (path, hash, id_ejecucion, creado) VALUES (?, ?, ?, ?)",
+                    (os.path.abspath(path), digest, id_ejecucion, ahora),
+                )
+                self._conexion.execute("COMMIT")
+            except Exception:
+                self._conexion.execute("ROLLBACK")
+                raise
+        return digest
+
+    def eliminar_vencidas(self, limite):
+        """
+        Borra las evidencias con `creado` anterior a `limite` (datetime) y los blobs huérfanos.
+        Retorna (evidencias borradas, bytes de blobs liberados).
+        """
+        limite_iso = limite.isoformat(timespec="seconds")
+        with self._lock:
+            self._conexion.execute("BEGIN IMMEDIATE")
+            try:
+                paths = [
+                    fila[0]
+                    for fila in self._conexion.execute("SELECT path FROM evidencias WHERE creado < ?", (limite_iso,))
+                ]
+                self._conexion.execute("DELETE FROM evidencias WHERE creado < ?", (limite_iso,))
+                huerfanos = self._conexion.execute(
+                    "SELECT hash, ruta, bytes FROM blobs WHERE hash NOT IN (SELECT hash FROM evidencias)"
+                ).fetchall()
+                self._conexion.execute("DELETE FROM blobs WHERE hash NOT IN (SELECT hash FROM evidencias)")
+                self._conexion.execute("COMMIT")
+            except Exception:
+                self._conexion.execute("ROLLBACK")
+                raise
+
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            _borrar_directorios_vacios(os.path.dirname(path), os.path.dirname(self.directorio))
+        liberados = 0
+        for _, ruta_blob, cantidad in huerfanos:
+            try:
+                os.remove(ruta_blob)
+                liberados += cantidad
+            except FileNotFoundError:
+                pass
+        return len(paths), liberados
+
+    def indexado(self, path):
+        """True si `path` (archivo o carpeta con evidencias adentro) tiene filas en el índice."""
+        path = os.path.abspath(path)
+        prefijo = path.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + os.sep
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT 1 FROM evidencias WHERE path = ? OR path LIKE ? ESCAPE '\\' LIMIT 1",
+                (path, prefijo + "%"),
+            ).fetchone()
+        return fila is not None
+
+    def leer_meta(self, clave):
+        with self._lock:
+            fila = self._conexion.execute("SELECT valor FROM meta WHERE clave = ?", (clave,)).fetchone()
+        return fila[0] if fila else None
+
+    def escribir_meta(self, clave, valor):
+        with self._lock:
+            self._conexion.execute("INSERT OR REPLACE INTO meta (clave, valor) VALUES (?, ?)", (clave, valor))
+
+
+def _borrar_directorios_vacios(directorio, tope):
+    """Sube desde `directorio` borrando carpetas vacías hasta `tope` (exclusivo)."""
+    tope = os.path.abspath(tope)
+    directorio = os.path.abspath(directorio)
+    while directorio.startswith(tope + os.sep):
+        try:
+            os.rmdir(directorio)
+        except OSError:
+            return
+        directorio = os.path.dirname(directorio)
+
+
+def almacen(base_dir):
+    """AlmacenEvidencias compartido por carpeta base (uno por proceso)."""
+    clave = os.path.abspath(base_dir)
+    with _lock:
+        if clave not in _almacenes:
+            _almacenes[clave] = AlmacenEvidencias(base_dir)
+        return _almacenes[clave]
@@ -0,0 +1,320 @@
+"""
+Ejecución concurrente en proceso: un driver de Playwright y un Chromium reparten muchos flujos.
+
+Las etapas (core/search_flow.py, core/passenger_flow.py, core/payment_flows.py) y
+PAYMENT_DISPATCH siguen escritas contra playwright.sync_api. La API sync ya corre sobre un
+event loop asyncio propio (el "dispatcher" de sync_playwright) y cada llamada bloqueante cede
+el control a ese loop con greenlets hasta que llega la respuesta del driver. El runner usa el
+mismo mecanismo: abre un solo sync_playwright y un solo PoolNavegador (core/browser_session.py)
+y corre hasta `concurrencia` flujos como greenlets sobre ese dispatcher, cada uno con su
+browser.new_context(). Mientras un flujo espera al navegador, el loop atiende a los demás: N
+casos con concurrencia C usan un driver y un Chromium, con C contextos abiertos a la vez.
+
+Requiere los atributos internos `_loop` y `_dispatcher_fiber` del Playwright sync (los mismos que
+usa SyncBase._sync); están probados con la versión fijada en requirements.txt. Portar las etapas
+a playwright.async_api daría lo mismo sin ellos, pero exigiría reescribir todo el flujo.
+
+Cada flujo corre en su greenlet con core.state, core.timing y core.har aislados (ContextVar).
+Nada del flujo debe bloquear el hilo (time.sleep, esperas de threading largas): frenaría a todos.
+
+Timeout por caso: un timer del loop activa la cancelación del caso (state.verificar_cancelacion()
+en cada paso del pipeline y en las esperas) y cierra su contexto, así la llamada pendiente al
+navegador falla y el greenlet queda libre para el próximo caso. Si un greenlet se cae fuera del
+flujo, solo su caso actual queda en error y se abre otro greenlet en su lugar.
+
+Con `directorio_salida` cada caso deja <id>.log y <id>.json como los procesos de matrix.py:
+sys.stdout se reparte por flujo, así la salida de los flujos no se mezcla en consola.
+"""
+
+import asyncio
+import json
+import sys
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from greenlet import greenlet
+from playwright._impl._errors import TargetClosedError
+from playwright.sync_api import sync_playwright
+
+import core.state as state
+from core.browser_session import PoolNavegador, _crear_sesion_navegador
+from core.evidencias import vaciar_evidencias
+from core.hash_visual import confirmar_referencias, descartar_pendientes
+from core.helpers import detectar_etapa_actual
+from core.pipeline import ejecutar_flujo
+from core.timing import escribir_linea_tiempo, finalizar_registro, iniciar_registro
+from core.trace_chrome import escribir_trace_chrome
+
+CONCURRENCIA_DEFAULT = 8
+
+
+def _resultado_base(id_ejecucion, cfg):
+    return {
+        "id_ejecucion": id_ejecucion,
+        "market": cfg["market"],
+        "ambiente": cfg["ambiente"],
+        "tipo_viaje": cfg["tipo_viaje"],
+        "pasajeros": cfg["pasajeros"],
+        "checkpoint": cfg["checkpoint"],
+        "estado": "error",
+        "etapa_final": None,
+        "url_final": None,
+        "error": None,
+        "duracion_segundos": None,
+        "timeline": None,
+    }
+
+
+class _SalidaPorFlujo:
+    """sys.stdout que escribe en el log del flujo actual; el resto va a la salida original."""
+
+    def __init__(self, original):
+        self.original = original
+        self._archivo = ContextVar("log_flujo", default=None)
+
+    def dirigir(self, archivo):
+        self._archivo.set(archivo)
+
+    def _destino(self):
+        return self._archivo.get() or self.original
+
+    def write(self, texto):
+        return self._destino().write(texto)
+
+    def flush(self):
+        self._destino().flush()
+
+    def __getattr__(self, nombre):
+        return getattr(self.original, nombre)
+
+
+class _Trabajo:
+    def __init__(self, id_ejecucion, cfg, directorio_salida):
+        self.id_ejecucion = id_ejecucion
+        self.cfg = cfg
+        self.log_path = directorio_salida / f"{id_ejecucion}.log" if directorio_salida else None
+        self.cancelacion = threading.Event()
+        self.context = None
+        self.vencido = False
+
+
+class _Despachador:
+    """Greenlets de flujo sobre el dispatcher de un sync_playwright; cada uno toma casos de la cola."""
+
+    def __init__(self, playwright, pool, trabajos, concurrencia, entregar, timeout_segundos, salida):
+        self.playwright = playwright
+        self.pool = pool
+        self.trabajos = trabajos
+        self.concurrencia = concurrencia
+        self.entregar = entregar
+        self.timeout_segundos = timeout_segundos
+        self.salida = salida
+        self.loop = playwright._loop
+        self.dispatcher = playwright._dispatcher_fiber
+        self.activos = 0
+        self.fin = None
+
+    def correr(self):
+        """Bloquea hasta que todos los casos terminan, cediendo el hilo al dispatcher como SyncBase._sync."""
+        principal = greenlet.getcurrent()
+        self.fin = self.loop.create_future()
+        self.fin.add_done_callback(lambda _: principal.switch())
+        for _ in range(max(1, min(self.concurrencia, len(self.trabajos)))):
+            self._abrir_trabajador()
+        while not self.fin.done():
+            self.dispatcher.switch()
+        asyncio._set_running_loop(self.loop)
+
+    def _abrir_trabajador(self):
+        self.activos += 1
+        trabajador = greenlet(self._trabajar, parent=self.dispatcher)
+        self.loop.call_soon(trabajador.switch)
+
+    def _trabajar(self):
+        trabajo = None
+        try:
+            while self.trabajos:
+                trabajo = self.trabajos.popleft()
+                resultado = self._correr(trabajo)
+                terminado, trabajo = trabajo, None
+                self.entregar(terminado, resultado)
+        except Exception as error:
+            # Solo se pierde el caso en curso: la cola sigue en manos de un greenlet nuevo
+            print(f"⚠️ Trabajador de flujos caído: {error}")
+            if trabajo is not None:
+                resultado = _resultado_base(trabajo.id_ejecucion, trabajo.cfg)
+                resultado["error"] = f"Trabajador de flujos caído: {error}"
+                self.entregar(trabajo, resultado)
+            if self.trabajos:
+                self._abrir_trabajador()
+        finally:
+            self.activos -= 1
+            if not self.activos and not self.fin.done():
+                self.fin.set_result(None)
+
+    def _correr(self, trabajo):
+        vencimiento = None
+        if self.timeout_segundos:
+            vencimiento = self.loop.call_later(self.timeout_segundos, self._vencer, trabajo)
+        try:
+            if trabajo.log_path is None:
+                resultado = _flujo_en_greenlet(trabajo, self.playwright, self.pool)
+            else:
+                with open(trabajo.log_path, "w", encoding="utf-8", buffering=1) as log:
+                    self.salida.dirigir(log)
+                    try:
+                        resultado = _flujo_en_greenlet(trabajo, self.playwright, self.pool)
+                    finally:
+                        self.salida.dirigir(None)
+        finally:
+            if vencimiento is not None:
+                vencimiento.cancel()
+        if trabajo.vencido:
+            resultado["estado"] = "error"
+            resultado["error"] = f"Timeout de {self.timeout_segundos}s"
+        return resultado
+
+    def _vencer(self, trabajo):
+        """Corre en el dispatcher: cancela el caso y cierra su contexto para cortar la llamada en curso."""
+        trabajo.vencido = True
+        trabajo.cancelacion.set()
+        print(f"⏱️ [{trabajo.id_ejecucion}] Timeout de {self.timeout_segundos}s: se cierra su contexto.")
+        if trabajo.context is not None:
+            # Como los handlers de eventos de Playwright: un greenlet propio para usar la API sync
+            greenlet(_cerrar_contexto, parent=self.dispatcher).switch(trabajo)
+
+
+def _cerrar_contexto(trabajo):
+    try:
+        trabajo.context.close()
+    except Exception as error:
+        print(f"⚠️ [{trabajo.id_ejecucion}] Error cerrando contexto vencido: {error}")
+
+
+def _flujo_en_greenlet(trabajo, playwright, pool):
+    """Corre un flujo completo con estado aislado. Nunca lanza: el error va al resultado."""
+    id_ejecucion = trabajo.id_ejecucion
+    resultado = _resultado_base(id_ejecucion, trabajo.cfg)
+    inicio = time.monotonic()
+    with state.estado_aislado(trabajo.cfg, id_ejecucion, cancelacion=trabajo.cancelacion):
+        iniciar_registro(id_ejecucion, market=trabajo.cfg["market"], ambiente=trabajo.cfg["ambiente"])
+        context = None
+        page = None
+        try:
+            _, context, page, _ = _crear_sesion_navegador(playwright, pool)
+            trabajo.context = context
+            state.verificar_cancelacion()
+            ejecutar_flujo(page)
+            resultado["estado"] = "ok"
+        except TargetClosedError:
+            resultado["error"] = "Navegador cerrado durante el flujo."
+        except Exception as error:
+            print(f"❌ [{id_ejecucion}] Error de ejecución: {error}")
+            resultado["error"] = str(error)
+        finally:
+            if page is not None and not trabajo.vencido:
+                try:
+                    resultado["url_final"] = page.url
+                    resultado["etapa_final"] = detectar_etapa_actual(page)
+                except Exception:
+                    pass
+            if trabajo.cfg.get("perfil_persistente"):
+                # El perfil persistente no pasa por el pool: su contexto es el navegador
+                if context is not None:
+                    try:
+                        context.close()
+                    except Exception as error:
+                        print(f"⚠️ [{id_ejecucion}] Error cerrando navegador: {error}")
+            else:
+                pool.liberar(context, fallo=resultado["estado"] != "ok")
+        # Como test_sky.py: las capturas pendientes aportan la deriva visual al timeline antes de cerrarlo
+        vaciar_evidencias()
+        if resultado["estado"] == "ok" and not trabajo.vencido:
+            confirmar_referencias(state.EXPLORACION_RUN_ID)
+        else:
+            descartar_pendientes(state.EXPLORACION_RUN_ID)
+        registro = finalizar_registro(error=RuntimeError(resultado["error"]) if resultado["error"] else None)
+        if registro is not None:
+            resultado["timeline"] = escribir_linea_tiempo(registro)
+            if trabajo.cfg.get("trace_chrome"):
+                resultado["trace_chrome"] = escribir_trace_chrome(registro)
+    resultado["duracion_segundos"] = round(time.monotonic() - inicio, 2)
+    return resultado
+
+
+def _escribir_resumen_caso(directorio_salida, resultado):
+    resumen_path = directorio_salida / f"{resultado['id_ejecucion']}.json"
+    try:
+        with open(resumen_path, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+    except Exception as error:
+        print(f"⚠️ No se pudo escribir resumen JSON '{resumen_path}': {error}")
+
+
+def ejecutar_flujos(casos, concurrencia=CONCURRENCIA_DEFAULT, al_terminar=None, timeout_segundos=None,
+                    directorio_salida=None):
+    """
+    Ejecuta `casos` (lista de (id_ejecucion, cfg) con cfg resuelto por aplicar_args) con hasta
+    `concurrencia` flujos simultáneos sobre un solo driver y un solo Chromium; bloquea hasta que
+    terminan todos. `al_terminar(resultado)` se invoca a medida que terminan. `timeout_segundos`
+    corre desde que el caso arranca; `directorio_salida` (Path) activa el log y el resumen JSON
+    por caso. Si el driver de Playwright no arranca, la excepción sale de aquí.
+    """
+    for _, cfg in casos:
+        if cfg.get("usar_chrome_existente"):
+            raise ValueError("La ejecución concurrente no soporta --usar-chrome-existente (CDP compartido).")
+    if not casos:
+        return []
+
+    trabajos = deque(_Trabajo(id_ejecucion, cfg, directorio_salida) for id_ejecucion, cfg in casos)
+    orden = {trabajo.id_ejecucion: indice for indice, trabajo in enumerate(trabajos)}
+    resultados = [None] * len(trabajos)
+    salida = _SalidaPorFlujo(sys.stdout) if directorio_salida else None
+
+    def _entregar(trabajo, resultado):
+        if directorio_salida:
+            resultado["log"] = str(trabajo.log_path)
+            _escribir_resumen_caso(directorio_salida, resultado)
+        resultados[orden[trabajo.id_ejecucion]] = resultado
+        if al_terminar:
+            al_terminar(resultado)
+
+    if salida is not None:
+        sys.stdout = salida
+    try:
+        with sync_playwright() as playwright:
+            pool = PoolNavegador(playwright, reciclar_cada=casos[0][1].get("reciclar_navegador_cada", 20))
+            try:
+                _Despachador(
+                    playwright, pool, trabajos, concurrencia, _entregar, timeout_segundos, salida
+                ).correr()
+            finally:
+                pool.cerrar()
+    finally:
+        if salida is not None:
+            sys.stdout = salida.original
+    return resultados
+
+
+async def ejecutar_flujos_async(
+    casos,
+    concurrencia=CONCURRENCIA_DEFAULT,
+    al_terminar=None,
+    timeout_segundos=None,
+    directorio_salida=None,
+):
+    """
+    Versión awaitable de ejecutar_flujos para código asyncio: la API sync de Playwright no puede
+    correr dentro de un loop en marcha, así que el despachador usa un hilo propio.
+    `al_terminar` se invoca desde ese hilo.
+    """
+    return await asyncio.to_thread(
+        ejecutar_flujos,
+        casos,
+        concurrencia=concurrencia,
+        al_terminar=al_terminar,
+        timeout_segundos=timeout_segundos,
+        directorio_salida=directorio_salida,
+    )
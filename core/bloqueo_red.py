@@ -0,0 +1,118 @@
+"""
+Bloqueo de requests que el bot no necesita (imágenes, fuentes, analítica, widgets de chat).
+
+Perfiles (CFG["bloqueo_red"], --bloqueo-red):
+- off:        no intercepta nada (comportamiento histórico).
+- light:      aborta tag managers, analítica/píxeles de tracking, widgets de chat y media (video/audio).
+- aggressive: light + imágenes, fuentes y manifests de cualquier origen.
+
+Los dominios de la pasarela del market (config/pago.py, DOMINIOS_PASARELA_POR_MARKET) nunca se
+bloquean, así Niubiz/Transbank/Mercado Pago/Cielo cargan sus scripts, fuentes e imágenes completos.
+
+Nota: con cualquier route activo Chromium desactiva la caché HTTP del contexto; por eso `off`
+no registra ningún handler.
+"""
+
+from urllib.parse import urlsplit
+
+import core.state as state
+from config.pago import DOMINIOS_PASARELA_POR_MARKET
+from core.timing import registro_actual
+
+DOMINIOS_ANALITICA = (
+    "googletagmanager.com",
+    "google-analytics.com",
+    "analytics.google.com",
+    "doubleclick.net",
+    "googleadservices.com",
+    "googlesyndication.com",
+    "connect.facebook.net",
+    "facebook.com",
+    "bat.bing.com",
+    "clarity.ms",
+    "hotjar.com",
+    "hotjar.io",
+    "analytics.tiktok.com",
+    "cdn.segment.com",
+    "api.segment.io",
+    "js-agent.newrelic.com",
+    "bam.nr-data.net",
+    "criteo.com",
+    "criteo.net",
+    "taboola.com",
+    "optimizely.com",
+    "mouseflow.com",
+    "fullstory.com",
+    "quantummetric.com",
+    "adsrvr.org",
+    "amplitude.com",
+)
+DOMINIOS_CHAT = (
+    "zdassets.com",
+    "zopim.com",
+    "zendesk.com",
+    "intercom.io",
+    "intercomcdn.com",
+    "livechatinc.com",
+    "tawk.to",
+    "freshchat.com",
+    "drift.com",
+    "hs-scripts.com",
+    "salesforceliveagent.com",
+    "botmaker.com",
+)
+TIPOS_BLOQUEADOS = {
+    "light": {"media"},
+    "aggressive": {"media", "image", "font", "manifest"},
+}
+
+
+def _host_coincide(host, dominios):
+    return any(host == dominio or host.endswith("." + dominio) for dominio in dominios)
+
+
+def motivo_bloqueo(url, tipo_recurso, perfil, market):
+    """Categoría por la que se bloquea el request ('analitica', 'chat', tipo de recurso) o None."""
+    if perfil not in TIPOS_BLOQUEADOS:
+        return None
+    host = (urlsplit(url).hostname or "").lower()
+    if not host or _host_coincide(host, DOMINIOS_PASARELA_POR_MARKET.get(market, ())):
+        return None
+    if _host_coincide(host, DOMINIOS_ANALITICA):
+        return "analitica"
+    if _host_coincide(host, DOMINIOS_CHAT):
+        return "chat"
+    if tipo_recurso in TIPOS_BLOQUEADOS[perfil]:
+        return tipo_recurso
+    return None
+
+
+def adjuntar_bloqueo_red(page):
+    """
+    Registra el route de bloqueo según CFG["bloqueo_red"]. Se aplica al contexto (cubre popups
+    y pestañas de pasarela); en CDP solo a la página, para no tocar el resto del Chrome del usuario.
+    Los bloqueos por categoría quedan en los atributos del timeline de la corrida.
+    """
+    perfil = state.CFG.get("bloqueo_red") or "off"
+    if perfil == "off":
+        return
+    market = state.CFG["market"]
+    bloqueados = {}
+    registro = registro_actual()
+    if registro is not None:
+        registro.atributos["bloqueo_red"] = {"perfil": perfil, "bloqueados": bloqueados}
+
+    def _manejar(route, request):
+        try:
+            motivo = motivo_bloqueo(request.url, request.resource_type, perfil, market)
+        except Exception:
+            motivo = None
+        if motivo is None:
+            route.fallback()
+            return
+        bloqueados[motivo] = bloqueados.get(motivo, 0) + 1
+        route.abort("blockedbyclient")
+
+    objetivo = page if state.CFG.get("usar_chrome_existente") else page.context
+    objetivo.route("**/*", _manejar)
+    print(f"🚫 Bloqueo de red: perfil '{perfil}' (pasarela {market} permitida).")
@@ -1,12 +1,42 @@
 """
 Gestión de sesión de navegador: CDP (Chrome existente) o lanzamiento local con Playwright.
 Retorna (browser, context, page, session_cdp).
+
+PoolNavegador mantiene un Chromium vivo entre corridas y entrega un contexto aislado
+(cookies/storage propios) por cada una; el proceso se relanza tras N contextos o si se cae.
+
+Con CFG["perfil_persistente"] se lanza launch_persistent_context sobre un perfil por
+market/ambiente: la caché HTTP, el code cache y los service workers sobreviven entre corridas,
+mientras que cookies y storage se borran antes de cada lanzamiento.
 """
 
+import os
+import shutil
 import time
 
 import core.state as state
 
+try:
+    import fcntl
+except ImportError:  # Windows: sin candado, un perfil por market a la vez
+    fcntl = None
+
+# Rutas dentro de <perfil>/Default que se borran en cada corrida (Cache, Code Cache y Service Worker se conservan)
+_ESTADO_PERFIL_A_BORRAR = (
+    "Cookies",
+    "Cookies-journal",
+    os.path.join("Network", "Cookies"),
+    os.path.join("Network", "Cookies-journal"),
+    "Local Storage",
+    "Session Storage",
+    "IndexedDB",
+    "WebStorage",
+    "databases",
+    "File System",
+    "Storage",
+)
+_MAX_PERFILES_POR_MARKET = 16
+
 
 def _es_pagina_reutilizable(page):
     try:
@@ -50,7 +80,155 @@ def _obtener_pagina_existente(context, timeout_segundos=3):
     return None
 
 
-def _crear_sesion_navegador(playwright):
+class PoolNavegador:
+    """
+    Chromium de larga vida que entrega un browser.new_context() fresco por corrida.
+    Con flujos concurrentes (core/async_runner.py) varios contextos viven a la vez sobre el mismo
+    Chromium: el reciclaje espera a que no quede ninguno abierto.
+    """
+
+    def __init__(self, playwright, reciclar_cada=20):
+        self.playwright = playwright
+        self.reciclar_cada = max(1, int(reciclar_cada or 1))
+        self.browser = None
+        self.contextos_entregados = 0
+        self.contextos_abiertos = 0
+        self.lanzamientos = 0
+
+    def _navegador_vivo(self):
+        if self.browser is None:
+            return False
+        try:
+            return self.browser.is_connected()
+        except Exception:
+            return False
+
+    def _lanzar(self):
+        anterior, self.browser = self.browser, None
+        self._cerrar_navegador(anterior)
+        browser = self.playwright.chromium.launch(
+            headless=state.CFG["headless"],
+            slow_mo=state.CFG["slow_mo"],
+        )
+        if self._navegador_vivo():
+            # Otro flujo concurrente lanzó mientras tanto: se queda el suyo
+            self._cerrar_navegador(browser)
+            return
+        self.browser = browser
+        self.contextos_entregados = 0
+        self.lanzamientos += 1
+        if self.lanzamientos > 1:
+            print(f"♻️ Pool de navegador: Chromium relanzado (lanzamiento #{self.lanzamientos}).")
+
+    def nueva_sesion(self):
+        """Retorna (browser, context, page, False) con un contexto nuevo sobre el Chromium compartido."""
+        reciclar = self.contextos_entregados >= self.reciclar_cada and not self.contextos_abiertos
+        if not self._navegador_vivo() or reciclar:
+            self._lanzar()
+        browser = self.browser
+        context = browser.new_context()
+        self.contextos_entregados += 1
+        self.contextos_abiertos += 1
+        page = context.new_page()
+        return browser, context, page, False
+
+    def liberar(self, context, fallo=False):
+        """Cierra el contexto de la corrida; si el navegador quedó caído se relanza en la próxima sesión."""
+        if context:
+            self.contextos_abiertos = max(0, self.contextos_abiertos - 1)
+            try:
+                context.close()
+            except Exception as error:
+                print(f"⚠️ Error cerrando contexto del pool: {error}")
+                fallo = True
+        if fallo and self.browser is not None and not self._navegador_vivo():
+            print("⚠️ Pool de navegador: Chromium no responde; se relanzará en la próxima corrida.")
+            self.cerrar()
+
+    def _cerrar_navegador(self, browser):
+        if browser is None:
+            return
+        try:
+            if browser.is_connected():
+                browser.close()
+        except Exception as error:
+            print(f"⚠️ Error cerrando navegador del pool: {error}")
+
+    def cerrar(self):
+        browser, self.browser = self.browser, None
+        self._cerrar_navegador(browser)
+
+
+def _tomar_candado_perfil(directorio):
+    """fd con flock exclusivo sobre el perfil, None sin fcntl, o False si otra corrida lo está usando."""
+    os.makedirs(directorio, exist_ok=True)
+    if fcntl is None:
+        return None
+    fd = os.open(os.path.join(directorio, ".bot_perfil.lock"), os.O_CREAT | os.O_RDWR)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return False
+    return fd
+
+
+def _soltar_candado_perfil(fd):
+    if fd is None:
+        return
+    try:
+        os.close(fd)  # cerrar el fd libera el flock
+    except OSError:
+        pass
+
+
+def _limpiar_estado_perfil(directorio):
+    for relativo in _ESTADO_PERFIL_A_BORRAR:
+        path = os.path.join(directorio, "Default", relativo)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _abrir_perfil_persistente(playwright):
+    """
+    Lanza Chromium con un perfil persistente de market/ambiente. Si otra corrida concurrente usa
+    el perfil se toma el siguiente slot (<market>_<ambiente>_2, _3, ...), cada uno con su caché.
+    """
+    base = os.path.join(
+        state.CFG.get("perfil_persistente_dir") or ".cache_bot/perfiles",
+        f"{state.CFG['market']}_{state.CFG['ambiente']}",
+    )
+    for slot in range(1, _MAX_PERFILES_POR_MARKET + 1):
+        directorio = base if slot == 1 else f"{base}_{slot}"
+        candado = _tomar_candado_perfil(directorio)
+        if candado is not False:
+            break
+    else:
+        raise RuntimeError(f"Los {_MAX_PERFILES_POR_MARKET} perfiles persistentes de '{base}' están en uso.")
+
+    try:
+        _limpiar_estado_perfil(directorio)
+        context = playwright.chromium.launch_persistent_context(
+            directorio,
+            headless=state.CFG["headless"],
+            slow_mo=state.CFG["slow_mo"],
+        )
+    except Exception:
+        _soltar_candado_perfil(candado)
+        raise
+    context.on("close", lambda _: _soltar_candado_perfil(candado))
+    context.clear_cookies()
+    page = context.pages[0] if context.pages else context.new_page()
+    print(f"🔥 Perfil persistente: {directorio} (caché HTTP conservada, cookies/storage limpios)")
+    return None, context, page, False
+
+
+def _crear_sesion_navegador(playwright, pool=None):
     if state.CFG.get("usar_chrome_existente"):
         cdp_url = state.CFG.get("cdp_url") or "http://127.0.0.1:9222"
         print(f"🔌 Conectando a Chrome existente por CDP: {cdp_url}")
@@ -78,6 +256,12 @@ def _crear_sesion_navegador(playwright):
             print("🧭 CDP conectado: se abrió una pestaña nueva para esta ejecución.")
         return browser, context, page, True
 
+    if state.CFG.get("perfil_persistente"):
+        return _abrir_perfil_persistente(playwright)
+
+    if pool is not None:
+        return pool.nueva_sesion()
+
     browser = playwright.chromium.launch(headless=state.CFG["headless"], slow_mo=state.CFG["slow_mo"])
     context = browser.new_context()
     page = context.new_page()
@@ -0,0 +1,234 @@
+"""
+Bus de control GUI <-> bot por socket local (TCP en 127.0.0.1, un mensaje JSON por línea).
+
+El bot abre un puerto efímero y lo anuncia en <control_dir>/bus.port ({"puerto", "token", "pid"}).
+La GUI se conecta, se presenta con {"tipo": "hola", "token": ...} y desde ahí:
+- GUI -> bot: {"tipo": "pausa"}, {"tipo": "continuar"}
+- bot -> GUI: "pausado" (etapa, url, contexto), "reanudado" (etapa), "etapa" (etapa, url),
+  "progreso" (paso, indice, total). Un cliente que se conecta durante una pausa recibe el "pausado" vigente.
+
+Pausa y continuar quedan como threading.Event en memoria: gestionar_pausa_edicion ya no consulta el
+filesystem en cada llamada y la reanudación no espera al próximo sondeo de 250 ms. "continuar" solo se
+limpia al reanudar: uno que llega justo antes de que la pausa se marque no se pierde.
+
+publicar() no escribe en el socket: encola en un hilo escritor por cliente, así una GUI lenta o colgada
+nunca frena al hilo del flujo. Un cliente que acumula COLA_CLIENTE_MAX mensajes sin leer se desconecta
+(la GUI sigue con los archivos de control).
+Compatibilidad con --control-dir: sin cliente conectado se siguen leyendo pause.request/continue.request
+(como mucho cada BUS_CONTROL_SONDEO_ARCHIVOS_S) y paused.state se sigue escribiendo (core/helpers.py).
+"""
+
+import atexit
+import json
+import os
+import queue
+import secrets
+import socket
+import threading
+import time
+
+import core.state as state
+from config.rutas import BUS_CONTROL, BUS_CONTROL_SONDEO_ARCHIVOS_S
+
+ARCHIVO_PUERTO = "bus.port"
+COLA_CLIENTE_MAX = 1000
+
+_buses = {}
+_lock_buses = threading.Lock()
+
+
+def _decodificar(linea):
+    try:
+        mensaje = json.loads(linea)
+    except ValueError:
+        return None
+    return mensaje if isinstance(mensaje, dict) else None
+
+
+class _Cliente:
+    """Conexión autenticada de la GUI con su hilo escritor: encolar() nunca bloquea."""
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+        self._cola = queue.Queue(maxsize=COLA_CLIENTE_MAX)
+        threading.Thread(target=self._escribir, name="bus-control-escritor", daemon=True).start()
+
+    def encolar(self, mensaje):
+        """False si el cliente no está leyendo (cola llena)."""
+        try:
+            self._cola.put_nowait(mensaje)
+        except queue.Full:
+            return False
+        return True
+
+    def _escribir(self):
+        while True:
+            mensaje = self._cola.get()
+            if mensaje is None:
+                return
+            try:
+                self.conexion.sendall((json.dumps(mensaje, ensure_ascii=False) + "\n").encode("utf-8"))
+            except OSError:
+                self.desconectar()
+                return
+
+    def desconectar(self):
+        """Corta la conexión sin esperar: el hilo de atención ve el cierre y retira al cliente."""
+        try:
+            self.conexion.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def terminar(self):
+        self.encolar(None)
+        self.conexion.close()
+
+
+class BusControl:
+    """
+    Servidor del bus para un control_dir; los hilos de atención solo tocan Events y la lista de clientes,
+    y cada cliente escribe desde su propio hilo.
+    """
+
+    def __init__(self, control_dir):
+        self.control_dir = control_dir
+        self.token = secrets.token_hex(16)
+        self.pausa = threading.Event()
+        self.continuar = threading.Event()
+        self._lock = threading.Lock()
+        self._clientes = []
+        self._pausado = None
+        self._ultimo_sondeo = {}
+        self._servidor = socket.create_server(("127.0.0.1", 0))
+        self.puerto = self._servidor.getsockname()[1]
+        threading.Thread(target=self._aceptar, name="bus-control", daemon=True).start()
+        self._anunciar()
+
+    def _anunciar(self):
+        os.makedirs(self.control_dir, exist_ok=True)
+        path = os.path.join(self.control_dir, ARCHIVO_PUERTO)
+        temporal = f"{path}.{os.getpid()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump({"puerto": self.puerto, "token": self.token, "pid": os.getpid()}, archivo)
+        os.replace(temporal, path)
+
+    def _aceptar(self):
+        while True:
+            try:
+                conexion, _ = self._servidor.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._atender, args=(conexion,), name="bus-control-cliente", daemon=True).start()
+
+    def _atender(self, conexion):
+        cliente = None
+        try:
+            with conexion.makefile("r", encoding="utf-8") as lector:
+                saludo = _decodificar(lector.readline())
+                if not saludo or saludo.get("token") != self.token:
+                    return
+                cliente = _Cliente(conexion)
+                with self._lock:
+                    self._clientes.append(cliente)
+                    if self._pausado is not None:
+                        cliente.encolar(self._pausado)
+                for linea in lector:
+                    mensaje = _decodificar(linea) or {}
+                    if mensaje.get("tipo") == "pausa":
+                        self.pausa.set()
+                    elif mensaje.get("tipo") == "continuar":
+                        self.continuar.set()
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                if cliente in self._clientes:
+                    self._clientes.remove(cliente)
+            if cliente is not None:
+                cliente.terminar()
+            else:
+                conexion.close()
+
+    def publicar(self, tipo, **datos):
+        """Encola el evento para cada cliente; nunca espera al socket."""
+        mensaje = {"tipo": tipo, **datos}
+        with self._lock:
+            if tipo == "pausado":
+                self._pausado = mensaje
+            elif tipo == "reanudado":
+                self._pausado = None
+            for cliente in self._clientes:
+                if not cliente.encolar(mensaje):
+                    cliente.desconectar()
+
+    def _archivo_presente(self, nombre):
+        """Respaldo para clientes de --control-dir: solo sin cliente del bus y como mucho cada N segundos."""
+        if self._clientes:
+            return False
+        ahora = time.monotonic()
+        if ahora - self._ultimo_sondeo.get(nombre, 0.0) < BUS_CONTROL_SONDEO_ARCHIVOS_S:
+            return False
+        self._ultimo_sondeo[nombre] = ahora
+        return os.path.exists(os.path.join(self.control_dir, nombre))
+
+    def pausa_solicitada(self):
+        return self.pausa.is_set() or self._archivo_presente("pause.request")
+
+    def continuar_solicitado(self):
+        return self.continuar.is_set() or self._archivo_presente("continue.request")
+
+    def marcar_pausado(self, etapa, url, contexto):
+        self.pausa.clear()
+        self.publicar("pausado", etapa=etapa, url=url, contexto=contexto)
+
+    def marcar_reanudado(self, etapa):
+        self.continuar.clear()
+        self.publicar("reanudado", etapa=etapa)
+
+    def cerrar(self):
+        try:
+            self._servidor.close()
+        except OSError:
+            pass
+        with self._lock:
+            for cliente in self._clientes:
+                cliente.desconectar()
+            self._clientes.clear()
+        try:
+            os.remove(os.path.join(self.control_dir, ARCHIVO_PUERTO))
+        except OSError:
+            pass
+
+
+def _cerrar_buses():
+    for bus in _buses.values():
+        if bus:
+            bus.cerrar()
+
+
+def bus_actual():
+    """Bus del control_dir del estado activo (lo abre la primera vez); None sin control_dir o con el bus apagado."""
+    control_dir = state.CFG.get("control_dir")
+    if not control_dir or not state.CFG.get("bus_control", BUS_CONTROL):
+        return None
+    bus = _buses.get(control_dir)
+    if bus is None:
+        with _lock_buses:
+            bus = _buses.get(control_dir)
+            if bus is None:
+                if not _buses:
+                    atexit.register(_cerrar_buses)
+                try:
+                    bus = BusControl(control_dir)
+                except OSError as error:
+                    print(f"⚠️ No se pudo abrir el bus de control; se usan solo los archivos de control: {error}")
+                    bus = False
+                _buses[control_dir] = bus
+    return bus or None
+
+
+def publicar(tipo, **datos):
+    """Envía un evento a la GUI conectada; sin bus no hace nada."""
+    bus = bus_actual()
+    if bus is not None:
+        bus.publicar(tipo, **datos)
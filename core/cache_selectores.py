@@ -0,0 +1,149 @@
+"""
+Caché persistente del selector que ganó en cada lista de respaldo, por (helper, market, ambiente).
+
+Varios helpers prueban listas largas de selectores en orden (botón Buscar, CTAs de asientos, checkbox
+de términos, ...) y casi siempre gana el mismo por market/ambiente. Con la caché, los ganadores
+previos se prueban primero (más aciertos primero) y el resto conserva el orden original.
+
+Las listas están en orden de prioridad por corrección, no solo por velocidad: un respaldo genérico
+(input[type="checkbox"]) puede ganar una vez porque el específico todavía no renderizaba. Por eso:
+- un ganador solo suma acierto si todos los selectores de mayor prioridad se sondearon en esa misma
+  búsqueda y no sirvieron (así un genérico que ganó por orden aprendido no se refuerza solo),
+- el sondeo nunca deja pasar a un aprendido por delante de uno de mayor prioridad visible
+  (core/helpers.py::_sondear_selectores); el aprendido desplazado cuenta como fallo,
+- se registra después de actuar con éxito (click hecho, modal abierto), no al encontrar el elemento.
+
+Por selector se guardan aciertos, fallos y última vez que ganó. Cada fallo reduce los aciertos a la
+mitad; al llegar a cero sale de la caché. Las entradas sin uso por más de CACHE_SELECTORES_TTL_DIAS
+se descartan al cargar.
+
+Archivo: .cache_bot/selectores.json (CACHE_SELECTORES). Se escribe al cambiar el orden aprendido y al
+terminar el proceso; con corridas concurrentes gana la última escritura (la caché solo reordena).
+"""
+
+import atexit
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+import core.state as state
+from config.rutas import CACHE_SELECTORES, CACHE_SELECTORES_TTL_DIAS, SELECTORES_APRENDIDOS
+from core.timing import registro_actual
+
+_lock = threading.Lock()
+_tabla = None
+_pendiente = False
+
+
+def _activa():
+    return state.CFG.get("selectores_aprendidos", SELECTORES_APRENDIDOS)
+
+
+def _clave(helper):
+    return f"{helper}|{state.CFG.get('market', '')}|{state.CFG.get('ambiente', '')}"
+
+
+def _cargar():
+    global _tabla
+    if _tabla is None:
+        try:
+            with open(CACHE_SELECTORES, "r", encoding="utf-8") as archivo:
+                _tabla = json.load(archivo)
+        except (OSError, ValueError):
+            _tabla = {}
+        limite = (datetime.now() - timedelta(days=CACHE_SELECTORES_TTL_DIAS)).isoformat(timespec="seconds")
+        for clave in list(_tabla):
+            vigentes = {sel: datos for sel, datos in _tabla[clave].items() if datos.get("ultimo", "") >= limite}
+            if vigentes:
+                _tabla[clave] = vigentes
+            else:
+                del _tabla[clave]
+    return _tabla
+
+
+def _guardar():
+    global _pendiente
+    try:
+        os.makedirs(os.path.dirname(CACHE_SELECTORES) or ".", exist_ok=True)
+        temporal = f"{CACHE_SELECTORES}.{os.getpid()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump(_tabla, archivo, ensure_ascii=False, indent=2)
+        os.replace(temporal, CACHE_SELECTORES)
+        _pendiente = False
+    except OSError as error:
+        print(f"⚠️ No se pudo guardar la caché de selectores '{CACHE_SELECTORES}': {error}")
+
+
+def _guardar_pendiente():
+    with _lock:
+        if _pendiente and _tabla is not None:
+            _guardar()
+
+
+atexit.register(_guardar_pendiente)
+
+
+def _contar(campo):
+    registro = registro_actual()
+    if registro is None:
+        return
+    stats = registro.atributos.setdefault("cache_selectores", {"acierto_primero": 0, "respaldo": 0})
+    stats[campo] += 1
+
+
+def ordenar(helper, selectores):
+    """`selectores` con los ganadores cacheados del helper primero (más aciertos, más reciente)."""
+    selectores = list(selectores)
+    if not _activa():
+        return selectores
+    with _lock:
+        entradas = _cargar().get(_clave(helper), {})
+        ganadores = sorted(
+            (sel for sel in selectores if sel in entradas),
+            key=lambda sel: (entradas[sel]["aciertos"], entradas[sel]["ultimo"]),
+            reverse=True,
+        )
+    return ganadores + [sel for sel in selectores if sel not in ganadores]
+
+
+def registrar(helper, selectores, ganador, ausentes=()):
+    """
+    Registra que `ganador` resolvió la lista `selectores` (en su orden de prioridad original).
+    `ausentes` son los selectores sondeados en esa búsqueda que no sirvieron: los cacheados entre
+    ellos suman fallo y decaen. El ganador suma acierto solo si todos los de mayor prioridad están
+    en `ausentes`; si ganó sin que se probaran (por el orden aprendido) la caché no cambia.
+    """
+    global _pendiente
+    if not _activa() or ganador is None:
+        return
+    selectores = list(selectores)
+    ausentes = set(ausentes)
+    with _lock:
+        tabla = _cargar()
+        clave = _clave(helper)
+        entradas = tabla.setdefault(clave, {})
+        cacheados = [sel for sel in selectores if sel in entradas]
+        primero = max(cacheados, key=lambda sel: (entradas[sel]["aciertos"], entradas[sel]["ultimo"]), default=None)
+        cambio_orden = False
+        for selector in cacheados:
+            if selector == ganador or selector not in ausentes:
+                continue
+            datos = entradas[selector]
+            datos["fallos"] += 1
+            datos["aciertos"] //= 2
+            if datos["aciertos"] == 0:
+                del entradas[selector]
+            cambio_orden = True
+        legitimo = ganador in selectores and all(sel in ausentes for sel in selectores[: selectores.index(ganador)])
+        if legitimo:
+            cambio_orden = cambio_orden or ganador not in entradas
+            datos = entradas.setdefault(ganador, {"aciertos": 0, "fallos": 0, "ultimo": ""})
+            datos["aciertos"] += 1
+            datos["ultimo"] = datetime.now().isoformat(timespec="seconds")
+            _pendiente = True
+        if not entradas:
+            del tabla[clave]
+        if cambio_orden:
+            _guardar()
+    _contar("acierto_primero" if primero is not None and primero == ganador else "respaldo")
@@ -0,0 +1,168 @@
+"""
+Tabla persistente ciudad -> (IATA, etiqueta exacta de la opción) para el autocompletado de origen/destino.
+
+Se alimenta de lo que el bot ve: cada vez que aparece el desplegable se guardan las etiquetas visibles
+(con el código IATA si la etiqueta lo trae) y, al elegir una opción, el par ciudad escrita -> etiqueta.
+Con la ciudad conocida, _seleccionar_ciudad escribe el prefijo único más corto y hace click directo
+en la etiqueta; _codigo_iata la usa para la búsqueda directa.
+
+Archivo: .cache_bot/ciudades.json (CACHE_CIUDADES), una sección por idioma del sitio (es/pt/en).
+Corridas concurrentes (matrix.py, la GUI) comparten el archivo: cada escritura lo relee bajo un flock
+y fusiona lo que aprendieron las demás antes de reemplazarlo.
+"""
+
+import json
+import os
+import re
+import threading
+import unicodedata
+from datetime import datetime
+
+from config.rutas import CACHE_CIUDADES
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin candado entre procesos, solo la relectura antes de escribir
+    fcntl = None
+
+_PREFIJO_MINIMO = 3
+_PATRON_IATA = re.compile(r"\b([A-Z]{3})\b")
+_lock = threading.Lock()
+_tabla = None
+
+
+def clave_ciudad(texto):
+    """Normaliza para comparar nombres: sin acentos, minúsculas y espacios simples."""
+    sin_acentos = unicodedata.normalize("NFKD", texto or "").encode("ascii", "ignore").decode("ascii")
+    return " ".join(sin_acentos.casefold().split())
+
+
+def _nombre_desde_etiqueta(etiqueta):
+    """'Santiago, Chile (SCL)' -> 'Santiago'."""
+    return re.split(r"[,(\-–]", etiqueta, maxsplit=1)[0].strip()
+
+
+def _iata_desde_etiqueta(etiqueta):
+    codigos = _PATRON_IATA.findall(etiqueta or "")
+    return codigos[-1] if codigos else None
+
+
+def _cargar():
+    global _tabla
+    if _tabla is None:
+        try:
+            with open(CACHE_CIUDADES, "r", encoding="utf-8") as archivo:
+                _tabla = json.load(archivo)
+        except (OSError, ValueError):
+            _tabla = {}
+    return _tabla
+
+
+def _fusionar(tabla, en_disco):
+    """Suma a `tabla` lo que otra corrida escribió en disco; por ciudad gana la selección más reciente."""
+    for idioma, seccion_disco in en_disco.items():
+        seccion = tabla.setdefault(idioma, {"ciudades": {}, "etiquetas": []})
+        conocidas = set(seccion["etiquetas"])
+        seccion["etiquetas"].extend(e for e in seccion_disco.get("etiquetas", []) if e not in conocidas)
+        for clave, entrada in seccion_disco.get("ciudades", {}).items():
+            propia = seccion["ciudades"].get(clave)
+            if propia is None or entrada.get("visto", "") > propia.get("visto", ""):
+                seccion["ciudades"][clave] = entrada
+
+
+def _guardar():
+    """Relee el archivo bajo flock, fusiona y lo reemplaza: no pisa lo aprendido por otra corrida."""
+    candado = None
+    try:
+        os.makedirs(os.path.dirname(CACHE_CIUDADES) or ".", exist_ok=True)
+        if fcntl is not None:
+            candado = os.open(f"{CACHE_CIUDADES}.lock", os.O_CREAT | os.O_RDWR)
+            fcntl.flock(candado, fcntl.LOCK_EX)
+        try:
+            with open(CACHE_CIUDADES, "r", encoding="utf-8") as archivo:
+                _fusionar(_tabla, json.load(archivo))
+        except (OSError, ValueError):
+            pass
+        temporal = f"{CACHE_CIUDADES}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump(_tabla, archivo, ensure_ascii=False, indent=2)
+        os.replace(temporal, CACHE_CIUDADES)
+    except OSError as error:
+        print(f"⚠️ No se pudo guardar la tabla de ciudades '{CACHE_CIUDADES}': {error}")
+    finally:
+        if candado is not None:
+            os.close(candado)  # cerrar el fd libera el flock
+
+
+def resolver_ciudad(nombre, idioma):
+    """{"etiqueta", "iata"} conocida para `nombre` en el idioma del sitio, o None."""
+    with _lock:
+        entrada = _cargar().get(idioma, {}).get("ciudades", {}).get(clave_ciudad(nombre))
+        return dict(entrada) if entrada else None
+
+
+def iata_conocido(nombre):
+    """Código IATA aprendido para `nombre` en cualquier idioma, o None."""
+    clave = clave_ciudad(nombre)
+    with _lock:
+        for seccion in _cargar().values():
+            entrada = seccion.get("ciudades", {}).get(clave)
+            if entrada and entrada.get("iata"):
+                return entrada["iata"]
+    return None
+
+
+def prefijo_unico(nombre, etiqueta, idioma):
+    """
+    Prefijo más corto de `nombre` (mínimo 3 letras) que ninguna otra etiqueta conocida contiene.
+    Si la tabla no alcanza para desambiguar, retorna el nombre completo.
+    """
+    with _lock:
+        etiquetas = _cargar().get(idioma, {}).get("etiquetas", [])
+        otras = [clave_ciudad(otra) for otra in etiquetas if otra != etiqueta]
+    nombre = nombre.strip()
+    for largo in range(_PREFIJO_MINIMO, len(nombre)):
+        candidato = clave_ciudad(nombre[:largo])
+        if not any(candidato in otra for otra in otras):
+            return nombre[:largo]
+    return nombre
+
+
+def registrar_opciones(etiquetas, idioma):
+    """Aprende las etiquetas visibles del desplegable (nombre derivado e IATA si viene en el texto)."""
+    etiquetas = [" ".join(etiqueta.split()) for etiqueta in etiquetas if etiqueta and etiqueta.strip()]
+    if not etiquetas:
+        return
+    with _lock:
+        seccion = _cargar().setdefault(idioma, {"ciudades": {}, "etiquetas": []})
+        conocidas = set(seccion["etiquetas"])
+        cambio = False
+        for etiqueta in etiquetas:
+            if etiqueta not in conocidas:
+                seccion["etiquetas"].append(etiqueta)
+                conocidas.add(etiqueta)
+                cambio = True
+            clave = clave_ciudad(_nombre_desde_etiqueta(etiqueta))
+            if clave and clave not in seccion["ciudades"]:
+                seccion["ciudades"][clave] = {"etiqueta": etiqueta, "iata": _iata_desde_etiqueta(etiqueta)}
+                cambio = True
+        if cambio:
+            _guardar()
+
+
+def registrar_seleccion(nombre, etiqueta, idioma):
+    """Fija ciudad escrita -> etiqueta elegida (pisa lo derivado por registrar_opciones)."""
+    etiqueta = " ".join((etiqueta or "").split())
+    if not etiqueta:
+        return
+    with _lock:
+        seccion = _cargar().setdefault(idioma, {"ciudades": {}, "etiquetas": []})
+        if etiqueta not in seccion["etiquetas"]:
+            seccion["etiquetas"].append(etiqueta)
+        anterior = seccion["ciudades"].get(clave_ciudad(nombre), {})
+        seccion["ciudades"][clave_ciudad(nombre)] = {
+            "etiqueta": etiqueta,
+            "iata": _iata_desde_etiqueta(etiqueta) or anterior.get("iata"),
+            "visto": datetime.now().isoformat(timespec="seconds"),
+        }
+        _guardar()
@@ -0,0 +1,250 @@
+"""
+Escritura de evidencias (screenshots, HTML) en segundo plano.
+
+El hilo del flujo solo pide los bytes al navegador (page.screenshot() sin path, page.content()) y
+encola la escritura; un pool de hilos escribe a disco. La cola es acotada (EVIDENCIAS_COLA_MAX):
+si se llena, el flujo espera en vez de acumular memoria sin límite. Al salir del proceso (atexit)
+se vacía la cola, así ninguna evidencia se pierde aunque la corrida termine con error.
+
+Formato de screenshots (CFG["evidencia_formato"]: png/jpeg/webp, calidad, dimensión máxima y
+página completa vs viewport por tipo) y HTML en gzip: ver guardar_screenshot/guardar_html.
+Con EVIDENCIAS_DEDUPLICADAS cada archivo pasa por el almacén direccionado por contenido
+(core/almacen_evidencias.py). Con EVIDENCIAS_EN_SEGUNDO_PLANO = False todo se escribe en el hilo
+del flujo, como antes.
+"""
+
+import atexit
+import gzip
+import io
+import os
+import queue
+import threading
+from datetime import datetime
+
+import core.state as state
+from config.rutas import (
+    EVIDENCIAS_BASE_DIR,
+    EVIDENCIAS_CALIDAD,
+    EVIDENCIAS_COLA_MAX,
+    EVIDENCIAS_DEDUPLICADAS,
+    EVIDENCIAS_DIMENSION_MAX,
+    EVIDENCIAS_EN_SEGUNDO_PLANO,
+    EVIDENCIAS_FORMATO,
+    EVIDENCIAS_HILOS,
+    EVIDENCIAS_HTML_GZIP,
+    EVIDENCIAS_PAGINA_COMPLETA,
+)
+from core import hash_visual
+from core.almacen_evidencias import almacen
+from core.timing import registro_actual
+
+try:
+    from PIL import Image
+except ImportError:  # cli.py rechaza webp/--dimension-max-evidencia sin Pillow; acá solo llegan valores de config
+    Image = None
+
+FORMATOS_EVIDENCIA = ("png", "jpeg", "webp")
+_EXTENSIONES = {"png": ".png", "jpeg": ".jpg", "webp": ".webp"}
+_avisos = set()
+
+_lock = threading.Lock()
+_cola = None
+# path pedido -> [Event de decisión tomada, path final] de las capturas que pasan por el hash visual
+_capturas_visuales = {}
+
+
+def _escribir(path, contenido, descripcion, id_ejecucion=None, procesar=None):
+    try:
+        if procesar is not None:
+            contenido = procesar(contenido)
+            if contenido is None:
+                return True
+        if EVIDENCIAS_DEDUPLICADAS:
+            datos = contenido if isinstance(contenido, bytes) else contenido.encode("utf-8")
+            almacen(EVIDENCIAS_BASE_DIR).guardar(path, datos, id_ejecucion)
+            return True
+        directorio = os.path.dirname(path)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        if isinstance(contenido, bytes):
+            with open(path, "wb") as archivo:
+                archivo.write(contenido)
+        else:
+            with open(path, "w", encoding="utf-8") as archivo:
+                archivo.write(contenido)
+    except Exception as error:
+        print(f"⚠️ No se pudo escribir {descripcion} '{path}': {error}")
+        return False
+    return True
+
+
+def _trabajador(cola):
+    while True:
+        tarea = cola.get()
+        try:
+            _escribir(*tarea)
+        finally:
+            cola.task_done()
+
+
+def _cola_escritura():
+    global _cola
+    with _lock:
+        if _cola is None:
+            _cola = queue.Queue(maxsize=EVIDENCIAS_COLA_MAX)
+            for indice in range(EVIDENCIAS_HILOS):
+                threading.Thread(
+                    target=_trabajador, args=(_cola,), name=f"evidencias-{indice}", daemon=True
+                ).start()
+            atexit.register(vaciar_evidencias)
+    return _cola
+
+
+def guardar_archivo(path, contenido, descripcion="evidencia", procesar=None):
+    """
+    Encola `contenido` (bytes o str) para escribirse en `path`; sin segundo plano lo escribe ya.
+    `procesar(contenido)` (recodificar, comprimir, serializar) corre en el hilo de escritura; con
+    `procesar`, `contenido` puede ser cualquier objeto que `procesar` convierta a bytes o str.
+    """
+    id_ejecucion = state.EXPLORACION_RUN_ID or None
+    if not EVIDENCIAS_EN_SEGUNDO_PLANO:
+        return _escribir(path, contenido, descripcion, id_ejecucion, procesar)
+    _cola_escritura().put((path, contenido, descripcion, id_ejecucion, procesar))
+    return True
+
+
+def ruta_evidencia(prefijo, extension=".png"):
+    """screenshots_pruebas/<prefijo>_<timestamp><extension>"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(EVIDENCIAS_BASE_DIR, f"{prefijo}_{timestamp}{extension}")
+
+
+def _avisar_una_vez(clave, mensaje):
+    if clave not in _avisos:
+        _avisos.add(clave)
+        print(mensaje)
+
+
+def _recodificar(formato, calidad, dimension_max):
+    """Función para el hilo de escritura: PNG del navegador -> formato/calidad/tamaño pedidos (Pillow)."""
+
+    def procesar(contenido):
+        imagen = Image.open(io.BytesIO(contenido))
+        if dimension_max:
+            imagen.thumbnail((dimension_max, dimension_max))
+        if formato == "jpeg" and imagen.mode not in ("RGB", "L"):
+            imagen = imagen.convert("RGB")
+        salida = io.BytesIO()
+        opciones = {"optimize": True} if formato == "png" else {"quality": calidad}
+        imagen.save(salida, format=formato.upper(), **opciones)
+        return salida.getvalue()
+
+    return procesar
+
+
+def _con_hash_visual(etapa, path, procesar, viewport):
+    """
+    Envuelve `procesar`: hashea la captura y la descarta (None) si es casi idéntica a la referencia.
+    La decisión queda en _capturas_visuales para ruta_screenshot_final.
+    """
+    clave = f"{state.CFG.get('market')}|{state.CFG.get('ambiente')}|{etapa}"
+    id_ejecucion = state.EXPLORACION_RUN_ID
+    registro = registro_actual()
+    decision = [threading.Event(), path]
+    with _lock:
+        _capturas_visuales[path] = decision
+
+    def procesar_con_hash(contenido):
+        try:
+            try:
+                referencia = hash_visual.evaluar_captura(clave, contenido, path, id_ejecucion, registro, viewport)
+            except Exception as error:
+                print(f"⚠️ No se pudo calcular el hash visual de '{path}': {error}")
+                referencia = None
+            if referencia:
+                decision[1] = referencia
+                print(f"🖼️ '{etapa}' casi idéntica a la referencia: no se guarda {path}, queda {referencia}")
+                return None
+            return procesar(contenido) if procesar else contenido
+        finally:
+            decision[0].set()
+
+    return procesar_con_hash
+
+
+def ruta_screenshot_final(path, timeout=30):
+    """
+    Path de la imagen que representa la captura pedida en `path`: el mismo, o el de la referencia si
+    el hash visual la omitió por casi idéntica. Espera la decisión del hilo de escritura (hasta `timeout`).
+    """
+    with _lock:
+        decision = _capturas_visuales.get(path)
+    if decision is None:
+        return path
+    decision[0].wait(timeout)
+    with _lock:
+        _capturas_visuales.pop(path, None)
+    return decision[1]
+
+
+def guardar_screenshot(page, path, tipo="exploracion", etapa_visual=None):
+    """
+    Toma el screenshot en memoria y delega la escritura. `tipo` ("exploracion", "error", "final")
+    decide página completa vs viewport (CFG["evidencia_pagina_completa"]). La extensión de `path`
+    se reemplaza por la del formato configurado; retorna el path final.
+    Con `etapa_visual` la captura pasa por el hash perceptual (core/hash_visual.py) y puede no
+    escribirse: ruta_screenshot_final(path) dice qué imagen la representa.
+    """
+    formato = state.CFG.get("evidencia_formato", EVIDENCIAS_FORMATO)
+    calidad = state.CFG.get("evidencia_calidad", EVIDENCIAS_CALIDAD)
+    dimension_max = state.CFG.get("evidencia_dimension_max", EVIDENCIAS_DIMENSION_MAX)
+    pagina_completa = state.CFG.get("evidencia_pagina_completa", EVIDENCIAS_PAGINA_COMPLETA).get(tipo, True)
+
+    if Image is None and formato == "webp":
+        _avisar_una_vez("webp", "⚠️ WebP requiere Pillow (pip install Pillow); se usa JPEG.")
+        formato = "jpeg"
+    path = os.path.splitext(path)[0] + _EXTENSIONES[formato]
+
+    opciones = {"full_page": pagina_completa}
+    procesar = None
+    if Image is not None and (formato == "webp" or dimension_max):
+        # Captura sin pérdida y el hilo de escritura reduce/recodifica
+        opciones["type"] = "png"
+        procesar = _recodificar(formato, calidad, dimension_max)
+    else:
+        opciones["type"] = formato
+        if formato == "jpeg":
+            opciones["quality"] = calidad
+        if dimension_max:
+            _avisar_una_vez(
+                "dimension", "⚠️ Sin Pillow la reducción usa scale='css' (1 px por px CSS), no el máximo exacto."
+            )
+            opciones["scale"] = "css"
+
+    contenido = page.screenshot(**opciones)
+    if etapa_visual and hash_visual.disponible():
+        procesar = _con_hash_visual(etapa_visual, path, procesar, page.viewport_size)
+    guardar_archivo(path, contenido, "screenshot", procesar)
+    return path
+
+
+def _comprimir_gzip(contenido):
+    # mtime=0: el mismo HTML produce el mismo .gz y se deduplica en el almacén
+    return gzip.compress(contenido.encode("utf-8"), mtime=0)
+
+
+def guardar_html(page, path):
+    """Dump HTML (comprimido como <path>.gz con EVIDENCIAS_HTML_GZIP). Retorna el path final."""
+    if not EVIDENCIAS_HTML_GZIP:
+        guardar_archivo(path, page.content(), "HTML")
+        return path
+    path = f"{path}.gz"
+    guardar_archivo(path, page.content(), "HTML", _comprimir_gzip)
+    return path
+
+
+def vaciar_evidencias():
+    """Bloquea hasta que todas las evidencias encoladas estén en disco."""
+    cola = _cola
+    if cola is not None:
+        cola.join()
@@ -0,0 +1,95 @@
+"""
+Grabación y replay HAR del tráfico de búsqueda/tarifas (context.route_from_har).
+
+- record (--har-record): graba en el HAR las requests que calzan con CFG["har_url"]; Playwright
+  escribe el archivo al cerrar el contexto.
+- replay (--har-replay): sirve esas requests desde el HAR hasta terminar la selección de tarifa;
+  lo que no esté grabado sigue a la red (not_found="fallback"). Después de elegir vuelo se suelta
+  el route, así asientos, extras, pasajeros y pago siempre van contra el sitio real.
+
+El archivo por defecto es uno por market/ambiente/ruta/fecha/pasajeros en .cache_bot/har/.
+No aplica con --usar-chrome-existente (el contexto CDP no se cierra y el HAR no se escribiría).
+"""
+
+import json
+import os
+import re
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+import core.state as state
+
+_patron_replay = ContextVar("patron_replay_har", default=None)
+
+
+def _slug(texto):
+    return re.sub(r"[^a-z0-9]+", "-", str(texto).lower()).strip("-") or "x"
+
+
+def ruta_har_por_defecto(cfg, base_dir):
+    """Ej: .cache_bot/har/PE_qa_lima-cusco_ONE_WAY_2026-11-20_1-0-0.har"""
+    fecha_ida = (datetime.now() + timedelta(days=cfg["dias"])).date().isoformat()
+    pax = cfg["pasajeros"]
+    nombre = (
+        f"{cfg['market']}_{cfg['ambiente']}_{_slug(cfg['origen'])}-{_slug(cfg['destino'])}_"
+        f"{cfg['tipo_viaje']}_{fecha_ida}_{pax['adultos']}-{pax['ninos']}-{pax['infantes']}.har"
+    )
+    return os.path.join(base_dir, nombre)
+
+
+def adjuntar_har(page):
+    """Registra route_from_har en el contexto de `page` según CFG["har_modo"] (record/replay/None)."""
+    modo = state.CFG.get("har_modo")
+    _patron_replay.set(None)
+    if not modo:
+        return
+    archivo = state.CFG["har_archivo"]
+    patron = state.CFG["har_url"]
+    context = page.context
+
+    if modo == "record":
+        os.makedirs(os.path.dirname(archivo) or ".", exist_ok=True)
+        context.route_from_har(archivo, url=patron, update=True, update_content="embed", update_mode="minimal")
+        print(f"📼 HAR: grabando '{patron}' -> {archivo} (se escribe al cerrar el contexto)")
+        return
+
+    if not os.path.isfile(archivo):
+        raise RuntimeError(f"No existe el HAR '{archivo}'. Grábalo primero con --har-record.")
+    context.route_from_har(archivo, url=patron, not_found="fallback")
+    _patron_replay.set(patron)
+    print(f"📼 HAR: replay de '{patron}' desde {archivo} hasta la selección de tarifa")
+
+
+def soltar_har_replay(page):
+    """Quita el replay HAR (idempotente); desde aquí todas las requests van a la red."""
+    patron = _patron_replay.get()
+    if not patron:
+        return
+    _patron_replay.set(None)
+    try:
+        page.context.unroute(patron)
+        print("📼 HAR: replay terminado; el resto del flujo va contra la red.")
+    except Exception as error:
+        print(f"⚠️ HAR: no se pudo quitar el replay: {error}")
+
+
+def rutas_har(archivo):
+    """[(método, ruta sin query, veces)] de las requests grabadas, en orden de primera aparición."""
+    with open(archivo, encoding="utf-8") as entrada:
+        entradas = json.load(entrada)["log"]["entries"]
+    conteo = {}
+    for entrada_har in entradas:
+        request = entrada_har["request"]
+        clave = (request["method"], urlsplit(request["url"]).path)
+        conteo[clave] = conteo.get(clave, 0) + 1
+    return [(metodo, ruta, veces) for (metodo, ruta), veces in conteo.items()]
+
+
+if __name__ == "__main__":
+    # python -m core.har <archivo.har>: rutas para XHR_BUSQUEDA_PATRON / XHR_TARIFA_PATRON (config/rutas.py)
+    if len(sys.argv) != 2:
+        sys.exit("Uso: python -m core.har <archivo.har>")
+    for metodo, ruta, veces in rutas_har(sys.argv[1]):
+        print(f"{metodo:<7} {ruta}  (x{veces})")
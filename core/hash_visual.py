@@ -0,0 +1,151 @@
+"""
+Hash perceptual (dHash 16x16, 256 bits) de los screenshots de exploración, por market/ambiente/etapa.
+
+El hash se calcula sobre el viewport (la franja superior de una captura de página completa): ahí
+están los CTAs y un cambio de etiqueta mueve más bits que diluido en toda la página. Con 64 bits
+sobre la página completa un botón renombrado quedaba por debajo del umbral de duplicado.
+
+Cada captura se compara contra la referencia de su etapa, que es la de la última corrida terminada
+sin error (confirmar_referencias la promueve al cerrar la corrida):
+- distancia <= HASH_VISUAL_UMBRAL_DUPLICADO bits: casi idéntica, no se guarda la imagen y el
+  reporte de exploración apunta a la de la referencia (core/evidencias.py: ruta_screenshot_final).
+- distancia >  HASH_VISUAL_UMBRAL_DERIVA bits: la etapa cambió visualmente. Se avisa y queda en
+  atributos.deriva_visual del timeline.
+
+El hash se calcula en el hilo de escritura de evidencias (core/evidencias.py) y requiere Pillow.
+Sin Pillow no hay deduplicación ni aviso de deriva, y todas las capturas se guardan.
+Índice: .cache_bot/hash_visual.json (HASH_VISUAL_INDICE).
+"""
+
+import io
+import json
+import os
+import threading
+from datetime import datetime
+
+from config.rutas import (
+    HASH_VISUAL,
+    HASH_VISUAL_INDICE,
+    HASH_VISUAL_UMBRAL_DERIVA,
+    HASH_VISUAL_UMBRAL_DUPLICADO,
+)
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+LADO_HASH = 16
+BITS_HASH = LADO_HASH * LADO_HASH
+
+_lock = threading.Lock()
+_tabla = None
+_pendientes = {}
+
+
+def disponible():
+    return HASH_VISUAL and Image is not None
+
+
+def _recortar_viewport(imagen, viewport):
+    """Franja superior con la proporción del viewport ({"width", "height"} en px CSS; vale para cualquier DPR)."""
+    if not viewport or not viewport.get("width") or not viewport.get("height"):
+        return imagen
+    alto = round(imagen.width * viewport["height"] / viewport["width"])
+    if 0 < alto < imagen.height:
+        return imagen.crop((0, 0, imagen.width, alto))
+    return imagen
+
+
+def dhash(contenido, viewport=None):
+    """
+    dHash LADO_HASHxLADO_HASH en hex: escala de grises (LADO_HASH + 1)xLADO_HASH del viewport y un bit
+    por par de píxeles vecinos (izquierdo > derecho).
+    """
+    imagen = _recortar_viewport(Image.open(io.BytesIO(contenido)), viewport)
+    imagen = imagen.convert("L").resize((LADO_HASH + 1, LADO_HASH), Image.LANCZOS)
+    pixeles = list(imagen.getdata())
+    bits = 0
+    for fila in range(LADO_HASH):
+        for columna in range(LADO_HASH):
+            izquierdo = pixeles[fila * (LADO_HASH + 1) + columna]
+            derecho = pixeles[fila * (LADO_HASH + 1) + columna + 1]
+            bits = (bits << 1) | (izquierdo > derecho)
+    return f"{bits:0{BITS_HASH // 4}x}"
+
+
+def distancia(hash_a, hash_b):
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count("1")
+
+
+def _cargar():
+    global _tabla
+    if _tabla is None:
+        try:
+            with open(HASH_VISUAL_INDICE, "r", encoding="utf-8") as archivo:
+                _tabla = json.load(archivo)
+        except (OSError, ValueError):
+            _tabla = {}
+    return _tabla
+
+
+def evaluar_captura(clave, contenido, path, id_ejecucion, registro=None, viewport=None):
+    """
+    Hashea la captura de la etapa `clave` ("<market>|<ambiente>|<etapa>") y la deja pendiente de
+    confirmar para la corrida. Si es casi idéntica a la referencia (y la imagen de la referencia sigue
+    en disco) retorna el path de la referencia: no hace falta guardarla. Si no, retorna None.
+    """
+    valor = dhash(contenido, viewport)
+    pendiente = {
+        "hash": valor,
+        "path": path,
+        "id_ejecucion": id_ejecucion,
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+    }
+    with _lock:
+        referencia = _cargar().get(clave)
+        _pendientes.setdefault(id_ejecucion, {})[clave] = pendiente
+    # Referencias de 64 bits de versiones anteriores no se comparan: la corrida deja la nueva
+    if referencia is None or len(referencia["hash"]) != len(valor):
+        return None
+
+    bits = distancia(valor, referencia["hash"])
+    if bits > HASH_VISUAL_UMBRAL_DERIVA:
+        etapa = clave.rsplit("|", 1)[-1]
+        print(
+            f"🖼️ Deriva visual en '{etapa}': {bits}/{BITS_HASH} bits vs la corrida {referencia['id_ejecucion']} "
+            f"({referencia['path']})"
+        )
+        if registro is not None:
+            registro.atributos.setdefault("deriva_visual", []).append(
+                {"etapa": etapa, "bits": bits, "referencia": referencia["id_ejecucion"], "path": path}
+            )
+    if bits > HASH_VISUAL_UMBRAL_DUPLICADO or not os.path.exists(referencia["path"]):
+        return None
+    # La captura omitida se confirma con la imagen que la representa
+    pendiente["path"] = referencia["path"]
+    return referencia["path"]
+
+
+def confirmar_referencias(id_ejecucion):
+    """La corrida terminó bien: sus hashes pasan a ser la referencia de cada etapa."""
+    with _lock:
+        capturas = _pendientes.pop(id_ejecucion, None)
+        if not capturas:
+            return
+        tabla = _cargar()
+        tabla.update(capturas)
+        try:
+            os.makedirs(os.path.dirname(HASH_VISUAL_INDICE) or ".", exist_ok=True)
+            temporal = f"{HASH_VISUAL_INDICE}.{os.getpid()}.tmp"
+            with open(temporal, "w", encoding="utf-8") as archivo:
+                json.dump(tabla, archivo, ensure_ascii=False, indent=2)
+            os.replace(temporal, HASH_VISUAL_INDICE)
+        except OSError as error:
+            print(f"⚠️ No se pudo guardar el índice visual '{HASH_VISUAL_INDICE}': {error}")
+
+
+def descartar_pendientes(id_ejecucion):
+    """La corrida falló: sus capturas no se usan como referencia."""
+    with _lock:
+        _pendientes.pop(id_ejecucion, None)
@@ -4,13 +4,21 @@ Incluye: utilidades de locator, checkpoint, modo manual y exploración de UI.
 Sin dependencias de flujo de negocio — importar desde cualquier módulo.
 """
 
+import json
 import os
 import re
 import shutil
-import time
-from datetime import datetime
+from contextlib import nullcontext
+from datetime import datetime, timedelta
 
 import core.state as state
+from config.rutas import BARRIDO_EVIDENCIAS_HORAS
+from core import cache_selectores, hash_visual
+from core.bus_control import bus_actual
+from core.almacen_evidencias import almacen
+from core.evidencias import guardar_archivo, guardar_html, guardar_screenshot, ruta_screenshot_final
+from core.snapshots import guardar_snapshot
+from core.timing import medir_sondeo, span
 
 
 _ETAPAS_ORDEN = {
@@ -23,40 +31,53 @@ _ETAPAS_ORDEN = {
 }
 
 
-def detectar_etapa_actual(page):
-    url = (page.url or "").lower()
-
+_SELECTORES_ETAPA_TARIFA = [
+    'button:has-text("Elegir vuelo")',
+    '[data-test^="is-itinerary-selectFlight"]',
+    '[data-test^="is-itinerary-selectRate"]',
+]
+_SELECTORES_ETAPA_BUSQUEDA = [
+    "#origin-id",
+    "#destination-id",
+    'button:has-text("Buscar vuelo")',
+    'button:has-text("Buscar vuelos")',
+    'button:has-text("Buscar")',
+    'button:has-text("Buscar voo")',
+    'button:has-text("Search")',
+    'button[type="submit"]',
+    '[data-test*="search"]',
+]
+
+
+def _etapa_por_url(url):
+    url = (url or "").lower()
     if "checkout" in url:
         return "CHECKOUT"
     if "passenger-detail" in url:
         return "DATOS_PASAJERO"
     if "/seats" in url or "/additional-services" in url:
         return "SELECCION_TARIFA"
+    return None
 
-    if _buscar_selector_visible(
-        page,
-        [
-            'button:has-text("Elegir vuelo")',
-            '[data-test^="is-itinerary-selectFlight"]',
-            '[data-test^="is-itinerary-selectRate"]',
-        ],
-    ):
-        return "SELECCION_TARIFA"
 
-    if _buscar_selector_visible(
-        page,
-        [
-            "#origin-id",
-            "#destination-id",
-            'button:has-text("Buscar vuelo")',
-            'button:has-text("Buscar vuelos")',
-            'button:has-text("Buscar")',
-            'button:has-text("Buscar voo")',
-            'button:has-text("Search")',
-            'button[type="submit"]',
-            '[data-test*="search"]',
-        ],
-    ):
+@medir_sondeo
+def detectar_etapa_actual(page):
+    etapa_url = _etapa_por_url(page.url)
+    if etapa_url:
+        return etapa_url
+
+    # Etapa empujada por el MutationObserver de core/stage_tracker.py (sin round-trip).
+    from core.stage_tracker import etapa_cacheada
+
+    etapa = etapa_cacheada(page)
+    if etapa:
+        return etapa
+
+    # Un solo round-trip para los 12 selectores de etapa.
+    visibles = _mapa_selectores_visibles(page, _SELECTORES_ETAPA_TARIFA + _SELECTORES_ETAPA_BUSQUEDA)
+    if any(visibles[selector] for selector in _SELECTORES_ETAPA_TARIFA):
+        return "SELECCION_TARIFA"
+    if any(visibles[selector] for selector in _SELECTORES_ETAPA_BUSQUEDA):
         return "BUSQUEDA"
 
     return "DESCONOCIDA"
@@ -66,6 +87,9 @@ def etapa_en_o_despues(etapa_actual, etapa_referencia):
     return _ETAPAS_ORDEN.get(etapa_actual, 0) >= _ETAPAS_ORDEN.get(etapa_referencia, 0)
 
 
+_ESPERA_CONTINUAR_BUS_MS = 50
+
+
 def _control_path(nombre):
     control_dir = state.CFG.get("control_dir")
     if not control_dir:
@@ -93,31 +117,64 @@ def _remove_control_file(nombre):
         return
 
 
-def gestionar_pausa_edicion(page, contexto=""):
+def _pausa_solicitada():
+    bus = bus_actual()
+    if bus is not None:
+        return bus.pausa_solicitada()
     pause_request = _control_path("pause.request")
-    if not pause_request or not os.path.exists(pause_request):
-        return detectar_etapa_actual(page)
+    return bool(pause_request) and os.path.exists(pause_request)
 
-    etapa_actual = detectar_etapa_actual(page)
-    _remove_control_file("pause.request")
-    _remove_control_file("continue.request")
+
+def _marcar_pausado(page, etapa_actual, contexto):
+    """paused.state para clientes de --control-dir y evento 'pausado' para la GUI conectada al bus."""
     _write_control_file(
         "paused.state",
         f"stage={etapa_actual}\nurl={page.url}\ncontext={contexto}\ntimestamp={datetime.now().isoformat()}\n",
     )
-    print(f"⏸️ Pausa para edición activada ({contexto or 'sin contexto'}).")
-    print(f"🖱️ Etapa actual detectada: {etapa_actual}")
-    print("▶️ Esperando 'Continuar' desde la GUI...")
+    bus = bus_actual()
+    if bus is not None:
+        bus.marcar_pausado(etapa_actual, page.url, contexto)
 
+
+def _esperar_continuar(page):
+    """Bloquea hasta 'Continuar' (evento del bus o continue.request) y retorna la etapa detectada al salir."""
+    bus = bus_actual()
     while True:
+        state.verificar_cancelacion()
+        if bus is not None:
+            if bus.continuar_solicitado():
+                break
+            # Cortes breves: el Event se activa desde el hilo del bus y Playwright sigue atendiendo eventos
+            page.wait_for_timeout(_ESPERA_CONTINUAR_BUS_MS)
+            continue
         continue_request = _control_path("continue.request")
         if continue_request and os.path.exists(continue_request):
-            _remove_control_file("continue.request")
-            _remove_control_file("paused.state")
-            etapa_reanudada = detectar_etapa_actual(page)
-            print(f"▶️ Continuando ejecución desde etapa detectada: {etapa_reanudada}")
-            return etapa_reanudada
+            break
         page.wait_for_timeout(250)
+    _remove_control_file("continue.request")
+    _remove_control_file("paused.state")
+    etapa_reanudada = detectar_etapa_actual(page)
+    if bus is not None:
+        bus.marcar_reanudado(etapa_reanudada)
+    return etapa_reanudada
+
+
+def gestionar_pausa_edicion(page, contexto=""):
+    if not _pausa_solicitada():
+        return detectar_etapa_actual(page)
+
+    etapa_actual = detectar_etapa_actual(page)
+    _remove_control_file("pause.request")
+    _remove_control_file("continue.request")
+    _marcar_pausado(page, etapa_actual, contexto)
+    print(f"⏸️ Pausa para edición activada ({contexto or 'sin contexto'}).")
+    print(f"🖱️ Etapa actual detectada: {etapa_actual}")
+    print("▶️ Esperando 'Continuar' desde la GUI...")
+
+    with span("pausa_edicion", contexto=contexto, etapa=etapa_actual):
+        etapa_reanudada = _esperar_continuar(page)
+    print(f"▶️ Continuando ejecución desde etapa detectada: {etapa_reanudada}")
+    return etapa_reanudada
 
 
 def esperar_correccion_runtime(page, motivo=""):
@@ -125,27 +182,19 @@ def esperar_correccion_runtime(page, motivo=""):
     print(f"🛠️ Corrección en runtime activada ({motivo or 'sin motivo'}).")
     print(f"🖱️ Etapa actual detectada: {etapa_actual}")
 
-    if state.CFG.get("control_dir"):
-        _remove_control_file("continue.request")
-        _write_control_file(
-            "paused.state",
-            f"stage={etapa_actual}\nurl={page.url}\ncontext=recovery:{motivo}\ntimestamp={datetime.now().isoformat()}\n",
-        )
-        print("▶️ Corrige lo necesario en el navegador y presiona 'Continuar' en la GUI.")
-        while True:
-            continue_request = _control_path("continue.request")
-            if continue_request and os.path.exists(continue_request):
-                _remove_control_file("continue.request")
-                _remove_control_file("paused.state")
-                etapa_reanudada = detectar_etapa_actual(page)
-                print(f"▶️ Reintentando desde etapa detectada: {etapa_reanudada}")
-                return etapa_reanudada
-            page.wait_for_timeout(250)
-
+    # En headless no hay navegador visible que corregir (ej: workers de matrix.py con control_dir propio).
     if state.CFG.get("headless"):
         print("ℹ️ Headless activo: no se puede corregir manualmente en runtime.")
         return etapa_actual
 
+    if state.CFG.get("control_dir"):
+        _remove_control_file("continue.request")
+        _marcar_pausado(page, etapa_actual, f"recovery:{motivo}")
+        print("▶️ Corrige lo necesario en el navegador y presiona 'Continuar' en la GUI.")
+        etapa_reanudada = _esperar_continuar(page)
+        print(f"▶️ Reintentando desde etapa detectada: {etapa_reanudada}")
+        return etapa_reanudada
+
     print("▶️ Corrige lo necesario en el navegador y presiona 'Resume' en el inspector.")
     page.pause()
     etapa_reanudada = detectar_etapa_actual(page)
@@ -158,7 +207,8 @@ def esperar_correccion_runtime(page, motivo=""):
 # ==========================================
 
 def pausar_en_checkpoint(page, checkpoint_actual):
-    """Pausa el bot si se alcanza el checkpoint configurado."""
+    """Guarda el snapshot del checkpoint y pausa el bot si es el checkpoint configurado."""
+    guardar_snapshot(page, checkpoint_actual)
     if state.CFG["checkpoint"] == checkpoint_actual:
         print(f"\n⏸️  CHECKPOINT ALCANZADO: {checkpoint_actual}")
         print("🖱️  Puedes interactuar manualmente con la página.")
@@ -187,53 +237,109 @@ def _activar_modo_manual(page):
 # EXPLORACIÓN DE UI
 # ==========================================
 
+def _snapshot_ui(page, limite=None):
+    """
+    Elementos visibles interactivos y títulos de la página en un solo page.evaluate:
+    [{tag, rol, texto, aria_label, data_test, id, name, tipo, placeholder, deshabilitado, caja}, ...].
+    No incluye el valor de los inputs (tarjeta, documento, ...).
+    """
+    limite = limite or _LIMITE_SNAPSHOT_UI
+    return page.evaluate(_JS_SNAPSHOT_UI, {"selector": _SELECTOR_SNAPSHOT_UI, "limite": limite})
+
+
+def _resumen_snapshot_ui(elementos):
+    """Listas del reporte anterior (títulos, labels, botones, aria-labels de '+') derivadas del snapshot."""
+    def valores(filtro, campo="texto"):
+        vistos = []
+        for elemento in elementos:
+            valor = elemento.get(campo)
+            if valor and filtro(elemento) and valor not in vistos:
+                vistos.append(valor)
+        return vistos
+
+    patron_sumar = re.compile(r"aumentar|increase|adicionar|m[aá]s", re.IGNORECASE)
+    return {
+        "titulos": valores(lambda el: el["tag"] in {"h1", "h2", "h3", "h4"}),
+        "labels": valores(lambda el: el["tag"] == "label"),
+        "botones": valores(lambda el: el["tag"] == "button"),
+        "aria_labels_sumar": valores(
+            lambda el: el["tag"] == "button" and patron_sumar.search(el.get("aria_label") or ""),
+            campo="aria_label",
+        ),
+    }
+
+
+def _escribir_meta_exploracion():
+    """meta.json de la carpeta de exploración (una vez por corrida): market/ambiente para tools.diff_exploracion."""
+    path = os.path.join(state.EXPLORACION_DIR, "meta.json")
+    if os.path.exists(path):
+        return
+    meta = {
+        "id_ejecucion": state.EXPLORACION_RUN_ID,
+        "market": state.CFG.get("market"),
+        "ambiente": state.CFG.get("ambiente"),
+        "url": state.CFG.get("url"),
+        "tipo_viaje": state.CFG.get("tipo_viaje"),
+        "inicio": datetime.now().isoformat(timespec="seconds"),
+    }
+    with open(path, "w", encoding="utf-8") as archivo:
+        json.dump(meta, archivo, ensure_ascii=False, indent=2)
+
+
+def _serializar_reporte_ui(screenshot_path):
+    """
+    Para el hilo de escritura: completa el reporte con la imagen que efectivamente quedó en disco
+    (la referencia si el hash visual omitió la captura) y lo serializa.
+    """
+
+    def procesar(reporte):
+        screenshot = ruta_screenshot_final(screenshot_path) if screenshot_path else None
+        reporte["screenshot"] = screenshot
+        reporte["screenshot_es_referencia"] = screenshot is not None and screenshot != screenshot_path
+        return json.dumps(reporte, ensure_ascii=False, indent=2)
+
+    return procesar
+
+
 def _capturar_estado_ui(page, etapa):
     if not state.CFG.get("modo_exploracion"):
         return
 
     os.makedirs(state.EXPLORACION_DIR, exist_ok=True)
+    _escribir_meta_exploracion()
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     prefijo = os.path.join(state.EXPLORACION_DIR, f"{timestamp}_{etapa}")
 
     screenshot_path = f"{prefijo}.png"
-    reporte_path = f"{prefijo}.txt"
+    reporte_path = f"{prefijo}.json"
 
     try:
-        page.screenshot(path=screenshot_path, full_page=True)
+        screenshot_path = guardar_screenshot(page, screenshot_path, "exploracion", etapa_visual=etapa)
     except Exception as error:
         print(f"⚠️ Exploración: no se pudo guardar screenshot en etapa '{etapa}': {error}")
+        screenshot_path = None
 
-    labels = _listar_textos_visibles(page.locator("label"))
-    botones = _listar_textos_visibles(page.locator("button"))
-    titulos = _listar_textos_visibles(page.locator("h1, h2, h3, h4"))
-    aria_sumar = _listar_aria_labels(
-        page.locator(
-            'button[aria-label*="Aumentar"], '
-            'button[aria-label*="Increase"], '
-            'button[aria-label*="Adicionar"], '
-            'button[aria-label*="Más"], '
-            'button[aria-label*="Mas"]',
-        )
-    )
-
-    with open(reporte_path, "w", encoding="utf-8") as archivo:
-        archivo.write(f"etapa: {etapa}\n")
-        archivo.write(f"url: {page.url}\n\n")
-        archivo.write("titulos_visibles:\n")
-        for valor in titulos:
-            archivo.write(f"- {valor}\n")
-        archivo.write("\nlabels_visibles:\n")
-        for valor in labels:
-            archivo.write(f"- {valor}\n")
-        archivo.write("\nbotones_visibles:\n")
-        for valor in botones:
-            archivo.write(f"- {valor}\n")
-        archivo.write("\naria_labels_sumar:\n")
-        for valor in aria_sumar:
-            archivo.write(f"- {valor}\n")
-
-    print(f"🧪 Exploración UI [{etapa}] -> {screenshot_path}")
-    print(f"🧾 Reporte UI [{etapa}] -> {reporte_path}")
+    try:
+        snapshot = _snapshot_ui(page)
+    except Exception as error:
+        print(f"⚠️ Exploración: no se pudo leer el DOM en etapa '{etapa}': {error}")
+        snapshot = {"titulo": None, "viewport": None, "truncado": False, "elementos": []}
+
+    reporte = {
+        "etapa": etapa,
+        "url": page.url,
+        "capturado": datetime.now().isoformat(timespec="seconds"),
+        **snapshot,
+        "resumen": _resumen_snapshot_ui(snapshot["elementos"]),
+    }
+    guardar_archivo(reporte_path, reporte, "reporte UI", _serializar_reporte_ui(screenshot_path))
+
+    if screenshot_path and hash_visual.disponible():
+        # El hash corre en el hilo de escritura: si la omite, el reporte apunta a la imagen de la referencia
+        print(f"🧪 Exploración UI [{etapa}] -> {screenshot_path} (o su referencia si es casi idéntica)")
+    elif screenshot_path:
+        print(f"🧪 Exploración UI [{etapa}] -> {screenshot_path}")
+    print(f"🧾 Reporte UI [{etapa}] -> {reporte_path} ({len(snapshot['elementos'])} elementos)")
 
 
 def _guardar_html_debug(page, etapa):
@@ -242,8 +348,7 @@ def _guardar_html_debug(page, etapa):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     html_path = os.path.join(base_dir, f"{timestamp}_{etapa}.html")
     try:
-        with open(html_path, "w", encoding="utf-8") as archivo:
-            archivo.write(page.content())
+        html_path = guardar_html(page, html_path)
         print(f"🧾 HTML debug [{etapa}] -> {html_path}")
     except Exception as error:
         print(f"⚠️ No se pudo guardar HTML debug [{etapa}]: {error}")
@@ -280,21 +385,19 @@ def _formatear_bytes(cantidad):
     return f"{cantidad} B"
 
 
-def limpiar_evidencias_antiguas(base_dir="screenshots_pruebas", semanas_retencion=2, habilitado=True):
-    if not habilitado or semanas_retencion <= 0:
-        return
-
-    if not os.path.isdir(base_dir):
-        return
-
-    limite = time.time() - (semanas_retencion * 7 * 24 * 60 * 60)
+def _barrer_evidencias_sin_indice(base_dir, limite, indice):
+    """
+    Borra entradas de primer nivel con mtime < `limite` (archivos fuera del almacén: timelines, resúmenes, ...).
+    Lo que está en el índice se salta: es un hardlink con el mtime de su blob y vence por `creado`.
+    """
     eliminados = 0
     recuperado_bytes = 0
     errores = 0
-
     for entrada in os.scandir(base_dir):
+        if entrada.name.startswith("."):
+            continue
         try:
-            if entrada.stat().st_mtime >= limite:
+            if entrada.stat().st_mtime >= limite or indice.indexado(entrada.path):
                 continue
 
             recuperado_bytes += _tamano_ruta_bytes(entrada.path)
@@ -306,6 +409,35 @@ def limpiar_evidencias_antiguas(base_dir="screenshots_pruebas", semanas_retencio
         except Exception as error:
             errores += 1
             print(f"⚠️ No se pudo limpiar evidencia antigua '{entrada.path}': {error}")
+    return eliminados, recuperado_bytes, errores
+
+
+def limpiar_evidencias_antiguas(base_dir="screenshots_pruebas", semanas_retencion=2, habilitado=True):
+    """
+    Retención en dos pasos: las evidencias del almacén (core/almacen_evidencias.py) se vencen con una
+    consulta al índice en cada corrida; el barrido de archivos fuera del índice recorre `base_dir`
+    a lo sumo una vez cada BARRIDO_EVIDENCIAS_HORAS.
+    """
+    if not habilitado or semanas_retencion <= 0:
+        return
+
+    if not os.path.isdir(base_dir):
+        return
+
+    limite = datetime.now() - timedelta(weeks=semanas_retencion)
+    indice = almacen(base_dir)
+    eliminados, recuperado_bytes = indice.eliminar_vencidas(limite)
+    errores = 0
+
+    ultimo_barrido = indice.leer_meta("ultimo_barrido")
+    proximo_barrido = (
+        datetime.fromisoformat(ultimo_barrido) + timedelta(hours=BARRIDO_EVIDENCIAS_HORAS) if ultimo_barrido else None
+    )
+    if proximo_barrido is None or datetime.now() >= proximo_barrido:
+        barridos, bytes_barridos, errores = _barrer_evidencias_sin_indice(base_dir, limite.timestamp(), indice)
+        eliminados += barridos
+        recuperado_bytes += bytes_barridos
+        indice.escribir_meta("ultimo_barrido", datetime.now().isoformat(timespec="seconds"))
 
     if eliminados:
         print(
@@ -324,57 +456,316 @@ def _normalizar_texto(texto):
     return " ".join((texto or "").split())
 
 
-def _listar_valores_visibles(locator, extractor, limite=25):
-    valores = []
+# ------------------------------------------
+# Sondeo de visibilidad en lote
+# ------------------------------------------
+# Cada count()/nth()/is_visible() es un round-trip CDP. Estas funciones resuelven
+# una lista completa de selectores en un solo page.evaluate (o un evaluate_all por
+# locator). La visibilidad replica la de Playwright: bounding box no vacío y sin
+# visibility:hidden. Selectores con sintaxis propia de Playwright que no se pueden
+# traducir a CSS (":text()", "text=", ">>", ":has-text" intermedio...) caen al
+# camino por locator, que sigue siendo un solo round-trip.
+# Los locators de Playwright atraviesan shadow roots abiertos y querySelectorAll no:
+# el lote también busca en ellos y, si un selector coincide dentro de alguno, lo deja
+# en None (camino por locator) porque su índice en el documento no sería el de nth().
+
+_JS_ES_VISIBLE = """
+    const esVisible = (el) => {
+        const rect = el.getBoundingClientRect();
+        if (!(rect.width > 0 && rect.height > 0)) return false;
+        return getComputedStyle(el).visibility !== "hidden";
+    };
+"""
+
+# Shadow roots abiertos del documento en window.__skySombras: se recorren una vez por documento y
+# desde ahí attachShadow los registra (y avisa a window.__skyObservarSombra, ver core/stage_tracker.py).
+# Cada consulta descarta los de hosts desconectados. Los shadow roots declarativos que el parser cree después
+# del primer recorrido no pasan por attachShadow y no quedan registrados.
+_JS_REGISTRO_SOMBRAS = """
+    const registroSombras = () => {
+        if (!window.__skySombras) {
+            const sombras = [];
+            for (let pendientes = [document]; pendientes.length;) {
+                for (const el of pendientes.pop().querySelectorAll("*")) {
+                    if (el.shadowRoot) {
+                        sombras.push(el.shadowRoot);
+                        pendientes.push(el.shadowRoot);
+                    }
+                }
+            }
+            window.__skySombras = sombras;
+            const attachShadow = Element.prototype.attachShadow;
+            Element.prototype.attachShadow = function (...args) {
+                const raiz = attachShadow.apply(this, args);
+                if (raiz.mode === "open") {
+                    window.__skySombras.push(raiz);
+                    if (window.__skyObservarSombra) window.__skyObservarSombra(raiz);
+                }
+                return raiz;
+            };
+        }
+        window.__skySombras = window.__skySombras.filter((raiz) => raiz.host.isConnected);
+        return window.__skySombras;
+    };
+"""
+
+_JS_VISIBLES_LOCATOR = "(elementos) => {" + _JS_ES_VISIBLE + "return elementos.map(esVisible); }"
+
+_JS_SONDEO_SELECTORES = "(specs) => {" + _JS_ES_VISIBLE + _JS_REGISTRO_SOMBRAS + """
+    const normalizar = (texto) => (texto || "").replace(/\\s+/g, " ").trim().toLowerCase();
+    const coincidencias = (raiz, alternativas) => {
+        const nodos = new Set();
+        for (const [css, texto] of alternativas) {
+            for (const el of raiz.querySelectorAll(css)) {
+                if (texto === null || normalizar(el.textContent).includes(texto)) nodos.add(el);
+            }
+        }
+        return nodos;
+    };
+    // Sin recorrer el DOM: el registro se arma una vez por documento (sin shadow roots queda vacío)
+    const sombras = registroSombras();
+    return specs.map((alternativas) => {
+        try {
+            if (sombras.some((raiz) => coincidencias(raiz, alternativas).size)) return null;
+            const ordenados = Array.from(coincidencias(document, alternativas)).sort((a, b) =>
+                a === b ? 0 : (a.compareDocumentPosition(b) & Node.DOCUMENT_POSITION_FOLLOWING ? -1 : 1)
+            );
+            return ordenados.findIndex(esVisible);
+        } catch (error) {
+            return null;
+        }
+    });
+}"""
+
+# Snapshot de exploración: todo lo interactivo + títulos, con rol implícito por tag como en ARIA
+_LIMITE_SNAPSHOT_UI = 400
+_SELECTOR_SNAPSHOT_UI = (
+    "h1, h2, h3, h4, label, button, a[href], input:not([type=hidden]), select, textarea, "
+    "[role], [data-test], [aria-label], [tabindex]:not([tabindex='-1'])"
+)
+_JS_SNAPSHOT_UI = "({ selector, limite }) => {" + _JS_ES_VISIBLE + """
+    const normalizar = (texto) => (texto || "").replace(/\\s+/g, " ").trim();
+    const rolesPorTag = {
+        a: "link", button: "button", select: "combobox", textarea: "textbox", label: "label",
+        h1: "heading", h2: "heading", h3: "heading", h4: "heading",
+    };
+    const rolesPorTipo = { checkbox: "checkbox", radio: "radio", button: "button", submit: "button" };
+    const elementos = [];
+    let truncado = false;
+    for (const el of document.querySelectorAll(selector)) {
+        if (!esVisible(el)) continue;
+        if (elementos.length >= limite) { truncado = true; break; }
+        const tag = el.tagName.toLowerCase();
+        const tipo = el.getAttribute("type");
+        const caja = el.getBoundingClientRect();
+        const rolImplicito = tag === "input" ? rolesPorTipo[tipo] || "textbox" : rolesPorTag[tag] || null;
+        elementos.push({
+            tag,
+            rol: el.getAttribute("role") || rolImplicito,
+            texto: normalizar(el.innerText).slice(0, 200) || null,
+            aria_label: el.getAttribute("aria-label"),
+            data_test: el.getAttribute("data-test") || el.getAttribute("data-testid"),
+            id: el.id || null,
+            name: el.getAttribute("name"),
+            tipo,
+            placeholder: el.getAttribute("placeholder"),
+            deshabilitado: el.disabled === true || el.getAttribute("aria-disabled") === "true",
+            caja: {
+                x: Math.round(caja.x + scrollX), y: Math.round(caja.y + scrollY),
+                ancho: Math.round(caja.width), alto: Math.round(caja.height),
+            },
+        });
+    }
+    return {
+        titulo: document.title,
+        viewport: { ancho: innerWidth, alto: innerHeight },
+        truncado,
+        elementos,
+    };
+}"""
+
+_PSEUDOS_PLAYWRIGHT = (
+    ":has-text(",
+    ":text(",
+    ":text-is(",
+    ":text-matches(",
+    ":visible",
+    ":nth-match(",
+    ":left-of(",
+    ":right-of(",
+    ":above(",
+    ":below(",
+    ":near(",
+    ">>",
+    "=",
+)
+_RE_HAS_TEXT_FINAL = re.compile(r"^(?P<css>.*?):has-text\((?P<comilla>[\"'])(?P<texto>(?:(?!(?P=comilla)).)*)(?P=comilla)\)$", re.DOTALL)
+
+
+def _dividir_lista_selectores(selector):
+    """Divide 'a, b:has(c, d)' en alternativas de primer nivel respetando comillas y paréntesis."""
+    partes = []
+    actual = []
+    profundidad = 0
+    comilla = None
+    for caracter in selector:
+        if comilla:
+            if caracter == comilla:
+                comilla = None
+        elif caracter in "\"'":
+            comilla = caracter
+        elif caracter in "([":
+            profundidad += 1
+        elif caracter in ")]":
+            profundidad -= 1
+        elif caracter == "," and profundidad == 0:
+            partes.append("".join(actual).strip())
+            actual = []
+            continue
+        actual.append(caracter)
+    partes.append("".join(actual).strip())
+    return [parte for parte in partes if parte]
+
+
+def _contiene_sintaxis_playwright(css):
+    sin_atributos = re.sub(r"\[[^\]]*\]", "", css)
+    return any(pseudo in sin_atributos for pseudo in _PSEUDOS_PLAYWRIGHT)
+
+
+def _traducir_selector(selector):
+    """
+    Traduce un selector Playwright a [[css, texto|None], ...] evaluable con querySelectorAll.
+    Soporta CSS puro y un ':has-text("...")' final por alternativa. Retorna None si no aplica.
+    """
+    alternativas = []
+    for parte in _dividir_lista_selectores(selector):
+        texto = None
+        coincidencia = _RE_HAS_TEXT_FINAL.match(parte)
+        if coincidencia:
+            parte = coincidencia.group("css").strip() or "*"
+            texto = _normalizar_texto(coincidencia.group("texto")).lower()
+        if _contiene_sintaxis_playwright(parte):
+            return None
+        alternativas.append([parte, texto])
+    return alternativas or None
+
+
+def _buscar_visible_secuencial(locator):
     try:
-        cantidad = min(locator.count(), limite)
+        cantidad = locator.count()
     except Exception:
-        return valores
+        return None
 
     for indice in range(cantidad):
         item = locator.nth(indice)
         try:
-            if not item.is_visible():
-                continue
-            valor = _normalizar_texto(extractor(item))
-            if valor and valor not in valores:
-                valores.append(valor)
+            if item.is_visible():
+                return item
         except Exception:
             continue
-    return valores
-
-
-def _listar_textos_visibles(locator, limite=25):
-    return _listar_valores_visibles(locator, lambda item: item.inner_text(), limite)
-
-
-def _listar_aria_labels(locator, limite=25):
-    return _listar_valores_visibles(locator, lambda item: item.get_attribute("aria-label"), limite)
+    return None
 
 
+@medir_sondeo
 def _buscar_visible(locator):
     """Retorna el primer elemento visible de un locator o None."""
     try:
-        cantidad = locator.count()
+        visibles = locator.evaluate_all(_JS_VISIBLES_LOCATOR)
     except Exception:
-        return None
+        return _buscar_visible_secuencial(locator)
 
-    for indice in range(cantidad):
-        item = locator.nth(indice)
-        try:
-            if item.is_visible():
-                return item
-        except Exception:
-            continue
+    for indice, visible in enumerate(visibles):
+        if visible:
+            return locator.nth(indice)
     return None
 
 
-def _buscar_selector_visible(page, selectores):
+def _indices_primer_visible(page, selectores):
+    """
+    Retorna {selector: índice del primer elemento visible | -1 | None} en un solo page.evaluate.
+    None indica que el selector no se pudo resolver en lote (no traducible a CSS o con coincidencias
+    dentro de un shadow root abierto): se debe sondear por locator.
+    """
+    traducidos = {selector: _traducir_selector(selector) for selector in selectores}
+    en_lote = [selector for selector in selectores if traducidos[selector]]
+    resultado = {selector: None for selector in selectores}
+    if not en_lote:
+        return resultado
+    try:
+        indices = page.evaluate(_JS_SONDEO_SELECTORES, [traducidos[selector] for selector in en_lote])
+    except Exception:
+        return resultado
+    for selector, indice in zip(en_lote, indices):
+        resultado[selector] = indice
+    return resultado
+
+
+def _resolver_sondeo(page, selectores, indices, ausentes=None):
+    """Retorna (selector ganador, elemento) o (None, None); suma a `ausentes` lo sondeado por locator sin éxito."""
     for selector in selectores:
-        item = _buscar_visible(page.locator(selector))
-        if item:
-            return item
-    return None
+        indice = indices.get(selector)
+        if indice is None:
+            item = _buscar_visible(page.locator(selector))
+            if item:
+                return selector, item
+            if ausentes is not None:
+                ausentes.add(selector)
+        elif indice >= 0:
+            return selector, page.locator(selector).nth(indice)
+    return None, None
+
+
+def _visible_en_lote(indices, selector):
+    indice = indices.get(selector)
+    return indice is not None and indice >= 0
+
+
+@medir_sondeo
+def _sondear_selectores(page, selectores, cache=None):
+    """
+    Retorna (elemento, selector ganador, ausentes) para `selectores` en orden de prioridad.
+    Con `cache="<helper>"` los ganadores previos del helper se prueban primero (core/cache_selectores.py),
+    pero nunca por delante de un selector de mayor prioridad que el lote ve visible: en ese caso gana
+    el de mayor prioridad y el aprendido queda en `ausentes`. `ausentes` son los selectores sondeados
+    que no sirvieron; el llamador los pasa a cache_selectores.registrar() después de actuar con éxito.
+    """
+    selectores = list(selectores)
+    orden = cache_selectores.ordenar(cache, selectores) if cache else selectores
+    indices = _indices_primer_visible(page, selectores)
+    ausentes = {selector for selector, indice in indices.items() if indice is not None and indice < 0}
+    ganador, item = _resolver_sondeo(page, orden, indices, ausentes)
+    if ganador is not None and orden != selectores:
+        previo = next(
+            (selector for selector in selectores[: selectores.index(ganador)] if _visible_en_lote(indices, selector)),
+            None,
+        )
+        if previo is not None:
+            ausentes.add(ganador)
+            ganador, item = previo, page.locator(previo).nth(indices[previo])
+    return item, ganador, ausentes
+
+
+def _buscar_selector_visible(page, selectores, cache=None):
+    """
+    Primer elemento visible según el orden de prioridad de `selectores` (un round-trip en el caso común).
+    `cache` solo reordena el sondeo (ver _sondear_selectores); no registra ganadores.
+    """
+    return _sondear_selectores(page, selectores, cache=cache)[0]
+
+
+@medir_sondeo
+def _mapa_selectores_visibles(page, selectores):
+    """Retorna {selector: bool} indicando qué selectores tienen al menos un elemento visible."""
+    selectores = list(selectores)
+    indices = _indices_primer_visible(page, selectores)
+    mapa = {}
+    for selector in selectores:
+        indice = indices[selector]
+        if indice is None:
+            mapa[selector] = _buscar_visible(page.locator(selector)) is not None
+        else:
+            mapa[selector] = indice >= 0
+    return mapa
 
 
 def _error_transitorio_locator(error):
@@ -390,23 +781,27 @@ def _error_transitorio_locator(error):
     )
 
 
-def _click_selector_visible(page, selectores, force=False, descripcion=None, requerido=False):
+def _click_selector_visible(page, selectores, force=False, descripcion=None, requerido=False, cache=None):
     ultimo_error = None
-    for _ in range(3):
-        item = _buscar_selector_visible(page, selectores)
-        if not item:
-            if requerido:
-                raise RuntimeError(f"No se encontró elemento visible: {descripcion or selectores}")
-            return False
-        try:
-            item.scroll_into_view_if_needed()
-            item.click(force=force)
-            return True
-        except Exception as error:
-            ultimo_error = error
-            if not _error_transitorio_locator(error):
-                raise
-            page.wait_for_timeout(150)
+    for intento in range(3):
+        # Solo los reintentos abren span: el primer intento es el camino normal y no aporta al trace.
+        with span("reintento_click", intento=intento, descripcion=descripcion) if intento else nullcontext():
+            item, ganador, ausentes = _sondear_selectores(page, selectores, cache=cache)
+            if not item:
+                if requerido:
+                    raise RuntimeError(f"No se encontró elemento visible: {descripcion or selectores}")
+                return False
+            try:
+                item.scroll_into_view_if_needed()
+                item.click(force=force)
+                if cache:
+                    cache_selectores.registrar(cache, selectores, ganador, ausentes)
+                return True
+            except Exception as error:
+                ultimo_error = error
+                if not _error_transitorio_locator(error):
+                    raise
+                page.wait_for_timeout(150)
 
     if requerido and ultimo_error:
         raise RuntimeError(f"No se pudo clickear elemento visible: {descripcion or selectores} ({ultimo_error})")
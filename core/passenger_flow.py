@@ -24,6 +24,9 @@ from core.helpers import (
     pausar_en_checkpoint,
 )
 from core.search_flow import _saltar_extras, _seleccionar_opcion_dropdown
+from core.stage_tracker import esperar_transicion
+from core.timing import medir
+from core.waits import esperar_red_inactiva
 
 
 # (selector, clave en pasajero, label para warning)
@@ -38,6 +41,7 @@ _DROPDOWNS_PASAJERO = [
 # AVANCE ENTRE ETAPAS
 # ==========================================
 
+@medir()
 def _esperar_o_avanzar_hasta_pasajeros(page, timeout_ms=60000):
     deadline = time.monotonic() + timeout_ms / 1000
 
@@ -49,7 +53,7 @@ def _esperar_o_avanzar_hasta_pasajeros(page, timeout_ms=60000):
 
         if detectar_etapa_actual(page) == "SELECCION_TARIFA":
             _saltar_extras(page, verbose=False)
-        page.wait_for_timeout(1200)
+        esperar_transicion(page, 1200)
 
     raise RuntimeError(
         f"No se pudo avanzar a passenger-detail/checkout dentro de {timeout_ms}ms. URL actual: {page.url}",
@@ -57,6 +61,7 @@ def _esperar_o_avanzar_hasta_pasajeros(page, timeout_ms=60000):
 
 
 
+@medir()
 def _avanzar_a_checkout(page, timeout_ms=60000):
     deadline = time.monotonic() + timeout_ms / 1000
 
@@ -91,7 +96,7 @@ def _avanzar_a_checkout(page, timeout_ms=60000):
             force=True,
         )
 
-        page.wait_for_timeout(1200)
+        esperar_transicion(page, 1200)
 
     _guardar_html_debug(page, "bloqueo_checkout")
     return False
@@ -289,6 +294,7 @@ def _forzar_guardado_tarjetas_pasajero(page, pasajeros):
         page.wait_for_timeout(500)
 
 
+@medir()
 def _rellenar_pasajero(page, pasajero, indice, total):
     print(f"--- Pasajero {indice}/{total} ({pasajero.get('tipo_pasajero', 'ADT')}) ---")
     _abrir_tarjeta_pasajero(page, pasajero, indice)
@@ -336,9 +342,10 @@ def _rellenar_pasajero(page, pasajero, indice, total):
     if not guardado:
         raise RuntimeError(f"No se pudo guardar los datos del pasajero {indice}.")
 
-    page.wait_for_timeout(900)
+    esperar_red_inactiva(page, tope_ms=900, ventana_ms=300)
 
 
+@medir()
 def _rellenar_todos_los_pasajeros(page):
     pasajeros = state.CFG["pasajeros_lista"]
     total = len(pasajeros)
@@ -349,7 +356,7 @@ def _rellenar_todos_los_pasajeros(page):
         return
 
     expect(page).to_have_url(re.compile(".*passenger-detail"), timeout=20000)
-    page.wait_for_timeout(1500)
+    esperar_red_inactiva(page, tope_ms=1500)
 
     if pausar_en_checkpoint(page, "LLEGADA_DATOS_PASAJERO"):
         return
@@ -15,13 +15,24 @@ import time
 from playwright.sync_api import expect
 
 import core.state as state
+from config.pago import DOMINIOS_PASARELA_POR_MARKET
+from core import cache_selectores
 from core.helpers import (
     _buscar_selector_visible,
     _click_selector_visible,
     _normalizar_texto,
+    _sondear_selectores,
     gestionar_pausa_edicion,
     pausar_en_checkpoint,
 )
+from core.evidencias import guardar_screenshot, ruta_evidencia
+from core.timing import medir
+from core.waits import esperar_estable, esperar_listo, esperar_red_inactiva
+
+# iframe del formulario Niubiz (dominios de la pasarela PE o name con "niubiz")
+_SELECTOR_IFRAME_NIUBIZ = ", ".join(
+    [f'iframe[src*="{dominio}"]' for dominio in DOMINIOS_PASARELA_POR_MARKET["PE"]] + ['iframe[name*="niubiz" i]']
+)
 
 
 # ==========================================
@@ -39,12 +50,12 @@ def _esperar_selector_pago(page, selectores, timeout_ms=20000, contexto="esperan
     return None
 
 
-def _click_selector_pago(page, selectores, timeout_ms=15000, force=True, descripcion=None):
+def _click_selector_pago(page, selectores, timeout_ms=15000, force=True, descripcion=None, cache=None):
     deadline = time.monotonic() + timeout_ms / 1000
     ultimo_error = None
     while time.monotonic() < deadline:
         gestionar_pausa_edicion(page, f"click_{descripcion or 'selector_pago'}")
-        item = _buscar_selector_visible(page, selectores)
+        item, ganador, ausentes = _sondear_selectores(page, selectores, cache=cache)
         if item:
             try:
                 item.scroll_into_view_if_needed()
@@ -52,6 +63,8 @@ def _click_selector_pago(page, selectores, timeout_ms=15000, force=True, descrip
                 pass
             try:
                 item.click(force=force, timeout=2500)
+                if cache:
+                    cache_selectores.registrar(cache, selectores, ganador, ausentes)
                 return True
             except Exception as error:
                 ultimo_error = error
@@ -197,6 +210,7 @@ def _esperar_medio_pago_visible(page, nombre_medio, timeout_ms=45000):
     return None
 
 
+@medir()
 def _seleccionar_medio_pago(page, nombre_medio, contenedor_selector=None, radio_selector=None):
     item = _esperar_medio_pago_visible(page, nombre_medio)
     if not item:
@@ -261,26 +275,28 @@ def _buscar_campo_tarjeta(page):
     return input_tarjeta
 
 
+@medir()
 def _finalizar_compra(page, boton_texto="Ir a pagar"):
     """Checkbox T&C + botón de pago."""
     print("--- Finalizando Compra ---")
 
     print("✅ Buscando checkbox...")
-    checkbox_encontrado = any(
-        _click_selector_visible(
-            page,
-            selectores,
-            force=True,
-            requerido=False,
-        )
-        for selectores in (
-            [".checkbox_icon"],
-            ['label:has(.checkbox_icon)'],
-            ['label:has-text("Acepto")'],
-            ['label:has-text("Términos")', 'label:has-text("Terminos")', 'label:has-text("Terms")'],
-            ['input[type="checkbox"]'],
-            ['[role="checkbox"]'],
-        )
+    # Una sola lista en orden de prioridad: un round-trip y el ganador previo del market primero
+    checkbox_encontrado = _click_selector_visible(
+        page,
+        [
+            ".checkbox_icon",
+            'label:has(.checkbox_icon)',
+            'label:has-text("Acepto")',
+            'label:has-text("Términos")',
+            'label:has-text("Terminos")',
+            'label:has-text("Terms")',
+            'input[type="checkbox"]',
+            '[role="checkbox"]',
+        ],
+        force=True,
+        requerido=False,
+        cache="checkbox_terminos",
     )
     if not checkbox_encontrado:
         print("⚠️ No se encontró checkbox visible de términos. Se intenta continuar igual.")
@@ -298,6 +314,7 @@ def _finalizar_compra(page, boton_texto="Ir a pagar"):
         ],
         timeout_ms=12000,
         descripcion=f"botón {boton_texto}",
+        cache="boton_pagar",
     )
     print("🎉 ¡CLICK EN PAGAR REALIZADO!")
 
@@ -306,6 +323,7 @@ def _finalizar_compra(page, boton_texto="Ir a pagar"):
 # FLUJOS DE PAGO
 # ==========================================
 
+@medir()
 def _pagar_niubiz(page):
     """Perú — Niubiz"""
     try:
@@ -314,7 +332,8 @@ def _pagar_niubiz(page):
         raise RuntimeError(f"Niubiz no apareció en checkout: {e}") from e
 
     print("Esperando animación del formulario...")
-    page.wait_for_timeout(5000)
+    # La animación revela el iframe de la pasarela: se espera que aparezca y deje de moverse (tope 5 s)
+    esperar_estable(page.locator(_SELECTOR_IFRAME_NIUBIZ).first, tope_ms=5000)
 
     _prefill_contacto(page)
 
@@ -353,9 +372,11 @@ def _pagar_niubiz(page):
         _finalizar_compra(page)
     except Exception as e:
         print(f"❌ Error Niubiz: {e}")
-        page.screenshot(path="error_niubiz.png")
+        error_path = guardar_screenshot(page, ruta_evidencia("error_niubiz"), "error")
+        print(f"📸 Screenshot de error guardado en: {error_path}")
 
 
+@medir()
 def _pagar_webpay(page):
     """Chile — Webpay (Transbank)
     Flujo: SKY checkout → portal Transbank → Tarjetas → datos → RUT/clave → Aceptar
@@ -541,7 +562,7 @@ def _pagar_webpay(page):
 
     # ── Paso 5: Confirmación ──
     print("✅ Esperando pantalla de confirmación...")
-    page.wait_for_timeout(2000)
+    esperar_red_inactiva(page, tope_ms=2000)
 
     _seleccionar_autorizacion_webpay(page)
     try:
@@ -564,6 +585,7 @@ def _pagar_webpay(page):
     print("🎉 ¡Webpay completado! Esperando redirección a SKY...")
 
 
+@medir()
 def _pagar_mercadopago(page):
     """Argentina — Mercado Pago
     Campos en iframe (secure-fields.mercadopago.com): cardNumber, expirationDate, securityCode
@@ -579,7 +601,7 @@ def _pagar_mercadopago(page):
     )
 
     print("Esperando formulario Mercado Pago...")
-    page.wait_for_timeout(5000)
+    esperar_listo(page, tope_ms=5000, locator=page.locator('iframe[name="cardNumber"]').first)
 
     _prefill_contacto(page)
 
@@ -673,16 +695,18 @@ def _pagar_mercadopago(page):
 
     except Exception as e:
         print(f"❌ Error Mercado Pago: {e}")
-        page.screenshot(path="error_mercadopago.png")
+        error_path = guardar_screenshot(page, ruta_evidencia("error_mercadopago"), "error")
+        print(f"📸 Screenshot de error guardado en: {error_path}")
 
 
+@medir()
 def _pagar_cielo(page):
     # TODO pendiente revision
     """Brasil — Cielo"""
     _seleccionar_medio_pago(page, "Cielo")
 
     print("Esperando formulario Cielo...")
-    page.wait_for_timeout(5000)
+    esperar_red_inactiva(page, tope_ms=5000)
 
     _prefill_contacto(page)
 
@@ -725,8 +749,9 @@ def _pagar_cielo(page):
         if codigo:
             print(f"🔑 Enviando código de autenticación: {codigo}")
             try:
-                page.wait_for_timeout(3000)
-                page.locator('input[name*="code"], input[placeholder*="ódigo"], input[type="password"]').first.fill(codigo)
+                campo_codigo = page.locator('input[name*="code"], input[placeholder*="ódigo"], input[type="password"]').first
+                esperar_estable(campo_codigo, tope_ms=3000)
+                campo_codigo.fill(codigo)
                 page.locator('button[type="submit"], input[type="submit"]').first.click()
                 print("🎉 Código enviado!")
             except Exception as e:
@@ -734,7 +759,8 @@ def _pagar_cielo(page):
 
     except Exception as e:
         print(f"❌ Error Cielo: {e}")
-        page.screenshot(path="error_cielo.png")
+        error_path = guardar_screenshot(page, ruta_evidencia("error_cielo"), "error")
+        print(f"📸 Screenshot de error guardado en: {error_path}")
 
 
 # Mapa market → función de pago (fuente de verdad para dispatch)
@@ -0,0 +1,301 @@
+"""
+Pipeline end-to-end del bot: home -> búsqueda -> tarifa -> extras -> pasajeros -> checkout -> pago.
+Recibe una página ya abierta; la sesión de navegador la gestiona quien llama (test_sky.py o
+core/async_runner.py). Lee la configuración desde core.state.
+"""
+
+import re
+from contextlib import contextmanager
+
+from playwright.sync_api import expect
+
+import core.state as state
+from core.helpers import (
+    _buscar_selector_visible,
+    _capturar_estado_ui,
+    detectar_etapa_actual,
+    esperar_correccion_runtime,
+    etapa_en_o_despues,
+    gestionar_pausa_edicion,
+    pausar_en_checkpoint,
+)
+from core.search_flow import (
+    _busqueda_directa,
+    _cerrar_panel_login_si_abierto,
+    _ciudad_aplicada_en_contenedor,
+    _esperar_home_lista,
+    _esperar_resultados_busqueda,
+    _fecha_aplicada_en_wrapper,
+    _iniciar_busqueda,
+    _pasajeros_busqueda_aplicados,
+    _seleccionar_tipo_viaje,
+    _seleccionar_ciudad,
+    _seleccionar_fechas,
+    _configurar_pasajeros_busqueda,
+    _seleccionar_vuelo_y_tarifa,
+    _saltar_extras,
+)
+from core.passenger_flow import (
+    _rellenar_todos_los_pasajeros,
+    _avanzar_a_checkout,
+)
+from core.bloqueo_red import adjuntar_bloqueo_red
+from core.bus_control import publicar
+from core.evidencias import guardar_screenshot, ruta_evidencia
+from core.har import adjuntar_har, soltar_har_replay
+from core.payment_flows import PAYMENT_DISPATCH
+from core.snapshots import restaurar_snapshot
+from core.stage_tracker import adjuntar_seguidor_etapa
+from core.timing import span
+from core.trace_chrome import adjuntar_red_timeline
+from core.waits import adjuntar_monitor_red
+
+_PASOS = (
+    "reanudacion",
+    "home",
+    "busqueda",
+    "seleccion_tarifa",
+    "pasajeros",
+    "avance_checkout",
+    "checkout",
+    "pago",
+    "cierre",
+)
+
+
+@contextmanager
+def _paso(nombre, **atributos):
+    """Span de un paso del pipeline que además avisa el progreso a la GUI (bus de control)."""
+    state.verificar_cancelacion()
+    publicar("progreso", paso=nombre, indice=_PASOS.index(nombre) + 1, total=len(_PASOS))
+    with span(nombre, **atributos) as actual:
+        yield actual
+
+
+class _SinCorreccionManual(RuntimeError):
+    """Paso fallido en headless: no hay corrección manual posible y el loop no debe reintentar."""
+
+
+def _corregir_o_fallar(page, motivo, mensaje, causa=None):
+    """
+    Corrección manual antes de reintentar el loop. En headless no hay a quién esperar: reintentar
+    repetiría el paso (y el pago contra la pasarela) en bucle hasta el timeout, así que se lanza.
+    """
+    if state.CFG.get("headless"):
+        raise _SinCorreccionManual(f"{mensaje} (headless: sin corrección manual posible)") from causa
+    esperar_correccion_runtime(page, motivo)
+
+
+def ejecutar_flujo(page):
+    """Corre el flujo completo sobre `page` respetando checkpoints, pausas y corrección en runtime."""
+    print(f"--- 🚀 Iniciando Test [{state.CFG['market']}]: {state.CFG['origen']} -> {state.CFG['destino']} ---")
+    print(f"    Medio de pago: {state.CFG['medio_pago']}")
+    print(f"    Tipo viaje: {state.CFG['tipo_viaje']} | Pax: {state.CFG['pasajeros']}")
+    if state.CFG["modo_exploracion"]:
+        print(f"    Modo exploración: ON | Evidencia en {state.EXPLORACION_DIR}")
+    adjuntar_bloqueo_red(page)
+    adjuntar_har(page)
+    adjuntar_seguidor_etapa(page)
+    adjuntar_monitor_red(page)
+    if state.CFG.get("trace_chrome"):
+        adjuntar_red_timeline(page)
+    url_reanudacion = restaurar_snapshot(page)
+    if url_reanudacion:
+        with _paso("reanudacion"):
+            page.goto(url_reanudacion)
+            _capturar_estado_ui(page, "reanudado")
+            print(f"ℹ️ Etapa detectada al reanudar: {detectar_etapa_actual(page)}")
+    elif state.CFG.get("busqueda_directa"):
+        print("⚡ Búsqueda directa: se omite el home; el formulario solo se usa como respaldo.")
+    else:
+        with _paso("home"):
+            page.goto(state.CFG["url"])
+            _cerrar_panel_login_si_abierto(page)
+            _capturar_estado_ui(page, "landing")
+            _esperar_home_lista(page)
+            _cerrar_panel_login_si_abierto(page)
+            _capturar_estado_ui(page, "landing_ready")
+            gestionar_pausa_edicion(page, "landing_ready")
+
+    busqueda_directa_pendiente = bool(state.CFG.get("busqueda_directa")) and not url_reanudacion
+    while True:
+        try:
+            # -------------------------------------------
+            # 1. BÚSQUEDA DE VUELO
+            # -------------------------------------------
+            with _paso("busqueda"):
+                etapa_actual = detectar_etapa_actual(page)
+                if not etapa_en_o_despues(etapa_actual, "SELECCION_TARIFA"):
+                    resultados_directos = False
+                    if busqueda_directa_pendiente:
+                        busqueda_directa_pendiente = False
+                        resultados_directos = _busqueda_directa(page)
+
+                    if not resultados_directos:
+                        _seleccionar_tipo_viaje(page)
+                        _capturar_estado_ui(page, "tipo_viaje")
+
+                        if not _ciudad_aplicada_en_contenedor(page, "#origin-id", state.CFG["origen"]):
+                            _seleccionar_ciudad(page, "#origin-id", state.CFG["origen"])
+
+                        if not _ciudad_aplicada_en_contenedor(page, "#destination-id", state.CFG["destino"]):
+                            _seleccionar_ciudad(page, "#destination-id", state.CFG["destino"])
+
+                        if not _fecha_aplicada_en_wrapper(page):
+                            _seleccionar_fechas(page)
+
+                        if not _pasajeros_busqueda_aplicados(page):
+                            _configurar_pasajeros_busqueda(page)
+
+                        _capturar_estado_ui(page, "busqueda_configurada")
+                        _iniciar_busqueda(page)
+                        _esperar_resultados_busqueda(page)
+                    _capturar_estado_ui(page, "post_busqueda")
+                    gestionar_pausa_edicion(page, "post_busqueda")
+
+                    if state.CFG["solo_exploracion"]:
+                        print("🧪 Solo exploración activo: flujo detenido tras búsqueda.")
+                        return
+
+                    if pausar_en_checkpoint(page, "BUSQUEDA"):
+                        return
+
+            # -------------------------------------------
+            # 2. SELECCIÓN DE TARIFA
+            # -------------------------------------------
+            with _paso("seleccion_tarifa"):
+                etapa_actual = detectar_etapa_actual(page)
+                debe_intentar_seleccion_vuelo = (
+                    etapa_actual == "DESCONOCIDA"
+                    or _buscar_selector_visible(
+                        page,
+                        ['button:has-text("Elegir vuelo")', '[data-test^="is-itinerary-selectFlight"]'],
+                    )
+                )
+
+                if not etapa_en_o_despues(etapa_actual, "DATOS_PASAJERO"):
+                    if debe_intentar_seleccion_vuelo:
+                        _seleccionar_vuelo_y_tarifa(page, "IDA")
+                        if state.CFG["tipo_viaje"] == "ROUND_TRIP":
+                            _seleccionar_vuelo_y_tarifa(page, "VUELTA")
+                            _capturar_estado_ui(page, "vuelo_vuelta_seleccionado")
+                        else:
+                            _capturar_estado_ui(page, "vuelo_ida_seleccionado")
+                    elif etapa_actual != "DESCONOCIDA":
+                        print(f"ℹ️ Reanudando desde etapa detectada: {etapa_actual}")
+                    soltar_har_replay(page)
+
+                    etapa_pre_extras = detectar_etapa_actual(page)
+                    if etapa_pre_extras in {"BUSQUEDA", "DESCONOCIDA"}:
+                        raise RuntimeError(
+                            f"El flujo sigue en etapa {etapa_pre_extras} y no debe avanzar a extras todavía.",
+                        )
+
+                    if not etapa_en_o_despues(etapa_pre_extras, "DATOS_PASAJERO"):
+                        if etapa_pre_extras == "SELECCION_TARIFA" and pausar_en_checkpoint(page, "ANCILLARIES"):
+                            return
+                        _saltar_extras(page)
+                        _capturar_estado_ui(page, "extras_saltados")
+                        gestionar_pausa_edicion(page, "extras_saltados")
+                else:
+                    print(f"ℹ️ Se omite selección de tarifa/extras; etapa detectada: {etapa_actual}")
+
+            # 🛑 Checkpoint: Después de selección de tarifa
+            if pausar_en_checkpoint(page, "SELECCION_TARIFA"):
+                return
+
+            # -------------------------------------------
+            # 3. DATOS DEL PASAJERO
+            # -------------------------------------------
+            with _paso("pasajeros"):
+                soltar_har_replay(page)
+                etapa_actual = detectar_etapa_actual(page)
+                if not etapa_en_o_despues(etapa_actual, "CHECKOUT"):
+                    _rellenar_todos_los_pasajeros(page)
+                    _capturar_estado_ui(page, "pasajeros_completados")
+                    gestionar_pausa_edicion(page, "pasajeros_completados")
+                else:
+                    print(f"ℹ️ Se omite carga de pasajeros; etapa detectada: {etapa_actual}")
+
+            # 🛑 Checkpoint: Después de datos del pasajero
+            if pausar_en_checkpoint(page, "DATOS_PASAJERO"):
+                return
+
+            with _paso("avance_checkout"):
+                etapa_actual = detectar_etapa_actual(page)
+                if not etapa_en_o_despues(etapa_actual, "CHECKOUT") and not _avanzar_a_checkout(page, timeout_ms=90000):
+                    _capturar_estado_ui(page, "post_confirmacion")
+                    print("⚠️ No se pudo avanzar automáticamente a checkout.")
+                    _corregir_o_fallar(page, "avance_checkout", "No se pudo avanzar automáticamente a checkout.")
+                    continue
+
+                _capturar_estado_ui(page, "post_confirmacion")
+                gestionar_pausa_edicion(page, "post_confirmacion")
+
+            # -------------------------------------------
+            # 4. CHECKOUT Y PAGO
+            # -------------------------------------------
+            with _paso("checkout"):
+                print("--- Llegada al Checkout ---")
+                _capturar_estado_ui(page, "checkout")
+                gestionar_pausa_edicion(page, "checkout")
+
+                try:
+                    expect(page).to_have_url(re.compile(".*checkout"), timeout=30000)
+                except Exception as error:
+                    print(f"⚠️ No se pudo llegar al checkout en 30s: {error}")
+                    _corregir_o_fallar(page, "checkout_no_detectado", "No se llegó al checkout en 30s.", error)
+                    continue
+
+            # 🛑 Checkpoint: En el checkout
+            if pausar_en_checkpoint(page, "CHECKOUT"):
+                return
+
+            medio = state.CFG["medio_pago"]
+            market = state.CFG["market"]
+            print(f"--- Iniciando Pago: {medio} ({market}) ---")
+
+            with _paso("pago", market=market, medio_pago=medio):
+                try:
+                    pagar_fn = PAYMENT_DISPATCH.get(market)
+                    if pagar_fn:
+                        pagar_fn(page)
+                    else:
+                        print(f"❌ Market '{market}' no tiene flujo de pago implementado.")
+                except state.EjecucionCancelada:
+                    raise
+                except Exception as error:
+                    print(f"❌ Error en flujo de pago: {error}")
+                    error_path = guardar_screenshot(page, ruta_evidencia("error_pago"), "error")
+                    print(f"📸 Screenshot de error guardado en: {error_path}")
+                    _corregir_o_fallar(page, "error_pago", f"Error en flujo de pago: {error}", error)
+                    continue
+
+            break
+        except (state.EjecucionCancelada, _SinCorreccionManual):
+            raise
+        except Exception as error:
+            print(f"⚠️ Error recuperable detectado: {error}")
+            etapa_reanudada = esperar_correccion_runtime(page, "error_recuperable")
+            if state.CFG.get("headless") and etapa_reanudada == "DESCONOCIDA":
+                raise
+            continue
+
+    # -------------------------------------------
+    # 5. SCREENSHOT FINAL Y CIERRE
+    # -------------------------------------------
+    with _paso("cierre"):
+        espera_final_segundos = state.CFG.get("espera_final_segundos", 600)
+        if espera_final_segundos > 0:
+            minutos, segundos = divmod(espera_final_segundos, 60)
+            espera_legible = f"{minutos}m {segundos}s" if segundos else f"{minutos} minutos"
+            print(f"⏳ Esperando {espera_legible} antes de tomar screenshot final...")
+            print("   (Puedes cerrar el navegador manualmente si deseas salir antes)")
+            page.wait_for_timeout(espera_final_segundos * 1000)
+        else:
+            print("⏩ Espera final deshabilitada (0 segundos).")
+
+        print("📸 Tomando screenshot final...")
+        screenshot_path = guardar_screenshot(page, ruta_evidencia("pago_exitoso"), "final")
+        print(f"✅ Screenshot encolado para escritura en: {screenshot_path}")
+        print("✅ Fin del script.")
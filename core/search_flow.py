@@ -11,8 +11,20 @@ Flujo de búsqueda de vuelo:
 import re
 import time
 from datetime import datetime, timedelta
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 import core.state as state
+from config.rutas import XHR_BUSQUEDA_PATRON, XHR_TARIFA_PATRON
+from config.vuelo import CODIGOS_IATA
+from core import cache_selectores
+from core.ciudades import (
+    clave_ciudad,
+    iata_conocido,
+    prefijo_unico,
+    registrar_opciones,
+    registrar_seleccion,
+    resolver_ciudad,
+)
 from core.helpers import (
     _normalizar_texto,
     _buscar_visible,
@@ -25,12 +37,16 @@ from core.helpers import (
     detectar_etapa_actual,
     gestionar_pausa_edicion,
 )
+from core.stage_tracker import esperar_transicion
+from core.timing import medir
+from core.waits import esperar_listo, esperar_red_inactiva, esperar_xhr, marca_red
 
 
 # ==========================================
 # HOME Y LOGIN
 # ==========================================
 
+@medir()
 def _esperar_home_lista(page, timeout_ms=45000):
     """Espera a que el flight-box esté listo para interacción."""
     deadline = time.monotonic() + timeout_ms / 1000
@@ -123,6 +139,7 @@ def _cerrar_panel_login_si_abierto(page):
 # TIPO DE VIAJE Y CIUDAD
 # ==========================================
 
+@medir()
 def _seleccionar_tipo_viaje(page):
     tipo_viaje = state.CFG["tipo_viaje"]
     if tipo_viaje == "ROUND_TRIP":
@@ -158,6 +175,20 @@ def _seleccionar_tipo_viaje(page):
     raise RuntimeError(f"No se pudo seleccionar tipo de viaje '{tipo_viaje}'.")
 
 
+_SELECTORES_OPCION_CIUDAD = [
+    'div[role="option"]',
+    '.ant-select-item-option',
+    '.ant-select-item-option-content',
+    'li[role="option"]',
+]
+_JS_TEXTOS_VISIBLES = """
+(elementos) => elementos
+    .filter((el) => el.getClientRects().length && getComputedStyle(el).visibility !== "hidden")
+    .map((el) => (el.innerText || "").trim())
+"""
+
+
+@medir()
 def _seleccionar_ciudad(page, contenedor_selector, ciudad):
     _cerrar_panel_login_si_abierto(page)
     if not _click_selector_visible(page, [contenedor_selector], force=True, requerido=True):
@@ -196,27 +227,28 @@ def _seleccionar_ciudad(page, contenedor_selector, ciudad):
         raise RuntimeError(f"No se encontró input editable para ciudad '{ciudad}'.")
 
     input_ciudad.click(force=True)
+    idioma = _idioma_sitio(page)
+    conocida = resolver_ciudad(ciudad, idioma)
+    if conocida and _elegir_ciudad_conocida(page, input_ciudad, ciudad, conocida["etiqueta"], idioma):
+        return
+
     input_ciudad.fill(ciudad)
     page.wait_for_timeout(700)
+    _aprender_opciones_ciudad(page, idioma)
 
     if _click_texto_visible(page, ciudad, exacto=True):
+        registrar_seleccion(ciudad, ciudad, idioma)
         return
 
     opcion = _buscar_visible(page.get_by_text(re.compile(re.escape(ciudad), re.IGNORECASE)))
     if opcion:
+        _registrar_opcion_elegida(ciudad, opcion, idioma)
         opcion.click()
         return
 
-    opcion_dropdown = _buscar_selector_visible(
-        page,
-        [
-            'div[role="option"]',
-            '.ant-select-item-option',
-            '.ant-select-item-option-content',
-            'li[role="option"]',
-        ],
-    )
+    opcion_dropdown = _buscar_selector_visible(page, _SELECTORES_OPCION_CIUDAD)
     if opcion_dropdown:
+        _registrar_opcion_elegida(ciudad, opcion_dropdown, idioma)
         opcion_dropdown.click()
         return
 
@@ -233,6 +265,60 @@ def _seleccionar_ciudad(page, contenedor_selector, ciudad):
     raise RuntimeError(f"No se encontró opción de autocompletado para ciudad '{ciudad}'.")
 
 
+_IDIOMAS_SITIO = ("es", "pt", "en")
+
+
+def _idioma_sitio(page):
+    """Idioma del sitio por el primer segmento de la URL (/es/, /pt/, /en/); sin él, el del market."""
+    for url in (page.url, state.CFG.get("url")):
+        segmento = urlsplit(url or "").path.strip("/").split("/", 1)[0].lower()
+        if segmento in _IDIOMAS_SITIO:
+            return segmento
+    return "pt" if state.CFG["market"] == "BR" else "es"
+
+
+def _aprender_opciones_ciudad(page, idioma):
+    try:
+        etiquetas = page.locator(", ".join(_SELECTORES_OPCION_CIUDAD)).evaluate_all(_JS_TEXTOS_VISIBLES)
+    except Exception:
+        return
+    registrar_opciones(etiquetas, idioma)
+
+
+def _registrar_opcion_elegida(ciudad, opcion, idioma):
+    try:
+        registrar_seleccion(ciudad, opcion.inner_text(), idioma)
+    except Exception:
+        pass
+
+
+def _patron_etiqueta_exacta(etiqueta):
+    # Texto completo de la opción; entre palabras \s* porque textContent no separa los hijos como innerText
+    return re.compile(r"^\s*" + r"\s*".join(re.escape(palabra) for palabra in etiqueta.split()) + r"\s*$")
+
+
+def _elegir_ciudad_conocida(page, input_ciudad, ciudad, etiqueta, idioma, timeout_ms=3000):
+    """Escribe el prefijo único y clickea la etiqueta conocida; False si no aparece (se usa el camino completo)."""
+    prefijo = prefijo_unico(ciudad, etiqueta, idioma)
+    input_ciudad.fill(prefijo)
+    # Solo opciones visibles del desplegable: un nodo oculto con el mismo texto no consume el timeout
+    opcion = (
+        page.locator(", ".join(_SELECTORES_OPCION_CIUDAD))
+        .filter(visible=True)
+        .filter(has_text=_patron_etiqueta_exacta(etiqueta))
+        .first
+    )
+    try:
+        opcion.wait_for(state="visible", timeout=timeout_ms)
+    except Exception:
+        print(f"ℹ️ Ciudad '{ciudad}': la opción '{etiqueta}' no apareció con '{prefijo}'; se escribe completa.")
+        return False
+    _aprender_opciones_ciudad(page, idioma)
+    opcion.click()
+    print(f"⚡ Ciudad '{ciudad}' con prefijo '{prefijo}' -> '{etiqueta}'")
+    return True
+
+
 def _ciudad_aplicada_en_contenedor(page, contenedor_selector, ciudad):
     contenedor = page.locator(contenedor_selector).first
     try:
@@ -379,12 +465,16 @@ def _abrir_selector_pasajeros(page):
         'button:has-text("Passenger")',
     ]
 
+    # Los candidatos que se probaron sin abrir el modal cuentan como ausentes para la caché
+    ausentes = set()
     for _ in range(4):
-        for selector in candidatos:
+        for selector in cache_selectores.ordenar("abrir_selector_pasajeros", candidatos):
             if _click_selector_visible(page, [selector], force=True):
                 page.wait_for_timeout(220)
                 if _modal_pasajeros_abierto(page):
+                    cache_selectores.registrar("abrir_selector_pasajeros", candidatos, selector, ausentes)
                     return True
+            ausentes.add(selector)
         page.wait_for_timeout(220)
 
     return False
@@ -437,6 +527,7 @@ def _click_boton_contador(page, etiquetas_fila):
     return False
 
 
+@medir()
 def _configurar_pasajeros_busqueda(page):
     adultos = state.CFG["pasajeros"]["adultos"]
     ninos = state.CFG["pasajeros"]["ninos"]
@@ -515,8 +606,10 @@ def _pasajeros_busqueda_aplicados(page):
     return False
 
 
+@medir()
 def _iniciar_busqueda(page):
     _cerrar_panel_login_si_abierto(page)
+    marca = marca_red(page)
     if not _click_selector_visible(
         page,
         [
@@ -531,12 +624,18 @@ def _iniciar_busqueda(page):
         force=True,
         requerido=True,
         descripcion="botón Buscar vuelo",
+        cache="iniciar_busqueda",
     ):
         raise RuntimeError("No se pudo iniciar la búsqueda de vuelos.")
-    page.wait_for_timeout(1500)
+    if XHR_BUSQUEDA_PATRON:
+        # Red inactiva sola puede resolver antes de que el XHR de búsqueda arranque; mismo tope de 1,5 s
+        esperar_xhr(page, XHR_BUSQUEDA_PATRON, tope_ms=1500, desde=marca)
+    else:
+        esperar_red_inactiva(page, tope_ms=1500)
     _cerrar_panel_login_si_abierto(page)
 
 
+@medir()
 def _esperar_resultados_busqueda(page, timeout_ms=45000):
     deadline = time.monotonic() + timeout_ms / 1000
     while time.monotonic() < deadline:
@@ -553,11 +652,94 @@ def _esperar_resultados_busqueda(page, timeout_ms=45000):
             ],
         ):
             return "SELECCION_TARIFA"
-        page.wait_for_timeout(500)
+        esperar_transicion(page, 1000, etapa_desde="BUSQUEDA")
 
     raise RuntimeError(f"La búsqueda no avanzó fuera de BUSQUEDA dentro de {timeout_ms}ms. URL actual: {page.url}")
 
 
+# ==========================================
+# BÚSQUEDA DIRECTA (deep link a resultados)
+# ==========================================
+
+_SELECTORES_RESULTADOS = (
+    '[data-test^="is-itinerary-selectFlight"], '
+    'button:has-text("Elegir vuelo"), '
+    '[data-test^="is-itinerary-selectRate"]'
+)
+
+
+def _codigo_iata(ciudad):
+    objetivo = clave_ciudad(ciudad)
+    for nombre, codigo in CODIGOS_IATA.items():
+        if clave_ciudad(nombre) == objetivo:
+            return codigo
+    aprendido = iata_conocido(ciudad)
+    if aprendido:
+        return aprendido
+    texto = (ciudad or "").strip()
+    return texto.upper() if re.fullmatch(r"[A-Za-z]{3}", texto) else None
+
+
+def url_busqueda_directa():
+    """URL de resultados armada desde CFG con la plantilla de config; None si falta un código IATA."""
+    origen = _codigo_iata(state.CFG["origen"])
+    destino = _codigo_iata(state.CFG["destino"])
+    if not origen or not destino:
+        return None
+    ida_vuelta = state.CFG["tipo_viaje"] == "ROUND_TRIP"
+    pax = state.CFG["pasajeros"]
+    url = state.CFG["url_busqueda_directa"].format(
+        base=state.CFG["url"].rstrip("/"),
+        origen=origen,
+        destino=destino,
+        ida=_fecha_objetivo_ida().isoformat(),
+        vuelta=_fecha_objetivo_vuelta().isoformat() if ida_vuelta else "",
+        tipo_viaje=state.CFG["tipo_viaje"],
+        adultos=pax["adultos"],
+        ninos=pax["ninos"],
+        infantes=pax["infantes"],
+    )
+    # Sin parámetros vacíos (ej: returnDate en solo ida)
+    partes = urlsplit(url)
+    query = [(clave, valor) for clave, valor in parse_qsl(partes.query, keep_blank_values=True) if valor != ""]
+    return urlunsplit(partes._replace(query=urlencode(query)))
+
+
+@medir()
+def _busqueda_directa(page, timeout_ms=8000):
+    """
+    Navega directo a la URL de resultados. True si aparecen vuelos; si no, vuelve al home
+    (listo para el camino por UI) y retorna False.
+    La plantilla no está verificada contra el sitio real: si tras cargar la página sigue en
+    BUSQUEDA (redirigió al formulario) o DESCONOCIDA, se descarta al momento en vez de esperar
+    `timeout_ms`, que solo aplica cuando la página ya está en resultados y falta renderizar vuelos.
+    """
+    url = url_busqueda_directa()
+    if not url:
+        ruta = f"{state.CFG['origen']} -> {state.CFG['destino']}"
+        print(f"⚠️ Búsqueda directa: falta código IATA en CODIGOS_IATA para '{ruta}'; se usa la UI.")
+    else:
+        print(f"⚡ Búsqueda directa: {url}")
+        try:
+            page.goto(url)
+            esperar_red_inactiva(page, tope_ms=3000)
+            etapa = detectar_etapa_actual(page)
+            if etapa in {"BUSQUEDA", "DESCONOCIDA"}:
+                print(f"⚠️ Búsqueda directa: la URL no llevó a resultados (etapa {etapa}); se usa la UI.")
+            else:
+                page.locator(_SELECTORES_RESULTADOS).first.wait_for(state="visible", timeout=timeout_ms)
+                print("✅ Búsqueda directa: resultados cargados.")
+                return True
+        except Exception as error:
+            print(f"⚠️ Búsqueda directa no validó ({type(error).__name__}); se vuelve al formulario del home.")
+
+    page.goto(state.CFG["url"])
+    _cerrar_panel_login_si_abierto(page)
+    _esperar_home_lista(page)
+    _cerrar_panel_login_si_abierto(page)
+    return False
+
+
 # ==========================================
 # FECHAS
 # ==========================================
@@ -597,8 +779,9 @@ def _abrir_calendario_fechas(page):
         return
 
     ultimo_error = None
+    ausentes = set()
     for _ in range(4):
-        for selector in candidatos:
+        for selector in cache_selectores.ordenar("abrir_calendario_fechas", candidatos):
             try:
                 item = _buscar_selector_visible(page, [selector])
                 if not item:
@@ -607,17 +790,21 @@ def _abrir_calendario_fechas(page):
                 item.click(force=True)
                 page.wait_for_timeout(250)
                 if calendario_visible():
+                    cache_selectores.registrar("abrir_calendario_fechas", candidatos, selector, ausentes)
                     return
                 try:
                     item.click(force=True)
                     page.wait_for_timeout(250)
                     if calendario_visible():
+                        cache_selectores.registrar("abrir_calendario_fechas", candidatos, selector, ausentes)
                         return
                 except Exception:
                     pass
             except Exception as error:
                 ultimo_error = error
                 continue
+            finally:
+                ausentes.add(selector)
 
     raise RuntimeError(f"El calendario no quedó visible/listo para seleccionar fechas. Último error: {ultimo_error}")
 
@@ -941,6 +1128,7 @@ def _seleccionar_fechas_por_indice(page):
         _click_dia_calendario(page, dias_retorno, indice_vuelta, "vuelta")
 
 
+@medir()
 def _seleccionar_fechas(page):
     page.wait_for_timeout(600)
     _abrir_calendario_fechas(page)
@@ -962,6 +1150,7 @@ def _seleccionar_fechas(page):
 # VUELO Y TARIFA
 # ==========================================
 
+@medir()
 def _seleccionar_vuelo_y_tarifa(page, tramo):
     print(f"--- Seleccionando Vuelo ({tramo}) ---")
 
@@ -973,7 +1162,11 @@ def _seleccionar_vuelo_y_tarifa(page, tramo):
     except Exception as error:
         raise RuntimeError(f"No se cargaron vuelos para {tramo}: {error}")
 
-    page.wait_for_timeout(2500)
+    esperar_listo(
+        page,
+        tope_ms=2500,
+        locator=page.locator('button:has-text("Elegir vuelo"), [data-test^="is-itinerary-selectFlight"]').first,
+    )
     botones_vuelo = page.locator('button:has-text("Elegir vuelo")')
     if botones_vuelo.count() == 0:
         botones_vuelo = page.locator('[data-test^="is-itinerary-selectFlight"]')
@@ -1018,13 +1211,18 @@ def _seleccionar_vuelo_y_tarifa(page, tramo):
     if botones_tarifa.count() == 0:
         raise RuntimeError(f"No se encontraron tarifas para {tramo}.")
 
+    marca = marca_red(page)
     if botones_tarifa.count() > 1:
         botones_tarifa.nth(1).click()
     else:
         botones_tarifa.first.click()
 
     try:
-        page.wait_for_timeout(1000)
+        if XHR_TARIFA_PATRON:
+            # El modal de upsell llega con la respuesta de la tarifa; el sleep fijo de 1 s queda como tope
+            esperar_xhr(page, XHR_TARIFA_PATRON, tope_ms=1000, desde=marca)
+        else:
+            page.wait_for_timeout(1000)
         btn_marketing = page.get_by_role("button", name="Seguir con mi tarifa actual")
         if btn_marketing.is_visible():
             btn_marketing.click()
@@ -1054,7 +1252,7 @@ def _esperar_cambio_post_accion(page, url_previa, timeout_ms=12000):
             ],
         ):
             return True
-        page.wait_for_timeout(200)
+        esperar_transicion(page, 200)
     return False
 
 
@@ -1124,6 +1322,7 @@ def _seleccionar_primer_asiento_disponible(page):
     return False
 
 
+@medir()
 def _resolver_pantalla_asientos(page):
     estrategia = state.CFG.get("extras", {}).get("seleccion_asiento", "SKIP")
     deadline = time.monotonic() + 12
@@ -1160,6 +1359,7 @@ def _resolver_pantalla_asientos(page):
             ],
             force=True,
             requerido=False,
+            cache="asientos_continuar",
         ) or _click_primer_selector(
             page,
             [
@@ -1188,7 +1388,7 @@ def _resolver_pantalla_asientos(page):
             if _esperar_cambio_post_accion(page, url_previa):
                 return True
 
-        page.wait_for_timeout(700)
+        esperar_transicion(page, 700)
 
     return not _url_contiene(page, "/seats")
 
@@ -1293,6 +1493,7 @@ def _seleccionar_servicio_adicional(page, etiquetas, cantidad_objetivo):
     return False
 
 
+@medir()
 def _resolver_pantalla_ancillaries(page):
     extras = state.CFG.get("extras", {})
     maletas_cabina = extras.get("maletas_cabina", 0)
@@ -1347,15 +1548,16 @@ def _resolver_pantalla_ancillaries(page):
                 'button:has-text("Continue")',
             ],
         ):
-            page.wait_for_timeout(900)
+            esperar_red_inactiva(page, tope_ms=900)
             if _esperar_cambio_post_accion(page, url_previa):
                 return True
 
-        page.wait_for_timeout(700)
+        esperar_transicion(page, 700)
 
     return not _url_contiene(page, "/additional-services")
 
 
+@medir()
 def _saltar_extras(page, verbose=True):
     if verbose:
         print("--- Saltando Extras ---")
@@ -0,0 +1,150 @@
+"""
+Snapshots de sesión por checkpoint y arranque en caliente (--resume-from).
+
+Cada vez que el flujo pasa por un checkpoint (BUSQUEDA, SELECCION_TARIFA, ..., PAGO) se guarda
+context.storage_state() (cookies + localStorage), el sessionStorage del origen actual y la URL en
+.cache_bot/snapshots/<market>_<ambiente>/<CHECKPOINT>.json; el último snapshot pisa al anterior.
+Solo con CFG["snapshots_checkpoint"] (--guardar-snapshots): el snapshot lleva cookies de sesión, así
+que los que superan CFG["snapshots_ttl_horas"] se borran al guardar o reanudar.
+
+--resume-from acepta un path a un snapshot o el nombre de un checkpoint (usa el último del
+market/ambiente). Al arrancar se restauran cookies y storage, se navega a la URL guardada y el loop
+de core/pipeline.py retoma desde la etapa que detecte detectar_etapa_actual.
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+
+import core.state as state
+from core.timing import span
+
+_CLAVE_RESTAURADO = "__bot_snapshot_restaurado"
+_limpieza_hecha = False
+_JS_SESSION_STORAGE = """
+(claveExcluida) => {
+    const datos = {};
+    for (let i = 0; i < sessionStorage.length; i++) {
+        const clave = sessionStorage.key(i);
+        if (clave !== claveExcluida) datos[clave] = sessionStorage.getItem(clave);
+    }
+    return { origen: location.origin, datos };
+}
+"""
+
+
+def ruta_snapshot(base_dir, market, ambiente, checkpoint):
+    return os.path.join(base_dir, f"{market}_{ambiente}", f"{checkpoint}.json")
+
+
+def limpiar_snapshots_vencidos(base_dir, ttl_horas):
+    """Borra los snapshots de `base_dir` con más de `ttl_horas` horas. Retorna cuántos borró."""
+    if not ttl_horas or not os.path.isdir(base_dir):
+        return 0
+    limite = time.time() - ttl_horas * 3600
+    borrados = 0
+    for raiz, _, archivos in os.walk(base_dir):
+        for nombre in archivos:
+            if not nombre.endswith(".json"):
+                continue
+            path = os.path.join(raiz, nombre)
+            try:
+                if os.path.getmtime(path) < limite:
+                    os.remove(path)
+                    borrados += 1
+            except OSError:
+                continue
+    if borrados:
+        print(f"🧹 Snapshots: {borrados} vencidos (> {ttl_horas} h) eliminados de {base_dir}")
+    return borrados
+
+
+def resolver_snapshot(valor, market, ambiente, base_dir, checkpoints_validos, ttl_horas=None):
+    """Path del snapshot a reanudar: `valor` como archivo o como nombre de checkpoint del market/ambiente."""
+    limpiar_snapshots_vencidos(base_dir, ttl_horas)
+    if os.path.isfile(valor):
+        return valor
+    checkpoint = valor.strip().upper()
+    if checkpoint in checkpoints_validos:
+        path = ruta_snapshot(base_dir, market, ambiente, checkpoint)
+        if os.path.isfile(path):
+            return path
+        raise ValueError(f"No hay snapshot de {checkpoint} para {market}/{ambiente} en '{path}'.")
+    raise ValueError(f"--resume-from: '{valor}' no es un archivo ni un checkpoint ({', '.join(checkpoints_validos)}).")
+
+
+def guardar_snapshot(page, checkpoint):
+    """Guarda storage_state + sessionStorage + URL del checkpoint. Nunca interrumpe el flujo."""
+    global _limpieza_hecha
+    if not state.CFG.get("snapshots_checkpoint"):
+        return None
+    if not _limpieza_hecha:
+        _limpieza_hecha = True
+        limpiar_snapshots_vencidos(state.CFG["snapshots_dir"], state.CFG.get("snapshots_ttl_horas"))
+    path = ruta_snapshot(state.CFG["snapshots_dir"], state.CFG["market"], state.CFG["ambiente"], checkpoint)
+    try:
+        with span("snapshot", checkpoint=checkpoint):
+            url = page.url
+            session_storage = page.evaluate(_JS_SESSION_STORAGE, _CLAVE_RESTAURADO)
+            snapshot = {
+                "checkpoint": checkpoint,
+                "url": url,
+                "market": state.CFG["market"],
+                "ambiente": state.CFG["ambiente"],
+                "id_ejecucion": state.EXPLORACION_RUN_ID,
+                "creado": datetime.now().isoformat(timespec="seconds"),
+                "storage_state": page.context.storage_state(),
+                "session_storage": {session_storage["origen"]: session_storage["datos"]},
+            }
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporal = f"{path}.tmp"
+            with open(temporal, "w", encoding="utf-8") as archivo:
+                json.dump(snapshot, archivo, ensure_ascii=False)
+            os.replace(temporal, path)
+    except Exception as error:
+        print(f"⚠️ No se pudo guardar el snapshot de {checkpoint}: {error}")
+        return None
+    print(f"💾 Snapshot {checkpoint} -> {path}")
+    return path
+
+
+def restaurar_snapshot(page):
+    """
+    Si CFG["resume_from"] está activo, carga cookies y storage del snapshot en el contexto de `page`
+    y retorna la URL a la que hay que navegar; si no, None.
+    """
+    path = state.CFG.get("resume_from")
+    if not path:
+        return None
+    with open(path, "r", encoding="utf-8") as archivo:
+        snapshot = json.load(archivo)
+    if snapshot.get("market") != state.CFG["market"]:
+        print(f"⚠️ El snapshot es de {snapshot.get('market')} y la corrida de {state.CFG['market']}.")
+
+    storage_state = snapshot.get("storage_state") or {}
+    if storage_state.get("cookies"):
+        page.context.add_cookies(storage_state["cookies"])
+
+    # localStorage y sessionStorage se restauran una sola vez por pestaña y origen, antes de los scripts del sitio
+    por_origen = {}
+    for origen in storage_state.get("origins", []):
+        items = {item["name"]: item["value"] for item in origen.get("localStorage", [])}
+        por_origen.setdefault(origen["origin"], {})["local"] = items
+    for origen, items in (snapshot.get("session_storage") or {}).items():
+        por_origen.setdefault(origen, {})["session"] = items
+    if por_origen:
+        page.add_init_script(
+            script="""
+            (() => {
+                const datos = %s[location.origin];
+                if (!datos || sessionStorage.getItem("%s")) return;
+                for (const [clave, valor] of Object.entries(datos.local || {})) localStorage.setItem(clave, valor);
+                for (const [clave, valor] of Object.entries(datos.session || {})) sessionStorage.setItem(clave, valor);
+                sessionStorage.setItem("%s", "1");
+            })();
+            """ % (json.dumps(por_origen), _CLAVE_RESTAURADO, _CLAVE_RESTAURADO)
+        )
+    print(f"♻️ Reanudando desde snapshot {snapshot.get('checkpoint')} ({snapshot.get('creado')})")
+    print(f"   URL: {snapshot['url']}")
+    return snapshot["url"]
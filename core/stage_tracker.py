@@ -0,0 +1,249 @@
+"""
+Seguimiento de etapa por página basado en eventos.
+
+En vez de re-sondear URL + selectores en cada vuelta de los loops de espera, cada página
+lleva un SeguidorEtapa que:
+- escucha `framenavigated` del frame principal (cambios de URL, incluidos los de history API),
+- inyecta un MutationObserver que recalcula la etapa en el navegador y la empuja a Python
+  vía `expose_binding` (y la deja en window.__skyEtapaActual).
+Cada cambio se reenvía a la GUI como evento "etapa" del bus de control (core/bus_control.py).
+
+detectar_etapa_actual() lee la etapa cacheada cuando está vigente y esperar_transicion()
+bloquea hasta el próximo cambio (o el tope de tiempo) sin round-trips intermedios.
+"""
+
+import contextvars
+import json
+import time
+
+import core.state as state
+from core.bus_control import publicar
+from core.helpers import (
+    _SELECTORES_ETAPA_BUSQUEDA,
+    _SELECTORES_ETAPA_TARIFA,
+    _JS_ES_VISIBLE,
+    _JS_REGISTRO_SOMBRAS,
+    _etapa_por_url,
+    _traducir_selector,
+    detectar_etapa_actual,
+)
+from core.timing import registrar_sleep
+
+_BINDING_NOTIFICAR = "__skyNotificarEtapa"
+_SEGUIDORES = {}
+
+
+def _especificacion_js(selectores):
+    # Solo selectores traducibles a CSS: el observer corre dentro del navegador sin Playwright.
+    return [traducido for traducido in (_traducir_selector(selector) for selector in selectores) if traducido]
+
+
+_JS_OBSERVADOR = """
+(() => {
+    if (window !== window.top || window.__skySeguidorEtapa) return;
+    window.__skySeguidorEtapa = true;
+    const ESPECIFICACION = %(especificacion)s;
+    %(es_visible)s
+    %(registro_sombras)s
+    const normalizar = (texto) => (texto || "").replace(/\\s+/g, " ").trim().toLowerCase();
+    // Documento y shadow roots abiertos, como _JS_SONDEO_SELECTORES en core/helpers.py
+    const hayVisible = (specs) => {
+        const raices = [document, ...registroSombras()];
+        return specs.some((alternativas) => alternativas.some(([css, texto]) => raices.some((raiz) => {
+            try {
+                return Array.from(raiz.querySelectorAll(css)).some(
+                    (el) => (texto === null || normalizar(el.textContent).includes(texto)) && esVisible(el)
+                );
+            } catch (error) {
+                return false;
+            }
+        })));
+    };
+    // Engancha attachShadow antes de que corran los scripts del sitio
+    registroSombras();
+    const calcular = () => {
+        const url = location.href.toLowerCase();
+        if (url.includes("checkout")) return "CHECKOUT";
+        if (url.includes("passenger-detail")) return "DATOS_PASAJERO";
+        if (url.includes("/seats") || url.includes("/additional-services")) return "SELECCION_TARIFA";
+        if (hayVisible(ESPECIFICACION.tarifa)) return "SELECCION_TARIFA";
+        if (hayVisible(ESPECIFICACION.busqueda)) return "BUSQUEDA";
+        return "DESCONOCIDA";
+    };
+    let pendiente = null;
+    const publicar = () => {
+        pendiente = null;
+        const etapa = calcular();
+        const url = location.href;
+        if (etapa === window.__skyEtapaActual && url === window.__skyUrlEtapa) return;
+        window.__skyEtapaActual = etapa;
+        window.__skyUrlEtapa = url;
+        const notificar = window.%(binding)s;
+        if (typeof notificar === "function") {
+            Promise.resolve(notificar(etapa, url)).catch(() => {});
+        }
+    };
+    const programar = () => {
+        if (pendiente === null) pendiente = setTimeout(publicar, 60);
+    };
+    for (const metodo of ["pushState", "replaceState"]) {
+        const original = history[metodo];
+        history[metodo] = function (...args) {
+            const resultado = original.apply(this, args);
+            programar();
+            return resultado;
+        };
+    }
+    window.addEventListener("popstate", programar);
+    window.addEventListener("hashchange", programar);
+    // Red de seguridad para cambios de visibilidad sin mutación (transiciones CSS); corre en el navegador.
+    setInterval(programar, 1000);
+    const iniciar = () => {
+        const observador = new MutationObserver(programar);
+        const opciones = {
+            childList: true,
+            subtree: true,
+            characterData: true,
+            attributes: true,
+            attributeFilter: ["class", "style", "hidden", "aria-hidden", "disabled"],
+        };
+        observador.observe(document.documentElement, opciones);
+        // subtree no cruza a los shadow roots: cada uno se observa aparte, también los que se creen después
+        window.__skyObservarSombra = (raiz) => observador.observe(raiz, opciones);
+        registroSombras().forEach(window.__skyObservarSombra);
+        publicar();
+    };
+    if (document.documentElement) iniciar();
+    else document.addEventListener("DOMContentLoaded", iniciar, { once: true });
+})();
+""" % {
+    "especificacion": json.dumps(
+        {
+            "tarifa": _especificacion_js(_SELECTORES_ETAPA_TARIFA),
+            "busqueda": _especificacion_js(_SELECTORES_ETAPA_BUSQUEDA),
+        },
+        ensure_ascii=False,
+    ),
+    "es_visible": _JS_ES_VISIBLE.strip(),
+    "registro_sombras": _JS_REGISTRO_SOMBRAS.strip(),
+    "binding": _BINDING_NOTIFICAR,
+}
+
+_JS_HUBO_TRANSICION = """([etapa, url]) => {
+    const actual = window.__skyEtapaActual;
+    if (actual === undefined) return false;
+    if (location.href !== url) return true;
+    return etapa !== null && actual !== etapa;
+}"""
+
+
+class SeguidorEtapa:
+    """Etapa cacheada de una página, actualizada por eventos de navegación y del MutationObserver."""
+
+    def __init__(self, page):
+        self.page = page
+        self.etapa = None
+        self.url = None
+        self.historial = []
+        # Los handlers de Playwright corren en greenlets sin el contexto del flujo: el bus se
+        # resuelve con el core.state del flujo que adjuntó el seguidor (core/async_runner.py).
+        self._contexto = contextvars.copy_context()
+
+    def _registrar(self, etapa, url):
+        if etapa == self.etapa and url == self.url:
+            return
+        self.etapa = etapa
+        self.url = url
+        self.historial.append((time.monotonic(), etapa, url))
+        self._contexto.run(publicar, "etapa", etapa=etapa, url=url)
+
+    def _al_notificar(self, _source, etapa, url):
+        self._registrar(etapa, url)
+
+    def _al_navegar(self, frame):
+        if frame != self.page.main_frame:
+            return
+        url = frame.url
+        # La URL define la etapa en pasos avanzados; si no, se espera el push del observer.
+        etapa_url = _etapa_por_url(url)
+        if etapa_url:
+            self._registrar(etapa_url, url)
+        else:
+            self.etapa = None
+            self.url = url
+
+    def _al_cerrar(self, _page=None):
+        _SEGUIDORES.pop(id(self.page), None)
+
+    def etapa_vigente(self):
+        """Etapa cacheada si corresponde a la URL actual; None si hay que sondear."""
+        try:
+            if self.etapa and self.url == self.page.url:
+                return self.etapa
+        except Exception:
+            pass
+        return None
+
+
+def adjuntar_seguidor_etapa(page):
+    """Registra el seguidor en la página (idempotente). Si algo falla se sigue con el sondeo clásico."""
+    existente = _SEGUIDORES.get(id(page))
+    if existente:
+        return existente
+
+    seguidor = SeguidorEtapa(page)
+    try:
+        page.expose_binding(_BINDING_NOTIFICAR, seguidor._al_notificar)
+        page.add_init_script(_JS_OBSERVADOR)
+        page.on("framenavigated", seguidor._al_navegar)
+        page.on("close", seguidor._al_cerrar)
+    except Exception as error:
+        print(f"⚠️ No se pudo activar el seguimiento de etapa por eventos: {error}")
+        return None
+
+    _SEGUIDORES[id(page)] = seguidor
+    try:
+        # Documento ya cargado (ej: pestaña reutilizada por CDP): el init script no aplica hasta navegar.
+        if (page.url or "about:blank") != "about:blank":
+            page.evaluate(_JS_OBSERVADOR)
+    except Exception:
+        pass
+    return seguidor
+
+
+def etapa_cacheada(page):
+    """
+    Etapa cacheada vigente para detectar_etapa_actual. Nunca DESCONOCIDA: un cambio del DOM en la SPA
+    que el observer todavía no empujó la dejaría pegada, así que en ese caso se sondea.
+    """
+    seguidor = _SEGUIDORES.get(id(page))
+    etapa = seguidor.etapa_vigente() if seguidor else None
+    return None if etapa == "DESCONOCIDA" else etapa
+
+
+def esperar_transicion(page, timeout_ms, etapa_desde=None):
+    """
+    Bloquea hasta que cambie la etapa (respecto de `etapa_desde`, o la actual) o la URL, con
+    `timeout_ms` como tope. Reemplaza a page.wait_for_timeout() en loops que esperan avanzar.
+    Retorna la etapa detectada al salir.
+    """
+    state.verificar_cancelacion()
+    if id(page) not in _SEGUIDORES:
+        page.wait_for_timeout(timeout_ms)
+        return detectar_etapa_actual(page)
+
+    if etapa_desde is None:
+        etapa_desde = _SEGUIDORES[id(page)].etapa_vigente()
+    inicio = time.perf_counter()
+    try:
+        page.wait_for_function(
+            _JS_HUBO_TRANSICION,
+            arg=[etapa_desde, page.url],
+            timeout=timeout_ms,
+            polling=100,
+        )
+    except Exception:
+        pass
+    finally:
+        registrar_sleep((time.perf_counter() - inicio) * 1000)
+    return detectar_etapa_actual(page)
@@ -1,9 +1,74 @@
 """
 Estado global compartido entre módulos.
-Se popula en test_sky.py (antes de run()) mediante CFG.update(aplicar_args(...)).
+Se popula en test_sky.py (antes de run()) mediante CFG.update(aplicar_args(...)) y configurar_exploracion().
 Todos los módulos acceden a este objeto via: import core.state as state
+
+Los flujos concurrentes de core/async_runner.py corren dentro de estado_aislado(): cada flujo
+ve su propio CFG / EXPLORACION_* sin pisar el del proceso. Por eso no se asigna
+state.CFG = ... ni state.EXPLORACION_* = ... directamente; se muta CFG o se usan las funciones.
+El estado activo vive en un ContextVar: lo aíslan tanto los hilos como los greenlets en los que
+el runner multiplexa los flujos, y lo heredan las tareas asyncio que Playwright crea por llamada.
+Los handlers de eventos de Playwright corren en greenlets propios y ven el estado del proceso.
+Un flujo vencido se cancela activando su CANCELACION: corta en el próximo verificar_cancelacion().
 """
 
-CFG: dict = {}
-EXPLORACION_RUN_ID: str = ""
-EXPLORACION_DIR: str = ""
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_ESTADO_GLOBAL = {
+    "CFG": {},
+    "EXPLORACION_RUN_ID": "",
+    "EXPLORACION_DIR": "",
+    "CANCELACION": None,
+}
+_estado = ContextVar("estado_sky", default=None)
+
+
+def _estado_actual():
+    return _estado.get() or _ESTADO_GLOBAL
+
+
+def __getattr__(nombre):
+    estado = _estado_actual()
+    if nombre in estado:
+        return estado[nombre]
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
+
+def configurar_exploracion(run_id):
+    """Fija el id de ejecución y la carpeta de exploración del estado activo."""
+    estado = _estado_actual()
+    estado["EXPLORACION_RUN_ID"] = run_id
+    estado["EXPLORACION_DIR"] = os.path.join("screenshots_pruebas", f"exploracion_{run_id}")
+
+
+class EjecucionCancelada(RuntimeError):
+    """El flujo actual fue cancelado desde afuera (ej: timeout del caso en core/async_runner.py)."""
+
+
+def verificar_cancelacion():
+    """Lanza EjecucionCancelada si se activó la cancelación del estado activo."""
+    cancelacion = _estado_actual().get("CANCELACION")
+    if cancelacion is not None and cancelacion.is_set():
+        raise EjecucionCancelada("Ejecución cancelada por timeout del caso.")
+
+
+@contextmanager
+def estado_aislado(cfg, run_id, cancelacion=None):
+    """
+    Activa un estado propio para el contexto actual (CFG copiado) mientras dure el bloque.
+    `cancelacion` (threading.Event) permite cortar el flujo desde afuera vía verificar_cancelacion().
+    """
+    estado = {
+        "CFG": dict(cfg),
+        "EXPLORACION_RUN_ID": "",
+        "EXPLORACION_DIR": "",
+        "CANCELACION": cancelacion,
+    }
+    token = _estado.set(estado)
+    configurar_exploracion(run_id)
+    try:
+        yield estado
+    finally:
+        _estado.reset(token)
@@ -0,0 +1,274 @@
+"""
+Spans de tiempo anidados por corrida.
+
+Cada span registra tiempo de pared, tiempo en sleeps explícitos (page.wait_for_timeout),
+tiempo sondeando el DOM (helpers marcados con @medir_sondeo) y cantidad de llamadas al
+protocolo de Playwright (≈ round-trips CDP). Los contadores son inclusivos: un sleep suma
+en todos los spans abiertos. Al final de la corrida se escribe un JSON de línea de tiempo y
+se imprime una tabla agregada por ruta de spans.
+
+El registro vive en un ContextVar (por hilo o greenlet de flujo), así los flujos concurrentes
+de core/async_runner.py no se mezclan.
+Sin registro activo, span()/medir() no hacen nada.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+_registro = ContextVar("registro_tiempos", default=None)
+_hooks_instalados = False
+_conteo_cdp_activo = False
+_hooks_lock = threading.Lock()
+
+
+class RegistroTiempos:
+    """Línea de tiempo de una corrida: spans planos con referencia al padre."""
+
+    def __init__(self, id_ejecucion, **atributos):
+        self.id_ejecucion = id_ejecucion
+        self.atributos = atributos
+        self.inicio_epoch = time.time()
+        self.inicio = time.perf_counter()
+        self.spans = []
+        self.pila = []
+        self.en_sondeo = False
+        self.llamadas_cdp_disponibles = _conteo_cdp_activo
+        self.red = []
+
+    def _ms_desde_inicio(self, instante):
+        return round((instante - self.inicio) * 1000, 3)
+
+    def abrir(self, nombre, atributos):
+        span = {
+            "id": len(self.spans),
+            "padre": self.pila[-1]["id"] if self.pila else None,
+            "nombre": nombre,
+            "profundidad": len(self.pila),
+            "inicio_ms": self._ms_desde_inicio(time.perf_counter()),
+            "fin_ms": None,
+            "total_ms": None,
+            "sleep_ms": 0.0,
+            "sondeo_ms": 0.0,
+            "llamadas_cdp": 0,
+            "error": None,
+            "atributos": atributos,
+        }
+        self.spans.append(span)
+        self.pila.append(span)
+        return span
+
+    def cerrar(self, span, error=None):
+        span["fin_ms"] = self._ms_desde_inicio(time.perf_counter())
+        span["total_ms"] = round(span["fin_ms"] - span["inicio_ms"], 3)
+        span["sleep_ms"] = round(span["sleep_ms"], 3)
+        span["sondeo_ms"] = round(span["sondeo_ms"], 3)
+        if error is not None:
+            span["error"] = f"{type(error).__name__}: {error}"
+        if self.pila and self.pila[-1] is span:
+            self.pila.pop()
+        elif span in self.pila:
+            self.pila.remove(span)
+
+    def sumar(self, campo, valor):
+        for span in self.pila:
+            span[campo] += valor
+
+    def a_dict(self):
+        return {
+            "id_ejecucion": self.id_ejecucion,
+            "inicio": datetime.fromtimestamp(self.inicio_epoch).isoformat(),
+            "inicio_epoch": self.inicio_epoch,
+            "atributos": self.atributos,
+            "llamadas_cdp_disponibles": self.llamadas_cdp_disponibles,
+            "spans": self.spans,
+            "red": self.red,
+        }
+
+    def guardar_json(self, path):
+        directorio = os.path.dirname(path)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as archivo:
+            json.dump(self.a_dict(), archivo, ensure_ascii=False, indent=2)
+        return path
+
+    def agregado_por_ruta(self):
+        """Suma spans con la misma ruta (ej: run > pasajeros > rellenar_pasajero) en orden de aparición."""
+        rutas = {}
+        por_id = {span["id"]: span for span in self.spans}
+        for span in self.spans:
+            if span["total_ms"] is None:
+                continue
+            partes = [span["nombre"]]
+            padre = span["padre"]
+            while padre is not None:
+                partes.append(por_id[padre]["nombre"])
+                padre = por_id[padre]["padre"]
+            ruta = tuple(reversed(partes))
+            fila = rutas.setdefault(
+                ruta,
+                {"ruta": ruta, "n": 0, "total_ms": 0.0, "sleep_ms": 0.0, "sondeo_ms": 0.0, "llamadas_cdp": 0},
+            )
+            fila["n"] += 1
+            for campo in ("total_ms", "sleep_ms", "sondeo_ms", "llamadas_cdp"):
+                fila[campo] += span[campo]
+        return list(rutas.values())
+
+    def imprimir_tabla(self, profundidad_maxima=3):
+        filas = [fila for fila in self.agregado_por_ruta() if len(fila["ruta"]) <= profundidad_maxima + 1]
+        if not filas:
+            return
+        cdp = "CDP" if self.llamadas_cdp_disponibles else "CDP(n/d)"
+        print(f"\n⏱️ Tiempos por etapa ({self.id_ejecucion}):")
+        encabezado = f"{'Span':<44} {'n':>4} {'Total':>9} {'Sleep':>9} {'Sondeo':>9} {cdp:>9}"
+        print(encabezado)
+        print("-" * len(encabezado))
+        for fila in filas:
+            nombre = ("  " * (len(fila["ruta"]) - 1) + fila["ruta"][-1])[:44]
+            print(
+                f"{nombre:<44} {fila['n']:>4} "
+                f"{fila['total_ms'] / 1000:>8.1f}s {fila['sleep_ms'] / 1000:>8.1f}s "
+                f"{fila['sondeo_ms'] / 1000:>8.1f}s {fila['llamadas_cdp']:>9}"
+            )
+
+
+def registro_actual():
+    return _registro.get()
+
+
+def _instalar_hooks():
+    """Envuelve page.wait_for_timeout y el envío de mensajes al driver. Si la API interna cambia, solo se pierde el conteo."""
+    global _hooks_instalados, _conteo_cdp_activo
+    with _hooks_lock:
+        if _hooks_instalados:
+            return
+        _hooks_instalados = True
+        try:
+            from playwright.sync_api import Frame, Page
+
+            for clase in (Page, Frame):
+                original = clase.wait_for_timeout
+
+                @functools.wraps(original)
+                def wait_for_timeout(self, timeout, _original=original):
+                    inicio = time.perf_counter()
+                    try:
+                        return _original(self, timeout)
+                    finally:
+                        registrar_sleep((time.perf_counter() - inicio) * 1000)
+
+                clase.wait_for_timeout = wait_for_timeout
+        except Exception as error:
+            print(f"⚠️ Timing: no se pudo medir sleeps explícitos: {error}")
+
+        try:
+            from playwright._impl._connection import Connection
+
+            original_envio = Connection._send_message_to_server
+
+            @functools.wraps(original_envio)
+            def _send_message_to_server(self, *args, **kwargs):
+                registro = registro_actual()
+                if registro is not None:
+                    registro.sumar("llamadas_cdp", 1)
+                return original_envio(self, *args, **kwargs)
+
+            Connection._send_message_to_server = _send_message_to_server
+            _conteo_cdp_activo = True
+        except Exception as error:
+            print(f"⚠️ Timing: no se pudo contar llamadas CDP: {error}")
+
+
+def iniciar_registro(id_ejecucion, **atributos):
+    """Activa un registro para el flujo actual y abre el span raíz 'run'."""
+    _instalar_hooks()
+    registro = RegistroTiempos(id_ejecucion, **atributos)
+    _registro.set(registro)
+    registro.abrir("run", dict(atributos))
+    return registro
+
+
+def finalizar_registro(error=None):
+    """Cierra los spans abiertos y desactiva el registro del flujo. Retorna el registro o None."""
+    registro = registro_actual()
+    if registro is None:
+        return None
+    while registro.pila:
+        registro.cerrar(registro.pila[-1], error=error)
+    _registro.set(None)
+    return registro
+
+
+def registrar_sleep(ms):
+    registro = registro_actual()
+    if registro is not None:
+        registro.sumar("sleep_ms", ms)
+
+
+@contextmanager
+def span(nombre, **atributos):
+    registro = registro_actual()
+    if registro is None:
+        yield None
+        return
+    actual = registro.abrir(nombre, atributos)
+    try:
+        yield actual
+    except BaseException as error:
+        registro.cerrar(actual, error=error)
+        raise
+    registro.cerrar(actual)
+
+
+def medir(nombre=None):
+    """Decorador: ejecuta la función dentro de un span (por defecto, su nombre sin '_' inicial)."""
+
+    def decorador(funcion):
+        nombre_span = nombre or funcion.__name__.lstrip("_")
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with span(nombre_span):
+                return funcion(*args, **kwargs)
+
+        return envoltura
+
+    return decorador
+
+
+def medir_sondeo(funcion):
+    """Decorador para helpers de sondeo DOM: suma su duración como 'sondeo' (solo el nivel más externo)."""
+
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        registro = registro_actual()
+        if registro is None or registro.en_sondeo:
+            return funcion(*args, **kwargs)
+        registro.en_sondeo = True
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            registro.en_sondeo = False
+            registro.sumar("sondeo_ms", (time.perf_counter() - inicio) * 1000)
+
+    return envoltura
+
+
+def escribir_linea_tiempo(registro, base_dir="screenshots_pruebas", sufijo=""):
+    """Guarda el JSON de la corrida en screenshots_pruebas/timeline_<id>.json e imprime la tabla."""
+    path = os.path.join(base_dir, f"timeline_{registro.id_ejecucion}{sufijo}.json")
+    try:
+        registro.guardar_json(path)
+    except Exception as error:
+        print(f"⚠️ No se pudo guardar la línea de tiempo '{path}': {error}")
+        return None
+    registro.imprimir_tabla()
+    print(f"🧾 Línea de tiempo -> {path}")
+    return path
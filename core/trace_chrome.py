@@ -0,0 +1,165 @@
+"""
+Exportación de una corrida a Chrome Trace Event Format (chrome://tracing, https://ui.perfetto.dev).
+
+- Pista "Python (etapas)": los spans de core/timing.py (etapas del pipeline, helpers medidos,
+  pausas de gestionar_pausa_edicion y reintentos de _click_selector_visible).
+- Pistas "Red #N": requests de la página con el timing que entrega Playwright (request.timing),
+  repartidos en carriles para que los requests simultáneos no se pisen.
+
+La red solo se captura con CFG["trace_chrome"] activo (--trace-chrome).
+"""
+
+import json
+import os
+import time
+
+from core.timing import registro_actual
+
+_PID = 1
+_TID_PYTHON = 1
+_TID_RED_BASE = 100
+_LARGO_MAXIMO_URL = 120
+
+
+def _ms_o_none(valor):
+    return None if valor is None or valor < 0 else round(valor, 3)
+
+
+def adjuntar_red_timeline(page):
+    """Registra cada request terminado (o fallido) de `page` en el registro de tiempos del hilo actual."""
+    registro = registro_actual()
+    if registro is None:
+        return
+
+    def _registrar(request, fallo=False):
+        try:
+            timing = request.timing
+            inicio_epoch_ms = timing.get("startTime") or time.time() * 1000
+            fin_ms = timing.get("responseEnd", -1)
+            if fin_ms is None or fin_ms < 0:
+                fin_ms = time.time() * 1000 - inicio_epoch_ms
+            registro.red.append(
+                {
+                    "url": request.url,
+                    "metodo": request.method,
+                    "tipo": request.resource_type,
+                    "inicio_ms": round(inicio_epoch_ms - registro.inicio_epoch * 1000, 3),
+                    "total_ms": round(max(0.0, fin_ms), 3),
+                    "ttfb_ms": _ms_o_none(timing.get("responseStart")),
+                    "fallo": request.failure if fallo else None,
+                }
+            )
+        except Exception:
+            pass
+
+    page.on("requestfinished", _registrar)
+    page.on("requestfailed", lambda request: _registrar(request, fallo=True))
+
+
+def _nombre_request(entrada):
+    url = entrada["url"].split("?", 1)[0]
+    if len(url) > _LARGO_MAXIMO_URL:
+        url = "…" + url[-_LARGO_MAXIMO_URL:]
+    return f"{entrada['metodo']} {url}"
+
+
+def _repartir_en_carriles(entradas):
+    """Asigna cada request al primer carril libre (greedy por inicio)."""
+    fines_por_carril = []
+    asignaciones = []
+    for entrada in sorted(entradas, key=lambda item: item["inicio_ms"]):
+        fin = entrada["inicio_ms"] + entrada["total_ms"]
+        for carril, fin_carril in enumerate(fines_por_carril):
+            if fin_carril <= entrada["inicio_ms"]:
+                fines_por_carril[carril] = fin
+                break
+        else:
+            carril = len(fines_por_carril)
+            fines_por_carril.append(fin)
+        asignaciones.append((carril, entrada))
+    return len(fines_por_carril), asignaciones
+
+
+def _metadata(nombre, tid, args):
+    return {"name": nombre, "ph": "M", "pid": _PID, "tid": tid, "args": args}
+
+
+def eventos_trace(registro):
+    """Lista de trace events (unidades en microsegundos) para `registro`."""
+    eventos = [
+        _metadata("process_name", _TID_PYTHON, {"name": f"sky-qa-testbot {registro.id_ejecucion}"}),
+        _metadata("thread_name", _TID_PYTHON, {"name": "Python (etapas)"}),
+        _metadata("thread_sort_index", _TID_PYTHON, {"sort_index": 0}),
+    ]
+    for span in registro.spans:
+        if span["total_ms"] is None:
+            continue
+        args = {
+            "sleep_ms": span["sleep_ms"],
+            "sondeo_ms": span["sondeo_ms"],
+            "llamadas_cdp": span["llamadas_cdp"],
+            **span["atributos"],
+        }
+        if span["error"]:
+            args["error"] = span["error"]
+        eventos.append(
+            {
+                "name": span["nombre"],
+                "cat": "etapa" if span["profundidad"] <= 1 else "python",
+                "ph": "X",
+                "pid": _PID,
+                "tid": _TID_PYTHON,
+                "ts": round(span["inicio_ms"] * 1000),
+                "dur": max(1, round(span["total_ms"] * 1000)),
+                "args": args,
+            }
+        )
+
+    carriles, asignaciones = _repartir_en_carriles(registro.red)
+    for carril in range(carriles):
+        tid = _TID_RED_BASE + carril
+        eventos.append(_metadata("thread_name", tid, {"name": f"Red #{carril + 1}"}))
+        eventos.append(_metadata("thread_sort_index", tid, {"sort_index": 1 + carril}))
+    for carril, entrada in asignaciones:
+        args = {"url": entrada["url"], "ttfb_ms": entrada["ttfb_ms"]}
+        if entrada["fallo"]:
+            args["fallo"] = entrada["fallo"]
+        eventos.append(
+            {
+                "name": _nombre_request(entrada),
+                "cat": f"red,{entrada['tipo']}",
+                "ph": "X",
+                "pid": _PID,
+                "tid": _TID_RED_BASE + carril,
+                "ts": round(entrada["inicio_ms"] * 1000),
+                "dur": max(1, round(entrada["total_ms"] * 1000)),
+                "args": args,
+            }
+        )
+    return eventos
+
+
+def escribir_trace_chrome(registro, base_dir="screenshots_pruebas", sufijo=""):
+    """Guarda screenshots_pruebas/trace_<id>.json (abrir en chrome://tracing o Perfetto). Retorna la ruta o None."""
+    path = os.path.join(base_dir, f"trace_{registro.id_ejecucion}{sufijo}.json")
+    try:
+        os.makedirs(base_dir, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as archivo:
+            json.dump(
+                {
+                    "traceEvents": eventos_trace(registro),
+                    "displayTimeUnit": "ms",
+                    "otherData": {
+                        "id_ejecucion": registro.id_ejecucion,
+                        "inicio_epoch": registro.inicio_epoch,
+                        **{clave: str(valor) for clave, valor in registro.atributos.items()},
+                    },
+                },
+                archivo,
+                ensure_ascii=False,
+            )
+    except Exception as error:
+        print(f"⚠️ No se pudo guardar el trace Chrome '{path}': {error}")
+        return None
+    print(f"🧭 Trace Chrome -> {path} (abrir en chrome://tracing o ui.perfetto.dev)")
+    return path
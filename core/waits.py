@@ -0,0 +1,187 @@
+"""
+Esperas adaptativas: resuelven apenas se cumple una condición concreta de "listo"
+(elemento estable, red inactiva, respuesta XHR recibida). El valor fijo que antes se
+dormía queda como tope máximo (`tope_ms`), así en ambientes rápidos no se paga entero.
+
+Con CFG["esperas_adaptativas"] = False (--esperas-fijas) todas duermen el tope, como antes.
+"""
+
+import re
+import time
+from collections import deque
+
+import core.state as state
+from core.timing import registrar_sleep
+
+VENTANA_RED_INACTIVA_MS = 500
+VENTANA_ESTABLE_MS = 150
+_PASO_MS = 100
+_TIPOS_RED_RELEVANTES = {"document", "xhr", "fetch"}
+_MONITORES = {}
+
+_JS_ESPERAR_ESTABLE = """(el, [ventana, tope]) => new Promise((resolve) => {
+    const inicio = performance.now();
+    let ultimo = null;
+    let estableDesde = inicio;
+    const paso = () => {
+        if (!el.isConnected) return resolve(false);
+        const ahora = performance.now();
+        const rect = el.getBoundingClientRect();
+        const actual = [rect.x, rect.y, rect.width, rect.height].join(",");
+        if (actual !== ultimo) {
+            ultimo = actual;
+            estableDesde = ahora;
+        }
+        if (rect.width > 0 && rect.height > 0 && ahora - estableDesde >= ventana) return resolve(true);
+        if (ahora - inicio >= tope) return resolve(false);
+        setTimeout(paso, 50);
+    };
+    paso();
+})"""
+
+
+class MonitorRed:
+    """Requests document/xhr/fetch en vuelo y últimas respuestas de una página."""
+
+    def __init__(self, page):
+        self.page = page
+        self.en_vuelo = set()
+        self.ultima_actividad = time.monotonic()
+        self.respuestas = deque(maxlen=300)
+
+    def _al_iniciar(self, request):
+        if request.resource_type not in _TIPOS_RED_RELEVANTES:
+            return
+        self.en_vuelo.add(request)
+        self.ultima_actividad = time.monotonic()
+
+    def _al_terminar(self, request):
+        if request not in self.en_vuelo:
+            return
+        self.en_vuelo.discard(request)
+        self.ultima_actividad = time.monotonic()
+        self.respuestas.append((self.ultima_actividad, request.url))
+
+    def _al_cerrar(self, _page=None):
+        _MONITORES.pop(id(self.page), None)
+
+
+def _adaptativas_activas():
+    return state.CFG.get("esperas_adaptativas", True)
+
+
+def _restante_ms(deadline):
+    return max(0, int((deadline - time.monotonic()) * 1000))
+
+
+def adjuntar_monitor_red(page):
+    """Registra el monitor de red en la página (idempotente)."""
+    monitor = _MONITORES.get(id(page))
+    if monitor:
+        return monitor
+    monitor = MonitorRed(page)
+    page.on("request", monitor._al_iniciar)
+    page.on("requestfinished", monitor._al_terminar)
+    page.on("requestfailed", monitor._al_terminar)
+    page.on("close", monitor._al_cerrar)
+    _MONITORES[id(page)] = monitor
+    return monitor
+
+
+def marca_red(page):
+    """Marca temporal para esperar_respuesta(..., desde=marca) tomada antes de disparar la acción."""
+    adjuntar_monitor_red(page)
+    return time.monotonic()
+
+
+def esperar_red_inactiva(page, tope_ms, ventana_ms=VENTANA_RED_INACTIVA_MS):
+    """
+    Espera a que no haya requests document/xhr/fetch en vuelo durante `ventana_ms`
+    (contados desde la llamada o la última actividad). Retorna True si se logró antes del tope.
+    """
+    if not _adaptativas_activas():
+        page.wait_for_timeout(tope_ms)
+        return False
+
+    monitor = adjuntar_monitor_red(page)
+    llamada = time.monotonic()
+    deadline = llamada + tope_ms / 1000
+    while True:
+        ahora = time.monotonic()
+        inactiva_desde = max(llamada, monitor.ultima_actividad)
+        if not monitor.en_vuelo and (ahora - inactiva_desde) * 1000 >= ventana_ms:
+            return True
+        restante = _restante_ms(deadline)
+        if restante <= 0:
+            return False
+        state.verificar_cancelacion()
+        page.wait_for_timeout(min(_PASO_MS, restante))
+
+
+def esperar_estable(locator, tope_ms, ventana_ms=VENTANA_ESTABLE_MS):
+    """Espera a que el elemento sea visible y su bounding box no cambie durante `ventana_ms`."""
+    if not _adaptativas_activas():
+        locator.page.wait_for_timeout(tope_ms)
+        return False
+
+    deadline = time.monotonic() + tope_ms / 1000
+    inicio = time.perf_counter()
+    try:
+        locator.wait_for(state="visible", timeout=max(1, tope_ms))
+        return bool(locator.evaluate(_JS_ESPERAR_ESTABLE, [ventana_ms, _restante_ms(deadline)]))
+    except Exception:
+        return False
+    finally:
+        registrar_sleep((time.perf_counter() - inicio) * 1000)
+
+
+def esperar_respuesta(page, patron, tope_ms, desde=None):
+    """
+    Espera a que termine un request cuya URL contenga `patron` (str) o coincida (regex),
+    posterior a `desde` (ver marca_red). Retorna True si llegó antes del tope.
+    """
+    if not _adaptativas_activas():
+        page.wait_for_timeout(tope_ms)
+        return False
+
+    monitor = adjuntar_monitor_red(page)
+    desde = time.monotonic() if desde is None else desde
+    coincide = patron.search if isinstance(patron, re.Pattern) else (lambda url: patron in url)
+    deadline = time.monotonic() + tope_ms / 1000
+    while True:
+        if any(instante >= desde and coincide(url) for instante, url in monitor.respuestas):
+            return True
+        restante = _restante_ms(deadline)
+        if restante <= 0:
+            return False
+        state.verificar_cancelacion()
+        page.wait_for_timeout(min(_PASO_MS, restante))
+
+
+def esperar_xhr(page, patron, tope_ms, desde, ventana_red_ms=300):
+    """
+    esperar_respuesta(patron, desde=marca) y luego red inactiva por `ventana_red_ms` (lo que el XHR
+    dispare al renderizar), todo dentro del mismo tope. Retorna True si llegó la respuesta.
+    """
+    if not _adaptativas_activas():
+        page.wait_for_timeout(tope_ms)
+        return False
+
+    deadline = time.monotonic() + tope_ms / 1000
+    if not esperar_respuesta(page, patron, tope_ms, desde=desde):
+        return False
+    esperar_red_inactiva(page, _restante_ms(deadline), ventana_ms=ventana_red_ms)
+    return True
+
+
+def esperar_listo(page, tope_ms, locator=None, ventana_red_ms=VENTANA_RED_INACTIVA_MS):
+    """Red inactiva y, si se indica, `locator` estable; todo dentro del mismo tope."""
+    if not _adaptativas_activas():
+        page.wait_for_timeout(tope_ms)
+        return False
+
+    deadline = time.monotonic() + tope_ms / 1000
+    listo = esperar_red_inactiva(page, tope_ms, ventana_ms=ventana_red_ms)
+    if locator is not None:
+        listo = esperar_estable(locator, _restante_ms(deadline)) and listo
+    return listo
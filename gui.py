@@ -3,8 +3,6 @@ import queue
 import shutil
 import subprocess
 import sys
-import tempfile
-import threading
 import time
 import urllib.parse
 import urllib.request
@@ -26,6 +24,7 @@ from config import (
     LIMPIAR_EVIDENCIAS_ANTIGUAS,
     MALETAS_BODEGA,
     MALETAS_CABINA,
+    ORQUESTADOR_MAX_CONCURRENTES,
     PASAJERO,
     SEMANAS_RETENCION_EVIDENCIAS,
     SELECCION_ASIENTO,
@@ -36,14 +35,13 @@ from config import (
     VUELO_DESTINO,
     VUELO_ORIGEN,
 )
+from orquestador import Orquestador
 
 PROJECT_ROOT = Path(__file__).resolve().parent
-PYTHON_EXEC = sys.executable
 
 NO_CHECKPOINT = "NINGUNO"
 CDP_START_TIMEOUT_SEGUNDOS = 12
 GUI_SETTINGS_PATH = PROJECT_ROOT / ".sky_gui_settings.json"
-CONTROL_ROOT = PROJECT_ROOT / ".bot_runtime"
 MARKET_LABEL_TO_CODE = {
     "Perú": "PE",
     "Argentina": "AR",
@@ -146,16 +144,20 @@ class SkyBotGUI:
         self.root.geometry("1180x860")
         self.root.minsize(980, 700)
 
-        self.process = None
         self.queue = queue.Queue()
-        self.cdp_iniciado_automaticamente = False
         self._suspend_preset_tracking = False
-        self.control_dir_actual = None
-        self.pausa_solicitada = False
+        # Un panel (pestaña con estado y log) por ejecución del orquestador, por id de ejecución
+        self.paneles = {}
+        self._resumen_orquestador = None
 
         self._crear_variables()
         self.presets = self._presets_por_defecto()
         self._cargar_settings()
+        self.orquestador = Orquestador(
+            self._al_evento_orquestador,
+            max_concurrentes=self._max_concurrentes(),
+            preparar_cdp=self._preparar_cdp_ejecucion,
+        )
         self._construir_ui()
         self._registrar_tracking_cambios_preset()
         self._inicializar_scroll_global()
@@ -196,6 +198,7 @@ class SkyBotGUI:
         self.modo_exploracion_var = tk.BooleanVar(value=False)
         self.solo_exploracion_var = tk.BooleanVar(value=False)
         self.log_limpio_var = tk.BooleanVar(value=True)
+        self.max_concurrentes_var = tk.IntVar(value=ORQUESTADOR_MAX_CONCURRENTES)
 
         # Overrides opcionales de pasajero/pagador
         self.nombre_override_var = tk.StringVar(value=PASAJERO.get("nombre", ""))
@@ -715,6 +718,21 @@ class SkyBotGUI:
             style="Primary.TButton",
         )
         self.run_button.pack(side=tk.RIGHT, padx=(8, 0))
+        btn_casos = ttk.Button(self.acciones_frame, text="Ejecutar casos…", command=self._ejecutar_casos)
+        btn_casos.pack(side=tk.RIGHT, padx=(8, 0))
+        spin_concurrentes = ttk.Spinbox(
+            self.acciones_frame,
+            from_=1,
+            to=16,
+            textvariable=self.max_concurrentes_var,
+            width=3,
+            command=self._on_cambio_max_concurrentes,
+        )
+        spin_concurrentes.pack(side=tk.RIGHT, padx=(4, 0))
+        spin_concurrentes.bind("<FocusOut>", self._on_cambio_max_concurrentes, add="+")
+        spin_concurrentes.bind("<Return>", self._on_cambio_max_concurrentes, add="+")
+        lbl_concurrentes = ttk.Label(self.acciones_frame, text="Simultáneas")
+        lbl_concurrentes.pack(side=tk.RIGHT, padx=(8, 0))
         self.stop_button = ttk.Button(self.acciones_frame, text="Detener", command=self._detener_ejecucion, state=tk.DISABLED)
         self.stop_button.pack(side=tk.RIGHT, padx=(8, 0))
         self.pause_button = ttk.Button(
@@ -731,11 +749,42 @@ class SkyBotGUI:
             state=tk.DISABLED,
         )
         self.continue_button.pack(side=tk.RIGHT, padx=(8, 0))
+        self.stop_all_button = ttk.Button(
+            self.acciones_frame,
+            text="Detener todo",
+            command=self._detener_todas,
+            state=tk.DISABLED,
+        )
+        self.stop_all_button.pack(side=tk.RIGHT, padx=(8, 0))
+        self.close_tab_button = ttk.Button(
+            self.acciones_frame,
+            text="Cerrar pestaña",
+            command=self._cerrar_panel_ejecucion,
+            state=tk.DISABLED,
+        )
+        self.close_tab_button.pack(side=tk.RIGHT, padx=(8, 0))
         ttk.Button(self.acciones_frame, text="Limpiar log", command=self._limpiar_log).pack(side=tk.RIGHT, padx=(8, 0))
 
-        log_frame = ttk.LabelFrame(main, text="Salida")
-        log_frame.pack(fill=tk.X, expand=False)
-        self.log_text = tk.Text(
+        tooltip_concurrentes = (
+            "Máximo de ejecuciones a la vez; el resto espera en cola. Con Chrome por CDP cada ejecución usa "
+            "su propio puerto (9222, 9223, ...)."
+        )
+        self._add_tooltip(lbl_concurrentes, tooltip_concurrentes)
+        self._add_tooltip(spin_concurrentes, tooltip_concurrentes)
+        self._add_tooltip(btn_casos, "Encola varios casos guardados de una vez; cada uno corre en su propia pestaña.")
+
+        # Pestaña "General" (mensajes de la GUI) + una pestaña por ejecución con su estado y su log
+        self.ejecuciones_notebook = ttk.Notebook(main)
+        self.ejecuciones_notebook.pack(fill=tk.X, expand=False)
+        self.ejecuciones_notebook.bind("<<NotebookTabChanged>>", lambda _event: self._actualizar_botones(), add="+")
+        general = ttk.Frame(self.ejecuciones_notebook)
+        self.ejecuciones_notebook.add(general, text="General")
+        self.log_text = self._crear_texto_log(general)
+
+    def _crear_texto_log(self, parent):
+        log_frame = ttk.Frame(parent)
+        log_frame.pack(fill=tk.BOTH, expand=True)
+        log_text = tk.Text(
             log_frame,
             wrap=tk.WORD,
             height=6,
@@ -747,10 +796,11 @@ class SkyBotGUI:
             padx=8,
             pady=8,
         )
-        self.log_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scroll = ttk.Scrollbar(log_frame, orient=tk.VERTICAL, command=self.log_text.yview)
+        log_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scroll = ttk.Scrollbar(log_frame, orient=tk.VERTICAL, command=log_text.yview)
         scroll.pack(side=tk.RIGHT, fill=tk.Y)
-        self.log_text.configure(yscrollcommand=scroll.set)
+        log_text.configure(yscrollcommand=scroll.set)
+        return log_text
 
     def _crear_area_scrollable(self, parent):
         wrap = ttk.Frame(parent)
@@ -1128,6 +1178,7 @@ class SkyBotGUI:
             "modo_exploracion": bool(self.modo_exploracion_var.get()),
             "solo_exploracion": bool(self.solo_exploracion_var.get()),
             "log_limpio": bool(self.log_limpio_var.get()),
+            "max_concurrentes": self._max_concurrentes(),
             "nombre_override": self.nombre_override_var.get(),
             "apellido_override": self.apellido_override_var.get(),
             "email_override": self.email_override_var.get(),
@@ -1192,6 +1243,7 @@ class SkyBotGUI:
         _set_bool(self.modo_exploracion_var, "modo_exploracion")
         _set_bool(self.solo_exploracion_var, "solo_exploracion")
         _set_bool(self.log_limpio_var, "log_limpio")
+        _set_int(self.max_concurrentes_var, "max_concurrentes")
 
         _set_str(self.nombre_override_var, "nombre_override")
         _set_str(self.apellido_override_var, "apellido_override")
@@ -1299,19 +1351,19 @@ class SkyBotGUI:
         self.status_var.set("Valores restablecidos")
         self._guardar_settings()
 
-    def _validar_numeros(self):
+    def _validar_numeros(self, datos):
         try:
-            adultos = int(self.adultos_var.get())
-            ninos = int(self.ninos_var.get())
-            infantes = int(self.infantes_var.get())
-            dias = int(self.dias_var.get())
-            dias_retorno = int(self.dias_retorno_var.get())
-            pausa = int(self.pausa_var.get())
-            slow_mo = int(self.slow_mo_var.get())
-            espera_final = int(self.espera_final_var.get())
-            retencion_evidencias_semanas = int(self.retencion_evidencias_semanas_var.get())
-            maletas_cabina = int(self.maletas_cabina_var.get())
-            maletas_bodega = int(self.maletas_bodega_var.get())
+            adultos = int(datos["adultos"])
+            ninos = int(datos["ninos"])
+            infantes = int(datos["infantes"])
+            dias = int(datos["dias"])
+            dias_retorno = int(datos["dias_retorno"])
+            pausa = int(datos["pausa"])
+            slow_mo = int(datos["slow_mo"])
+            espera_final = int(datos["espera_final"])
+            retencion_evidencias_semanas = int(datos["retencion_evidencias_semanas"])
+            maletas_cabina = int(datos["maletas_cabina"])
+            maletas_bodega = int(datos["maletas_bodega"])
         except Exception as error:
             raise ValueError(f"Hay un valor numérico inválido: {error}")
 
@@ -1401,10 +1453,12 @@ class SkyBotGUI:
         if not chrome_bin:
             return False, "No se encontró Chrome/Chromium instalado en el sistema."
 
+        # Un perfil por puerto: el orquestador puede tener varios Chrome CDP abiertos a la vez
+        nombre_perfil = "chrome-cdp-sky" if puerto == 9222 else f"chrome-cdp-sky-{puerto}"
         if sys.platform == "win32":
-            profile_dir = Path.home() / "AppData" / "Local" / "Temp" / "chrome-cdp-sky"
+            profile_dir = Path.home() / "AppData" / "Local" / "Temp" / nombre_perfil
         else:
-            profile_dir = Path("/tmp/chrome-cdp-sky")
+            profile_dir = Path("/tmp") / nombre_perfil
         args = [
             chrome_bin,
             f"--remote-debugging-port={puerto}",
@@ -1424,51 +1478,45 @@ class SkyBotGUI:
             time.sleep(0.25)
         return False, f"Chrome se inició, pero CDP no respondió en {CDP_START_TIMEOUT_SEGUNDOS}s."
 
-    def _asegurar_chrome_cdp(self):
-        cdp_url = self._normalizar_cdp_url(self.cdp_url_var.get())
-        self.cdp_url_var.set(cdp_url)
+    def _preparar_cdp_ejecucion(self, cdp_url):
+        """Para el orquestador (hilo de fondo, sin tocar widgets): deja Chrome CDP escuchando en `cdp_url`."""
         if self._cdp_disponible(cdp_url):
-            self.cdp_iniciado_automaticamente = False
-            return True
-
-        self._append_log("ℹ️ CDP no disponible; iniciando Chrome automáticamente...")
+            return True, "", False
         ok, mensaje = self._iniciar_chrome_cdp(cdp_url)
-        self.cdp_iniciado_automaticamente = bool(ok)
-        self._append_log(("✅ " if ok else "❌ ") + mensaje)
-        return ok
+        return ok, f"{cdp_url}: {mensaje}", ok
 
     def _iniciar_chrome_cdp_manual(self):
         cdp_url = self._normalizar_cdp_url(self.cdp_url_var.get())
         self.cdp_url_var.set(cdp_url)
         if self._cdp_disponible(cdp_url):
-            self.cdp_iniciado_automaticamente = False
             self._append_log(f"✅ CDP activo en {cdp_url}")
             self.status_var.set("CDP activo")
             return
 
         ok, mensaje = self._iniciar_chrome_cdp(cdp_url)
-        self.cdp_iniciado_automaticamente = bool(ok)
         self._append_log(("✅ " if ok else "❌ ") + mensaje)
         self.status_var.set("CDP activo" if ok else "Error iniciando CDP")
         if not ok:
             messagebox.showerror("CDP", mensaje)
 
-    def _construir_comando(self):
-        numeros = self._validar_numeros()
-        market_code = self._market_code_from_label(self.market_var.get())
-        tipo_viaje_code = self._trip_code_from_label(self.tipo_viaje_var.get())
-        checkpoint_code = self._checkpoint_code_from_label(self.checkpoint_var.get())
-        seleccion_asiento_code = self._seat_strategy_code_from_label(self.seleccion_asiento_var.get())
-
-        ambiente_code = self._ambiente_code_from_label(self.ambiente_var.get())
-        cmd = [PYTHON_EXEC, "-u", str(PROJECT_ROOT / "test_sky.py")]
-        if self.control_dir_actual:
-            cmd.extend(["--control-dir", str(self.control_dir_actual)])
+    def _construir_comando(self, datos):
+        """
+        Flags de test_sky.py para `datos` (formulario o caso, ver _estado_actual_para_preset). El orquestador
+        agrega --id-ejecucion, --control-dir y, con Chrome por CDP, el puerto asignado.
+        """
+        numeros = self._validar_numeros(datos)
+        market_code = self._market_code_from_label(datos["market"])
+        tipo_viaje_code = self._trip_code_from_label(datos["tipo_viaje"])
+        checkpoint_code = self._checkpoint_code_from_label(datos["checkpoint"])
+        seleccion_asiento_code = self._seat_strategy_code_from_label(datos["seleccion_asiento"])
+
+        ambiente_code = self._ambiente_code_from_label(datos["ambiente"])
+        cmd = []
         cmd.extend(["--market", market_code])
         cmd.extend(["--ambiente", ambiente_code])
         cmd.extend(["--tipo-viaje", tipo_viaje_code])
-        origen = self.origen_var.get().strip()
-        destino = self.destino_var.get().strip()
+        origen = (datos["origen"] or "").strip()
+        destino = (datos["destino"] or "").strip()
         if origen:
             cmd.extend(["--origen", origen])
         if destino:
@@ -1485,134 +1533,251 @@ class SkyBotGUI:
         cmd.extend(["--slow-mo", str(numeros["slow_mo"])])
         cmd.extend(["--espera-final-segundos", str(numeros["espera_final"])])
         cmd.extend(["--retencion-evidencias-semanas", str(numeros["retencion_evidencias_semanas"])])
-        if self.limpiar_evidencias_antiguas_var.get():
+        if datos["limpiar_evidencias_antiguas"]:
             cmd.append("--limpiar-evidencias-antiguas")
         else:
             cmd.append("--no-limpiar-evidencias-antiguas")
 
         if checkpoint_code and checkpoint_code != NO_CHECKPOINT:
             cmd.extend(["--checkpoint", checkpoint_code])
-        if self.headless_var.get():
+        if datos["headless"]:
             cmd.append("--headless")
-        if self.usar_chrome_existente_var.get():
-            cmd.append("--usar-chrome-existente")
-            cdp_url = self._normalizar_cdp_url(self.cdp_url_var.get())
-            self.cdp_url_var.set(cdp_url)
-            if cdp_url:
-                cmd.extend(["--cdp-url", cdp_url])
-            if self.cdp_iniciado_automaticamente:
-                cmd.append("--cdp-reutilizar-primera-pestana")
-        if self.modo_exploracion_var.get():
+        if datos["modo_exploracion"]:
             cmd.append("--modo-exploracion")
-        if self.solo_exploracion_var.get():
+        if datos["solo_exploracion"]:
             cmd.append("--solo-exploracion")
 
         overrides_texto = [
-            ("--nombre", self.nombre_override_var.get()),
-            ("--apellido", self.apellido_override_var.get()),
-            ("--email", self.email_override_var.get()),
-            ("--doc-tipo", self.doc_tipo_override_var.get()),
-            ("--doc-numero", self.doc_numero_override_var.get()),
-            ("--telefono", self.telefono_override_var.get()),
-            ("--prefijo-pais", self.prefijo_pais_override_var.get()),
-            ("--pais-emision", self.pais_emision_override_var.get()),
-            ("--fecha-nac", self.fecha_nac_override_var.get()),
-            ("--tarjeta-numero", self.tarjeta_numero_override_var.get()),
-            ("--tarjeta-fecha", self.tarjeta_fecha_override_var.get()),
-            ("--tarjeta-cvv", self.tarjeta_cvv_override_var.get()),
+            ("--nombre", datos["nombre_override"]),
+            ("--apellido", datos["apellido_override"]),
+            ("--email", datos["email_override"]),
+            ("--doc-tipo", datos["doc_tipo_override"]),
+            ("--doc-numero", datos["doc_numero_override"]),
+            ("--telefono", datos["telefono_override"]),
+            ("--prefijo-pais", datos["prefijo_pais_override"]),
+            ("--pais-emision", datos["pais_emision_override"]),
+            ("--fecha-nac", datos["fecha_nac_override"]),
+            ("--tarjeta-numero", datos["tarjeta_numero_override"]),
+            ("--tarjeta-fecha", datos["tarjeta_fecha_override"]),
+            ("--tarjeta-cvv", datos["tarjeta_cvv_override"]),
         ]
         for flag, valor in overrides_texto:
             texto = (valor or "").strip()
             if texto:
                 cmd.extend([flag, texto])
 
-        genero = (self.genero_override_var.get() or "").strip()
+        genero = (datos["genero_override"] or "").strip()
         if genero in {"Masculino", "Femenino"}:
             cmd.extend(["--genero", genero])
 
         return cmd
 
-    def _preparar_control_dir(self):
-        CONTROL_ROOT.mkdir(parents=True, exist_ok=True)
-        self.control_dir_actual = Path(tempfile.mkdtemp(prefix="run_", dir=str(CONTROL_ROOT)))
-        self.pausa_solicitada = False
-
-    def _control_path(self, nombre):
-        if not self.control_dir_actual:
-            return None
-        return self.control_dir_actual / nombre
+    def _max_concurrentes(self):
+        try:
+            return max(1, int(self.max_concurrentes_var.get()))
+        except (tk.TclError, ValueError):
+            return ORQUESTADOR_MAX_CONCURRENTES
+
+    def _on_cambio_max_concurrentes(self, _event=None):
+        self.orquestador.max_concurrentes = self._max_concurrentes()
+        self.orquestador.despachar()
+
+    def _datos_para_caso(self, base, nombre_caso):
+        """Formulario actual + valores del caso; la tarjeta sigue al market del caso si no fue editada."""
+        caso = self.presets.get(nombre_caso) or {}
+        datos = {**base, **caso}
+        market_base = self._market_code_from_label(base["market"])
+        market_caso = self._market_code_from_label(datos["market"])
+        campos_tarjeta = {
+            "numero": "tarjeta_numero_override",
+            "fecha": "tarjeta_fecha_override",
+            "cvv": "tarjeta_cvv_override",
+        }
+        if market_caso != market_base and not any(clave in caso for clave in campos_tarjeta.values()):
+            defaults_base = self._tarjeta_defaults_market(market_base)
+            if all(base[clave] == defaults_base.get(campo, "") for campo, clave in campos_tarjeta.items()):
+                defaults_caso = self._tarjeta_defaults_market(market_caso)
+                for campo, clave in campos_tarjeta.items():
+                    datos[clave] = defaults_caso.get(campo, "")
+        return datos
+
+    def _encolar(self, nombre, datos):
+        cmd = self._construir_comando(datos)
+        ejecucion = self.orquestador.encolar(
+            nombre,
+            cmd,
+            usa_cdp=bool(datos["usar_chrome_existente"]),
+            cdp_url=self._normalizar_cdp_url(datos["cdp_url"]),
+        )
+        self._crear_panel_ejecucion(ejecucion, bool(datos["log_limpio"]))
+        return ejecucion
 
-    def _escribir_control(self, nombre, contenido=""):
-        path = self._control_path(nombre)
-        if not path:
+    def _iniciar_ejecucion(self):
+        try:
+            datos = self._estado_actual_para_preset()
+            nombre = self.preset_var.get() or CUSTOM_PRESET_NAME
+            ejecucion = self._encolar(nombre, datos)
+        except (ValueError, tk.TclError) as error:
+            messagebox.showerror("Validación", str(error))
             return
-        path.write_text(contenido, encoding="utf-8")
+        self.cdp_url_var.set(ejecucion.cdp_base)
+        self._guardar_settings()
+        self.ejecuciones_notebook.select(self.paneles[ejecucion.id]["frame"])
 
-    def _borrar_control(self, nombre):
-        path = self._control_path(nombre)
-        if not path:
+    def _ejecutar_casos(self):
+        nombres = [nombre for nombre in self.presets if nombre != CUSTOM_PRESET_NAME]
+        if not nombres:
+            messagebox.showinfo("Ejecutar casos", "No hay casos guardados.")
             return
+
+        dialogo = tk.Toplevel(self.root)
+        dialogo.title("Ejecutar casos")
+        dialogo.transient(self.root)
+        cuerpo = ttk.Frame(dialogo, padding=12)
+        cuerpo.pack(fill=tk.BOTH, expand=True)
+        ttk.Label(
+            cuerpo,
+            text=(
+                f"Casos a encolar (corren de a {self._max_concurrentes()} a la vez; "
+                "lo que el caso no define se toma del formulario):"
+            ),
+        ).pack(anchor="w", pady=(0, 6))
+        seleccion = {}
+        for nombre in nombres:
+            variable = tk.BooleanVar(value=True)
+            ttk.Checkbutton(cuerpo, text=nombre, variable=variable).pack(anchor="w", pady=1)
+            seleccion[nombre] = variable
+
+        def encolar():
+            elegidos = [nombre for nombre, variable in seleccion.items() if variable.get()]
+            dialogo.destroy()
+            self._encolar_casos(elegidos)
+
+        botones = ttk.Frame(cuerpo)
+        botones.pack(fill=tk.X, pady=(10, 0))
+        ttk.Button(botones, text="Encolar", command=encolar, style="Primary.TButton").pack(side=tk.RIGHT)
+        ttk.Button(botones, text="Cancelar", command=dialogo.destroy).pack(side=tk.RIGHT, padx=(0, 8))
+        dialogo.grab_set()
+
+    def _encolar_casos(self, nombres):
         try:
-            path.unlink()
-        except FileNotFoundError:
+            base = self._estado_actual_para_preset()
+        except tk.TclError as error:
+            messagebox.showerror("Validación", f"Hay un valor numérico inválido: {error}")
             return
+        encolados = 0
+        for nombre in nombres:
+            try:
+                self._encolar(nombre, self._datos_para_caso(base, nombre))
+                encolados += 1
+            except ValueError as error:
+                self._append_log(f"❌ Caso '{nombre}' no encolado: {error}")
+        if encolados:
+            self._append_log(f"🧮 {encolados} caso(s) encolados; máximo {self._max_concurrentes()} simultáneos.")
+        self._guardar_settings()
+
+    def _crear_panel_ejecucion(self, ejecucion, log_limpio):
+        frame = ttk.Frame(self.ejecuciones_notebook)
+        estado_var = tk.StringVar(value="En cola")
+        ttk.Label(frame, textvariable=estado_var).pack(anchor="w", padx=8, pady=(4, 2))
+        log_text = self._crear_texto_log(frame)
+        self.ejecuciones_notebook.add(frame, text=self._titulo_panel(ejecucion, None))
+        self.paneles[ejecucion.id] = {
+            "frame": frame,
+            "estado_var": estado_var,
+            "log_text": log_text,
+            "log_limpio": log_limpio,
+            "pausa": None,
+            "pausa_solicitada": False,
+            "progreso": "",
+        }
+
+    def _titulo_panel(self, ejecucion, pausa):
+        iconos = {
+            "en_cola": "⏳",
+            "iniciando": "⏳",
+            "corriendo": "▶",
+            "ok": "✅",
+            "error": "❌",
+            "detenida": "⏹",
+            "cancelada": "⏹",
+        }
+        icono = "⏸" if pausa else iconos.get(ejecucion.estado, "•")
+        numero = ejecucion.id.rsplit("_", 1)[-1]
+        return f"{icono} #{numero} {ejecucion.nombre[:28]}"
+
+    def _texto_estado_panel(self, ejecucion, panel):
+        if ejecucion.estado == "en_cola":
+            return "En cola" + (" (esperando cupo o puerto CDP libre)" if ejecucion.usa_cdp else " (esperando cupo)")
+        if ejecucion.estado == "iniciando":
+            return f"Iniciando{f' en {ejecucion.cdp_url}' if ejecucion.cdp_url else ''}..."
+        if ejecucion.estado == "corriendo":
+            pausa_info = panel["pausa"]
+            if pausa_info:
+                etapa = pausa_info.get("stage", "DESCONOCIDA")
+                contexto = pausa_info.get("context", "")
+                if contexto.startswith("recovery:"):
+                    motivo = contexto.split(":", 1)[1] or "error"
+                    return f"Corrección requerida en {etapa} ({motivo})"
+                return f"Pausado para edición manual en {etapa}"
+            if panel["pausa_solicitada"]:
+                return "Pausa solicitada; esperando punto seguro..."
+            return panel["progreso"] or "En ejecución"
+        if ejecucion.estado == "ok":
+            return f"Finalizado con código {ejecucion.codigo}"
+        if ejecucion.estado == "error":
+            return "Error de ejecución" if ejecucion.codigo is None else f"Finalizado con código {ejecucion.codigo}"
+        return "Detenida" if ejecucion.estado == "detenida" else "Cancelada antes de iniciar"
+
+    def _seleccion_actual(self):
+        """(ejecución, panel) de la pestaña seleccionada; (None, None) en la pestaña General."""
+        seleccionada = self.ejecuciones_notebook.select()
+        for id_ejecucion, panel in self.paneles.items():
+            if str(panel["frame"]) == seleccionada:
+                return self.orquestador.ejecucion(id_ejecucion), panel
+        return None, None
 
     def _pausar_para_edicion(self):
-        if not self.process or self.process.poll() is not None:
+        ejecucion, panel = self._seleccion_actual()
+        if ejecucion is None or ejecucion.estado != "corriendo":
             self.status_var.set("No hay ejecución activa para pausar")
             return
-        if not self.control_dir_actual:
+        if not self.orquestador.enviar_control(ejecucion.id, "pausa"):
             self.status_var.set("No hay control de ejecución disponible")
             return
-        self._escribir_control("pause.request", "pause\n")
-        self.pausa_solicitada = True
-        self.pause_button.configure(state=tk.DISABLED)
-        self.status_var.set("Pausa solicitada; esperando punto seguro...")
-        self._append_log("⏸️ Pausa para edición solicitada.")
+        panel["pausa_solicitada"] = True
+        self._append_log_ejecucion(ejecucion.id, "⏸️ Pausa para edición solicitada.")
+        self._actualizar_estados()
 
     def _continuar_despues_edicion(self):
-        if not self.control_dir_actual:
+        ejecucion, panel = self._seleccion_actual()
+        if ejecucion is None or not self.orquestador.enviar_control(ejecucion.id, "continuar"):
             self.status_var.set("No hay ejecución pausada")
             return
-        self._escribir_control("continue.request", "continue\n")
-        self.continue_button.configure(state=tk.DISABLED)
-        self.pause_button.configure(state=tk.NORMAL if self.process and self.process.poll() is None else tk.DISABLED)
-        self.status_var.set("Continuando ejecución...")
-        self._append_log("▶️ Continuando después de edición manual.")
+        panel["pausa"] = None
+        panel["pausa_solicitada"] = False
+        self._append_log_ejecucion(ejecucion.id, "▶️ Continuando después de edición manual.")
+        self._actualizar_estados()
 
-    def _iniciar_ejecucion(self):
-        if self.process and self.process.poll() is None:
-            messagebox.showwarning("Ejecución en curso", "Ya hay una ejecución activa.")
+    def _detener_ejecucion(self):
+        ejecucion, _panel = self._seleccion_actual()
+        if ejecucion is None or not ejecucion.activa:
+            self.status_var.set("No hay ejecución activa")
             return
+        self._append_log_ejecucion(ejecucion.id, "⏹️ Solicitando detener proceso...")
+        self.orquestador.detener(ejecucion.id)
 
-        if self.usar_chrome_existente_var.get() and not self._asegurar_chrome_cdp():
-            messagebox.showerror(
-                "CDP",
-                "No se pudo iniciar/conectar a Chrome CDP automáticamente. Revisa la CDP URL o inicia Chrome manualmente.",
-            )
-            return
+    def _detener_todas(self):
+        self._append_log("⏹️ Deteniendo todas las ejecuciones y vaciando la cola...")
+        self.orquestador.detener_todas()
 
-        try:
-            self._preparar_control_dir()
-            cmd = self._construir_comando()
-        except ValueError as error:
-            messagebox.showerror("Validación", str(error))
+    def _cerrar_panel_ejecucion(self):
+        ejecucion, panel = self._seleccion_actual()
+        if ejecucion is None or ejecucion.activa:
             return
-
-        log_limpio = bool(self.log_limpio_var.get())
-        self._guardar_settings()
-        if log_limpio:
-            self._append_log("▶️ Iniciando ejecución del flujo...")
-        else:
-            self._append_log(f"$ {' '.join(cmd)}")
-        self.status_var.set("Iniciando ejecución...")
-        self.run_button.configure(state=tk.DISABLED)
-        self.stop_button.configure(state=tk.NORMAL)
-        self.pause_button.configure(state=tk.NORMAL)
-        self.continue_button.configure(state=tk.DISABLED)
-
-        worker = threading.Thread(target=self._ejecutar_proceso, args=(cmd, log_limpio), daemon=True)
-        worker.start()
+        self.ejecuciones_notebook.forget(panel["frame"])
+        panel["frame"].destroy()
+        del self.paneles[ejecucion.id]
 
     def _filtrar_linea_log(self, text, log_limpio):
         if text is None:
@@ -1661,115 +1826,115 @@ class SkyBotGUI:
 
         return None
 
-    def _ejecutar_proceso(self, cmd, log_limpio):
-        try:
-            self.process = subprocess.Popen(
-                cmd,
-                cwd=str(PROJECT_ROOT),
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
-            )
-            for line in self.process.stdout:
-                filtrada = self._filtrar_linea_log(line.rstrip("\n"), log_limpio)
-                if filtrada is not None:
-                    self.queue.put(("log", filtrada))
-            return_code = self.process.wait()
-            self.queue.put(("status", f"Finalizado con código {return_code}"))
-        except Exception as error:
-            self.queue.put(("log", f"❌ Error ejecutando proceso: {error}"))
-            self.queue.put(("status", "Error de ejecución"))
-        finally:
-            self.queue.put(("done", None))
-
-    def _detener_ejecucion(self):
-        if not self.process or self.process.poll() is not None:
-            self.status_var.set("No hay ejecución activa")
-            return
-        self._append_log("⏹️ Solicitando detener proceso...")
-        self._borrar_control("pause.request")
-        self._borrar_control("continue.request")
-        self.process.terminate()
-        self.status_var.set("Deteniendo...")
-        self.root.after(3000, self._forzar_stop_si_sigue)
-
-    def _forzar_stop_si_sigue(self):
-        if self.process and self.process.poll() is None:
-            self._append_log("⚠️ Forzando cierre del proceso...")
-            self.process.kill()
+    def _al_evento_orquestador(self, id_ejecucion, tipo, dato):
+        # Llega desde hilos del orquestador: solo se encola, Tk se toca en _procesar_cola
+        self.queue.put((tipo, id_ejecucion, dato))
 
     def _procesar_cola(self):
-        self._actualizar_estado_pausa()
         while True:
             try:
-                kind, payload = self.queue.get_nowait()
+                kind, id_ejecucion, payload = self.queue.get_nowait()
             except queue.Empty:
                 break
+            panel = self.paneles.get(id_ejecucion)
+            if panel is None:
+                continue
             if kind == "log":
-                self._append_log(payload)
-            elif kind == "status":
-                self.status_var.set(payload)
-            elif kind == "done":
-                self.run_button.configure(state=tk.NORMAL)
-                self.stop_button.configure(state=tk.DISABLED)
-                self.pause_button.configure(state=tk.DISABLED)
-                self.continue_button.configure(state=tk.DISABLED)
-                self.process = None
-                self.pausa_solicitada = False
+                filtrada = self._filtrar_linea_log(payload, panel["log_limpio"])
+                if filtrada is not None:
+                    self._append_log_ejecucion(id_ejecucion, filtrada)
+            elif kind == "comando":
+                if panel["log_limpio"]:
+                    self._append_log_ejecucion(id_ejecucion, "▶️ Iniciando ejecución del flujo...")
+                else:
+                    self._append_log_ejecucion(id_ejecucion, f"$ {' '.join(payload)}")
+            elif kind == "bus":
+                self._procesar_evento_bus(panel, payload)
+            elif kind == "fin":
+                panel["pausa"] = None
+                panel["pausa_solicitada"] = False
+                ejecucion = self.orquestador.ejecucion(id_ejecucion)
+                resultado = self._texto_estado_panel(ejecucion, panel)
+                self._append_log(f"🏁 {ejecucion.nombre} ({id_ejecucion}): {resultado}")
+
+        # Ejecuciones sin bus (aún conectando o bot con --sin-bus-control): paused.state como antes
+        for id_ejecucion, panel in self.paneles.items():
+            ejecucion = self.orquestador.ejecucion(id_ejecucion)
+            if ejecucion.estado == "corriendo" and ejecucion.bus is None:
+                panel["pausa"] = self.orquestador.leer_estado_pausado(id_ejecucion)
+                if panel["pausa"]:
+                    panel["pausa_solicitada"] = False
+        self._actualizar_estados()
         self.root.after(120, self._procesar_cola)
 
-    def _leer_estado_pausado(self):
-        paused_file = self._control_path("paused.state")
-        if not paused_file or not paused_file.exists():
-            return None
-
-        data = {}
-        try:
-            for linea in paused_file.read_text(encoding="utf-8").splitlines():
-                if "=" not in linea:
-                    continue
-                clave, valor = linea.split("=", 1)
-                data[clave.strip()] = valor.strip()
-        except Exception:
-            return {"stage": "DESCONOCIDA", "context": ""}
-        return data
-
-    def _actualizar_estado_pausa(self):
-        pausa_info = self._leer_estado_pausado()
-        esta_pausado = pausa_info is not None
-        proceso_activo = bool(self.process and self.process.poll() is None)
-
-        if esta_pausado:
-            self.pause_button.configure(state=tk.DISABLED)
-            self.continue_button.configure(state=tk.NORMAL)
-            etapa = pausa_info.get("stage", "DESCONOCIDA")
-            contexto = pausa_info.get("context", "")
-            if contexto.startswith("recovery:"):
-                motivo = contexto.split(":", 1)[1] or "error"
-                self.status_var.set(f"Corrección requerida en {etapa} ({motivo})")
-            else:
-                self.status_var.set(f"Pausado para edición manual en {etapa}")
-            return
-
-        if proceso_activo:
-            self.pause_button.configure(state=tk.NORMAL)
-            self.continue_button.configure(state=tk.DISABLED)
+    def _procesar_evento_bus(self, panel, mensaje):
+        tipo = mensaje.get("tipo")
+        if tipo == "pausado":
+            panel["pausa"] = {"stage": mensaje.get("etapa") or "DESCONOCIDA", "context": mensaje.get("contexto") or ""}
+            panel["pausa_solicitada"] = False
+        elif tipo == "reanudado":
+            panel["pausa"] = None
+        elif tipo == "etapa":
+            panel["log_text"].insert(tk.END, f"🧭 Etapa: {mensaje.get('etapa')}\n")
+            panel["log_text"].see(tk.END)
+        elif tipo == "progreso":
+            panel["progreso"] = f"Paso {mensaje.get('indice')}/{mensaje.get('total')}: {mensaje.get('paso')}"
+
+    def _actualizar_estados(self):
+        for id_ejecucion, panel in self.paneles.items():
+            ejecucion = self.orquestador.ejecucion(id_ejecucion)
+            panel["estado_var"].set(self._texto_estado_panel(ejecucion, panel))
+            titulo = self._titulo_panel(ejecucion, panel["pausa"] if ejecucion.estado == "corriendo" else None)
+            if self.ejecuciones_notebook.tab(panel["frame"], "text") != titulo:
+                self.ejecuciones_notebook.tab(panel["frame"], text=titulo)
+
+        resumen = self.orquestador.resumen()
+        if resumen != self._resumen_orquestador:
+            self._resumen_orquestador = resumen
+            activas, en_cola = resumen
+            if activas or en_cola:
+                self.status_var.set(f"{activas} en ejecución · {en_cola} en cola")
+            elif self.paneles:
+                self.status_var.set("Sin ejecuciones activas")
+        self._actualizar_botones()
+
+    def _actualizar_botones(self):
+        ejecucion, panel = self._seleccion_actual()
+        corriendo = ejecucion is not None and ejecucion.estado == "corriendo"
+        pausado = corriendo and bool(panel["pausa"])
+
+        def estado(habilitado):
+            return tk.NORMAL if habilitado else tk.DISABLED
+
+        self.stop_button.configure(state=estado(ejecucion is not None and ejecucion.activa))
+        self.pause_button.configure(state=estado(corriendo and not pausado and not panel["pausa_solicitada"]))
+        self.continue_button.configure(state=estado(pausado))
+        self.close_tab_button.configure(state=estado(ejecucion is not None and not ejecucion.activa))
+        self.stop_all_button.configure(state=estado(any(self.orquestador.resumen())))
 
     def _append_log(self, text):
         self.log_text.insert(tk.END, f"{text}\n")
         self.log_text.see(tk.END)
 
+    def _append_log_ejecucion(self, id_ejecucion, text):
+        panel = self.paneles.get(id_ejecucion)
+        if panel is None:
+            return
+        panel["log_text"].insert(tk.END, f"{text}\n")
+        panel["log_text"].see(tk.END)
+
     def _limpiar_log(self):
-        self.log_text.delete("1.0", tk.END)
+        _ejecucion, panel = self._seleccion_actual()
+        log_text = panel["log_text"] if panel else self.log_text
+        log_text.delete("1.0", tk.END)
 
     def _al_cerrar_ventana(self):
         self._guardar_settings()
-        if self.process and self.process.poll() is None:
-            cerrar = messagebox.askyesno("Cerrar", "Hay una ejecución activa. ¿Deseas detenerla y salir?")
+        if any(self.orquestador.resumen()):
+            cerrar = messagebox.askyesno("Cerrar", "Hay ejecuciones activas o en cola. ¿Deseas detenerlas y salir?")
             if not cerrar:
                 return
-            self._detener_ejecucion()
+            self.orquestador.detener_todas()
             self.root.after(300, self.root.destroy)
             return
         self.root.destroy()
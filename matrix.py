@@ -0,0 +1,360 @@
+"""
+Ejecutor de matriz de casos para test_sky.py.
+
+Corre varias combinaciones market / tipo de viaje / pasajeros en paralelo sobre un
+pool acotado de workers. Cada caso es un proceso test_sky.py independiente, con su
+propio CFG, su propia carpeta de exploración (--id-ejecucion) y su propio control_dir.
+Al terminar se consolida un resumen único en screenshots_pruebas/matrix_<timestamp>/.
+
+Ejemplos:
+  python matrix.py --markets PE CL AR BR --tipos-viaje ONE_WAY ROUND_TRIP --pax 1,0,0 2,1,0
+  python matrix.py --casos casos_nocturnos.json --workers 4
+  python matrix.py --markets PE CL --checkpoint CHECKOUT -- --ambiente stage
+  python matrix.py --markets PE CL AR BR --pax 1,0,0 --workers 16 --en-proceso
+"""
+
+import argparse
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+from cli import MARKETS_VALIDOS, TIPOS_VIAJE_VALIDOS, CHECKPOINTS_VALIDOS, aplicar_args, parse_args
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+CONTROL_ROOT = PROJECT_ROOT / ".bot_runtime"
+EVIDENCIAS_ROOT = PROJECT_ROOT / "screenshots_pruebas"
+
+# Flags que aplica la matriz antes de los de cada caso (el caso puede sobreescribirlos).
+# La limpieza de evidencias se hace una sola vez en el proceso padre para evitar carreras.
+ARGS_BASE_WORKER = [
+    "--headless",
+    "--slow-mo", "0",
+    "--espera-final-segundos", "0",
+    "--no-limpiar-evidencias-antiguas",
+]
+TIMEOUT_CASO_SEGUNDOS = 1800
+
+
+def _flag_desde_clave(clave):
+    return "--" + clave.replace("_", "-")
+
+
+def _args_desde_caso(caso):
+    """Convierte un dict estilo aplicar_args (claves = dest de argparse) en argv para test_sky.py."""
+    argv = []
+    for clave, valor in caso.items():
+        if valor is None:
+            continue
+        if clave == "limpiar_evidencias_antiguas":
+            argv.append("--limpiar-evidencias-antiguas" if valor else "--no-limpiar-evidencias-antiguas")
+            continue
+        if isinstance(valor, bool):
+            if valor:
+                argv.append(_flag_desde_clave(clave))
+            continue
+        argv.extend([_flag_desde_clave(clave), str(valor)])
+    return argv
+
+
+def _parsear_pax(valor):
+    partes = [parte.strip() for parte in valor.split(",")]
+    if len(partes) != 3:
+        raise argparse.ArgumentTypeError("Formato esperado: adultos,ninos,infantes (ej: 2,1,0)")
+    try:
+        adultos, ninos, infantes = (int(parte) for parte in partes)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(f"Cantidad inválida en '{valor}': {error}")
+    return {"adultos": adultos, "ninos": ninos, "infantes": infantes}
+
+
+def _cargar_casos_json(path):
+    with open(path, "r", encoding="utf-8") as archivo:
+        data = json.load(archivo)
+    if isinstance(data, dict):
+        data = data.get("casos", [])
+    if not isinstance(data, list) or not all(isinstance(caso, dict) for caso in data):
+        raise ValueError(f"'{path}' debe contener una lista de casos (dicts) o {{\"casos\": [...]}}.")
+    return data
+
+
+def _expandir_matriz(markets, tipos_viaje, pax, checkpoint):
+    casos = []
+    for market, tipo_viaje, pasajeros in itertools.product(markets, tipos_viaje, pax):
+        caso = {"market": market, "tipo_viaje": tipo_viaje, **pasajeros}
+        if checkpoint:
+            caso["checkpoint"] = checkpoint
+        casos.append(caso)
+    return casos
+
+
+def _resolver_caso(caso, args_extra):
+    """Valida el caso con el mismo parser/aplicar_args que usa test_sky.py."""
+    argv = ARGS_BASE_WORKER + list(args_extra) + _args_desde_caso(caso)
+    try:
+        cfg = aplicar_args(parse_args(argv))
+    except SystemExit:
+        raise ValueError(f"Flags inválidos para el caso {caso}: {' '.join(argv)}")
+    return argv, cfg
+
+
+def _id_caso(prefijo, indice, cfg):
+    pax = cfg["pasajeros"]
+    return (
+        f"{prefijo}_{indice:02d}_{cfg['market']}_{cfg['tipo_viaje']}_"
+        f"{pax['adultos']}-{pax['ninos']}-{pax['infantes']}"
+    )
+
+
+def _ejecutar_caso(id_caso, argv, cfg, directorio_salida, timeout_segundos):
+    CONTROL_ROOT.mkdir(parents=True, exist_ok=True)
+    control_dir = tempfile.mkdtemp(prefix="matrix_", dir=str(CONTROL_ROOT))
+    resumen_path = directorio_salida / f"{id_caso}.json"
+    log_path = directorio_salida / f"{id_caso}.log"
+    cmd = [
+        sys.executable,
+        "-u",
+        str(PROJECT_ROOT / "test_sky.py"),
+        *argv,
+        "--id-ejecucion", id_caso,
+        "--control-dir", control_dir,
+        "--resumen-json", str(resumen_path),
+    ]
+
+    inicio = time.monotonic()
+    codigo = None
+    error = None
+    try:
+        with open(log_path, "w", encoding="utf-8") as log:
+            proceso = subprocess.Popen(cmd, cwd=str(PROJECT_ROOT), stdout=log, stderr=subprocess.STDOUT, text=True)
+            try:
+                codigo = proceso.wait(timeout=timeout_segundos)
+            except subprocess.TimeoutExpired:
+                proceso.kill()
+                codigo = proceso.wait()
+                error = f"Timeout de {timeout_segundos}s"
+    except Exception as exc:
+        error = f"No se pudo lanzar el caso: {exc}"
+    finally:
+        shutil.rmtree(control_dir, ignore_errors=True)
+    duracion = time.monotonic() - inicio
+
+    resultado = {
+        "id_ejecucion": id_caso,
+        "market": cfg["market"],
+        "ambiente": cfg["ambiente"],
+        "tipo_viaje": cfg["tipo_viaje"],
+        "pasajeros": cfg["pasajeros"],
+        "checkpoint": cfg["checkpoint"],
+        "estado": "error",
+        "etapa_final": None,
+        "error": error,
+    }
+    try:
+        with open(resumen_path, "r", encoding="utf-8") as archivo:
+            resultado.update(json.load(archivo))
+    except Exception:
+        if not error:
+            resultado["error"] = f"El caso terminó con código {codigo} sin escribir resumen."
+    if error:
+        resultado["estado"] = "error"
+        resultado["error"] = error
+    resultado["codigo_salida"] = codigo
+    resultado["duracion_segundos"] = round(duracion, 2)
+    resultado["log"] = str(log_path)
+    return resultado
+
+
+def _imprimir_tabla(resultados):
+    encabezado = f"{'Caso':<48} {'Estado':<12} {'Etapa final':<18} {'Duración':>9}"
+    print(encabezado)
+    print("-" * len(encabezado))
+    for resultado in resultados:
+        print(
+            f"{resultado['id_ejecucion'][-48:]:<48} "
+            f"{resultado['estado']:<12} "
+            f"{(resultado.get('etapa_final') or '-'):<18} "
+            f"{resultado['duracion_segundos']:>8.1f}s"
+        )
+
+
+def ejecutar_matriz(
+    casos,
+    workers=None,
+    args_extra=(),
+    timeout_segundos=TIMEOUT_CASO_SEGUNDOS,
+    limpiar_evidencias=True,
+    en_proceso=False,
+):
+    """
+    Ejecuta los casos en paralelo y retorna el resumen consolidado (dict).
+    Con en_proceso=True los flujos corren en este mismo proceso vía core/async_runner.py
+    (un driver y un Chromium, con hasta `workers` flujos concurrentes) en lugar de un test_sky.py por caso.
+    """
+    prefijo = datetime.now().strftime("%Y%m%d_%H%M%S")
+    directorio_salida = EVIDENCIAS_ROOT / f"matrix_{prefijo}"
+    directorio_salida.mkdir(parents=True, exist_ok=True)
+
+    preparados = []
+    for indice, caso in enumerate(casos, start=1):
+        argv, cfg = _resolver_caso(caso, args_extra)
+        preparados.append((_id_caso(prefijo, indice, cfg), argv, cfg))
+
+    if limpiar_evidencias and preparados:
+        from core.helpers import limpiar_evidencias_antiguas
+
+        cfg_base = preparados[0][2]
+        limpiar_evidencias_antiguas(
+            base_dir=str(EVIDENCIAS_ROOT),
+            semanas_retencion=cfg_base.get("retencion_evidencias_semanas", 2),
+            habilitado=True,
+        )
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(preparados) or 1))
+    print(f"--- 🧮 Matriz: {len(preparados)} casos con {workers} workers -> {directorio_salida} ---")
+
+    inicio = time.monotonic()
+    resultados = []
+    lock = threading.Lock()
+
+    def _registrar(resultado):
+        with lock:
+            resultados.append(resultado)
+            icono = "✅" if resultado["estado"] == "ok" else "❌"
+            print(
+                f"{icono} [{len(resultados)}/{len(preparados)}] {resultado['id_ejecucion']} "
+                f"-> {resultado['estado']} ({resultado['duracion_segundos']:.1f}s)"
+            )
+
+    if en_proceso:
+        from core.async_runner import ejecutar_flujos
+
+        ejecutar_flujos(
+            [(id_caso, cfg) for id_caso, _, cfg in preparados],
+            concurrencia=workers,
+            al_terminar=_registrar,
+            timeout_segundos=timeout_segundos,
+            directorio_salida=directorio_salida,
+        )
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="matrix") as pool:
+            futuros = [
+                pool.submit(_ejecutar_caso, id_caso, argv, cfg, directorio_salida, timeout_segundos)
+                for id_caso, argv, cfg in preparados
+            ]
+            for futuro in as_completed(futuros):
+                _registrar(futuro.result())
+
+    resultados.sort(key=lambda item: item["id_ejecucion"])
+    duracion_total = time.monotonic() - inicio
+    resumen = {
+        "id_matriz": prefijo,
+        "workers": workers,
+        "modo": "en_proceso" if en_proceso else "procesos",
+        "total": len(resultados),
+        "ok": sum(1 for item in resultados if item["estado"] == "ok"),
+        "fallidos": sum(1 for item in resultados if item["estado"] != "ok"),
+        "duracion_pared_segundos": round(duracion_total, 2),
+        "duracion_secuencial_segundos": round(sum(item["duracion_segundos"] for item in resultados), 2),
+        "casos": resultados,
+    }
+    resumen_path = directorio_salida / "resumen.json"
+    with open(resumen_path, "w", encoding="utf-8") as archivo:
+        json.dump(resumen, archivo, ensure_ascii=False, indent=2)
+
+    print()
+    _imprimir_tabla(resultados)
+    print(
+        f"\n🧾 Resumen matriz -> {resumen_path}\n"
+        f"   {resumen['ok']}/{resumen['total']} OK | pared {resumen['duracion_pared_segundos']:.1f}s "
+        f"vs secuencial {resumen['duracion_secuencial_segundos']:.1f}s",
+    )
+    return resumen
+
+
+def parse_args_matriz(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    args_extra = []
+    if "--" in argv:
+        corte = argv.index("--")
+        argv, args_extra = argv[:corte], argv[corte + 1:]
+
+    parser = argparse.ArgumentParser(
+        description="🧮 Ejecuta una matriz de casos de test_sky.py en paralelo",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="Todo lo que vaya después de '--' se pasa tal cual a cada test_sky.py.",
+    )
+    parser.add_argument("--casos", type=str, metavar="JSON", help="Archivo JSON con lista de casos estilo aplicar_args")
+    parser.add_argument("--markets", nargs="+", choices=MARKETS_VALIDOS, help="Markets a combinar")
+    parser.add_argument("--tipos-viaje", nargs="+", choices=TIPOS_VIAJE_VALIDOS, help="Tipos de viaje a combinar")
+    parser.add_argument(
+        "--pax",
+        nargs="+",
+        type=_parsear_pax,
+        metavar="A,N,I",
+        help="Mezclas de pasajeros adultos,ninos,infantes (ej: 1,0,0 2,1,0)",
+    )
+    parser.add_argument("--checkpoint", choices=CHECKPOINTS_VALIDOS, help="Checkpoint común para los casos de matriz")
+    parser.add_argument("--workers", type=int, metavar="N", help="Máximo de casos simultáneos (por defecto: núcleos)")
+    parser.add_argument(
+        "--timeout-caso",
+        type=int,
+        default=TIMEOUT_CASO_SEGUNDOS,
+        metavar="SEG",
+        help=f"Tiempo máximo por caso (por defecto {TIMEOUT_CASO_SEGUNDOS}s)",
+    )
+    parser.add_argument(
+        "--no-limpiar-evidencias-antiguas",
+        dest="limpiar_evidencias",
+        action="store_false",
+        help="No limpia screenshots_pruebas antes de arrancar la matriz",
+    )
+    parser.add_argument(
+        "--en-proceso",
+        action="store_true",
+        help="Corre todos los casos en este proceso (un driver y un Chromium compartidos) en vez de un proceso por caso",
+    )
+    args = parser.parse_args(argv)
+    if not args.casos and not args.markets:
+        parser.error("Indica --casos o al menos --markets.")
+    return args, args_extra
+
+
+def main(argv=None):
+    args, args_extra = parse_args_matriz(argv)
+    casos = _cargar_casos_json(args.casos) if args.casos else []
+    if args.markets:
+        casos.extend(
+            _expandir_matriz(
+                args.markets,
+                args.tipos_viaje or ["ONE_WAY"],
+                args.pax or [{"adultos": 1, "ninos": 0, "infantes": 0}],
+                args.checkpoint,
+            )
+        )
+
+    try:
+        resumen = ejecutar_matriz(
+            casos,
+            workers=args.workers,
+            args_extra=args_extra,
+            timeout_segundos=args.timeout_caso,
+            limpiar_evidencias=args.limpiar_evidencias,
+            en_proceso=args.en_proceso,
+        )
+    except ValueError as error:
+        print(f"❌ {error}")
+        return 2
+    return 0 if resumen["fallidos"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,332 @@
+"""
+Orquestador de ejecuciones concurrentes de test_sky.py (lo usa gui.py).
+
+Mantiene una cola de ejecuciones (una configuración o caso de la GUI cada una) y lanza hasta
+`max_concurrentes` a la vez. Cada ejecución es un proceso test_sky.py con su propio control_dir,
+su propio --id-ejecucion y su conexión al bus de control (core/bus_control.py). Las que usan
+Chrome por CDP necesitan además un puerto libre del rango que parte en el de su CDP URL base
+(9222, 9223, ... ORQUESTADOR_PUERTOS_CDP puertos): cada una maneja su propio Chrome. La base se fija
+por ejecución al encolar, así casos con CDP URLs distintas no se pisan el rango. Si no hay puerto
+libre esperan en la cola y las que no usan CDP pueden adelantarse.
+
+Los eventos se entregan a `al_evento(id_ejecucion, tipo, dato)` desde hilos de fondo:
+    "estado"   en_cola | iniciando | corriendo | ok | error | detenida | cancelada
+    "comando"  argv final del proceso
+    "log"      línea de salida (sin filtrar)
+    "bus"      mensaje del bus de control (pausado, reanudado, etapa, progreso)
+    "fin"      estado final
+"""
+
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from datetime import datetime
+
+from cli import CDP_URL_DEFAULT
+from config import ORQUESTADOR_MAX_CONCURRENTES, ORQUESTADOR_PUERTOS_CDP
+from matrix import CONTROL_ROOT, PROJECT_ROOT
+
+BUS_CONEXION_TIMEOUT_SEGUNDOS = 30
+STOP_FORZADO_SEGUNDOS = 3
+ESTADOS_FINALES = ("ok", "error", "detenida", "cancelada")
+_ARCHIVOS_CONTROL = {"pausa": "pause.request", "continuar": "continue.request"}
+
+
+class Ejecucion:
+    """Una corrida de test_sky.py: argv base (sin flags de control ni CDP) y su estado en el orquestador."""
+
+    def __init__(self, id_ejecucion, nombre, argv, usa_cdp, cdp_base=CDP_URL_DEFAULT):
+        self.id = id_ejecucion
+        self.nombre = nombre
+        self.argv = list(argv)
+        self.usa_cdp = usa_cdp
+        self.estado = "en_cola"
+        # CDP URL del formulario o caso; cdp_url es la asignada al despachar (mismo host, puerto libre)
+        self.cdp_base = cdp_base
+        self.destino_cdp = None
+        self.cdp_url = None
+        self.control_dir = None
+        self.proceso = None
+        self.bus = None
+        self.codigo = None
+        self.detener_solicitado = False
+
+    @property
+    def activa(self):
+        return self.estado not in ESTADOS_FINALES
+
+
+class Orquestador:
+    def __init__(self, al_evento, max_concurrentes=ORQUESTADOR_MAX_CONCURRENTES, cdp_url=CDP_URL_DEFAULT,
+                 preparar_cdp=None):
+        """
+        `preparar_cdp(cdp_url)` deja un Chrome escuchando en esa URL y retorna (ok, mensaje, iniciado);
+        con iniciado=True la ejecución reutiliza la primera pestaña del Chrome recién abierto.
+        """
+        self.al_evento = al_evento
+        self.max_concurrentes = max_concurrentes
+        # Base por defecto para las ejecuciones que se encolan sin CDP URL propia
+        self.cdp_url = cdp_url
+        self.preparar_cdp = preparar_cdp
+        self._lock = threading.RLock()
+        self._cola = []
+        self._activas = {}
+        self._ejecuciones = {}
+        self._puertos_ocupados = set()
+        self._secuencia = 0
+
+    # ---- cola y cupos ----
+
+    def encolar(self, nombre, argv, usa_cdp=False, cdp_url=None):
+        """Agrega una ejecución a la cola; `cdp_url` es la base de su rango de puertos CDP."""
+        with self._lock:
+            self._secuencia += 1
+            id_ejecucion = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{self._secuencia:02d}"
+            ejecucion = Ejecucion(id_ejecucion, nombre, argv, usa_cdp, cdp_url or self.cdp_url)
+            self._ejecuciones[id_ejecucion] = ejecucion
+            self._cola.append(ejecucion)
+        self._emitir(ejecucion, "estado", ejecucion.estado)
+        self.despachar()
+        return ejecucion
+
+    def ejecucion(self, id_ejecucion):
+        return self._ejecuciones.get(id_ejecucion)
+
+    def resumen(self):
+        with self._lock:
+            return len(self._activas), len(self._cola)
+
+    @staticmethod
+    def _puertos_cdp(cdp_base):
+        """(host, puerto) candidatos para una ejecución con base `cdp_base`."""
+        parsed = urllib.parse.urlparse(cdp_base)
+        host = (parsed.hostname or "").lower()
+        puerto_base = parsed.port or 9222
+        if host not in {"127.0.0.1", "localhost"}:
+            # Un Chrome remoto no se puede levantar en otros puertos: una ejecución CDP a la vez
+            return [(host, puerto_base)]
+        # 127.0.0.1 y localhost son el mismo Chrome: comparten la marca de puerto ocupado
+        return [("127.0.0.1", puerto) for puerto in range(puerto_base, puerto_base + max(1, ORQUESTADOR_PUERTOS_CDP))]
+
+    @staticmethod
+    def _url_cdp(cdp_base, puerto):
+        parsed = urllib.parse.urlparse(cdp_base)
+        return parsed._replace(netloc=f"{parsed.hostname}:{puerto}").geturl()
+
+    def despachar(self):
+        """Lanza lo que quepa en la cola respetando max_concurrentes y los puertos CDP libres."""
+        lanzar = []
+        with self._lock:
+            for ejecucion in list(self._cola):
+                if len(self._activas) >= self.max_concurrentes:
+                    break
+                if ejecucion.usa_cdp:
+                    libres = [
+                        destino
+                        for destino in self._puertos_cdp(ejecucion.cdp_base)
+                        if destino not in self._puertos_ocupados
+                    ]
+                    if not libres:
+                        continue
+                    ejecucion.destino_cdp = libres[0]
+                    ejecucion.cdp_url = self._url_cdp(ejecucion.cdp_base, libres[0][1])
+                    self._puertos_ocupados.add(libres[0])
+                self._cola.remove(ejecucion)
+                self._activas[ejecucion.id] = ejecucion
+                ejecucion.estado = "iniciando"
+                lanzar.append(ejecucion)
+        for ejecucion in lanzar:
+            self._emitir(ejecucion, "estado", ejecucion.estado)
+            threading.Thread(
+                target=self._correr, args=(ejecucion,), name=f"orquestador-{ejecucion.id}", daemon=True
+            ).start()
+
+    # ---- ciclo de vida de una ejecución ----
+
+    def _comando(self, ejecucion):
+        cmd = [sys.executable, "-u", str(PROJECT_ROOT / "test_sky.py"), *ejecucion.argv]
+        cmd.extend(["--id-ejecucion", ejecucion.id, "--control-dir", ejecucion.control_dir])
+        if ejecucion.usa_cdp:
+            iniciado = False
+            if self.preparar_cdp is not None:
+                ok, mensaje, iniciado = self.preparar_cdp(ejecucion.cdp_url)
+                if mensaje:
+                    self._emitir(ejecucion, "log", ("✅ " if ok else "❌ ") + mensaje)
+                if not ok:
+                    return None
+            cmd.extend(["--usar-chrome-existente", "--cdp-url", ejecucion.cdp_url])
+            if iniciado:
+                cmd.append("--cdp-reutilizar-primera-pestana")
+        return cmd
+
+    def _correr(self, ejecucion):
+        estado = "error"
+        try:
+            CONTROL_ROOT.mkdir(parents=True, exist_ok=True)
+            ejecucion.control_dir = tempfile.mkdtemp(prefix="run_", dir=str(CONTROL_ROOT))
+            cmd = self._comando(ejecucion)
+            if cmd is None or ejecucion.detener_solicitado:
+                estado = "detenida" if ejecucion.detener_solicitado else "error"
+                return
+            self._emitir(ejecucion, "comando", cmd)
+            ejecucion.proceso = subprocess.Popen(
+                cmd,
+                cwd=str(PROJECT_ROOT),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1,
+            )
+            if ejecucion.detener_solicitado:
+                # detener() llegó entre la preparación de CDP y el Popen
+                ejecucion.proceso.terminate()
+            ejecucion.estado = "corriendo"
+            self._emitir(ejecucion, "estado", ejecucion.estado)
+            threading.Thread(target=self._conectar_bus, args=(ejecucion,), daemon=True).start()
+            for linea in ejecucion.proceso.stdout:
+                self._emitir(ejecucion, "log", linea.rstrip("\n"))
+            ejecucion.codigo = ejecucion.proceso.wait()
+            if ejecucion.detener_solicitado:
+                estado = "detenida"
+            else:
+                estado = "ok" if ejecucion.codigo == 0 else "error"
+        except Exception as error:
+            self._emitir(ejecucion, "log", f"❌ Error ejecutando proceso: {error}")
+        finally:
+            with self._lock:
+                self._activas.pop(ejecucion.id, None)
+                self._puertos_ocupados.discard(ejecucion.destino_cdp)
+                ejecucion.estado = estado
+            if ejecucion.control_dir:
+                shutil.rmtree(ejecucion.control_dir, ignore_errors=True)
+            self._emitir(ejecucion, "fin", estado)
+            self.despachar()
+
+    def _conectar_bus(self, ejecucion):
+        """Espera el bus.port del bot, se conecta y reenvía sus eventos. Sin bus se sigue con archivos."""
+        anuncio = os.path.join(ejecucion.control_dir, "bus.port")
+        limite = time.monotonic() + BUS_CONEXION_TIMEOUT_SEGUNDOS
+        datos = None
+        while datos is None and time.monotonic() < limite and ejecucion.activa:
+            try:
+                with open(anuncio, "r", encoding="utf-8") as archivo:
+                    datos = json.load(archivo)
+            except (OSError, ValueError):
+                time.sleep(0.2)
+        if datos is None:
+            return
+
+        try:
+            conexion = socket.create_connection(("127.0.0.1", int(datos["puerto"])), timeout=3)
+            conexion.settimeout(None)
+            conexion.sendall((json.dumps({"tipo": "hola", "token": datos["token"]}) + "\n").encode("utf-8"))
+        except (OSError, KeyError, TypeError, ValueError) as error:
+            self._emitir(
+                ejecucion, "log", f"⚠️ Bus de control no disponible ({error}); se usan archivos de control."
+            )
+            return
+
+        ejecucion.bus = conexion
+        try:
+            with conexion.makefile("r", encoding="utf-8") as lector:
+                for linea in lector:
+                    try:
+                        mensaje = json.loads(linea)
+                    except ValueError:
+                        continue
+                    if isinstance(mensaje, dict):
+                        self._emitir(ejecucion, "bus", mensaje)
+        except OSError:
+            pass
+        finally:
+            if ejecucion.bus is conexion:
+                ejecucion.bus = None
+            conexion.close()
+
+    # ---- control ----
+
+    def enviar_control(self, id_ejecucion, tipo):
+        """'pausa' o 'continuar' por el bus; si la ejecución no está conectada, por archivo en su control_dir."""
+        ejecucion = self._ejecuciones.get(id_ejecucion)
+        if ejecucion is None or ejecucion.estado != "corriendo" or not ejecucion.control_dir:
+            return False
+        conexion = ejecucion.bus
+        if conexion is not None:
+            try:
+                conexion.sendall((json.dumps({"tipo": tipo}) + "\n").encode("utf-8"))
+                return True
+            except OSError:
+                pass
+        try:
+            with open(os.path.join(ejecucion.control_dir, _ARCHIVOS_CONTROL[tipo]), "w", encoding="utf-8") as archivo:
+                archivo.write(f"{tipo}\n")
+        except OSError:
+            return False
+        return True
+
+    def leer_estado_pausado(self, id_ejecucion):
+        """paused.state de una ejecución sin bus (bot con --sin-bus-control); None si no está pausada."""
+        ejecucion = self._ejecuciones.get(id_ejecucion)
+        if ejecucion is None or not ejecucion.control_dir:
+            return None
+        data = {}
+        try:
+            with open(os.path.join(ejecucion.control_dir, "paused.state"), "r", encoding="utf-8") as archivo:
+                for linea in archivo.read().splitlines():
+                    if "=" not in linea:
+                        continue
+                    clave, valor = linea.split("=", 1)
+                    data[clave.strip()] = valor.strip()
+        except FileNotFoundError:
+            return None
+        except Exception:
+            return {"stage": "DESCONOCIDA", "context": ""}
+        return data
+
+    def detener(self, id_ejecucion):
+        """Saca de la cola una ejecución pendiente o termina su proceso (kill si sigue tras unos segundos)."""
+        with self._lock:
+            ejecucion = self._ejecuciones.get(id_ejecucion)
+            if ejecucion is None or not ejecucion.activa:
+                return False
+            ejecucion.detener_solicitado = True
+            if ejecucion in self._cola:
+                self._cola.remove(ejecucion)
+                ejecucion.estado = "cancelada"
+                cancelada = True
+            else:
+                cancelada = False
+        if cancelada:
+            self._emitir(ejecucion, "fin", ejecucion.estado)
+            return True
+
+        proceso = ejecucion.proceso
+        if proceso is not None and proceso.poll() is None:
+            proceso.terminate()
+            # daemon: cerrar la GUI justo después de detener no espera los STOP_FORZADO_SEGUNDOS
+            temporizador = threading.Timer(STOP_FORZADO_SEGUNDOS, self._forzar_stop, args=(proceso,))
+            temporizador.daemon = True
+            temporizador.start()
+        return True
+
+    @staticmethod
+    def _forzar_stop(proceso):
+        if proceso.poll() is None:
+            proceso.kill()
+
+    def detener_todas(self):
+        for id_ejecucion in list(self._ejecuciones):
+            self.detener(id_ejecucion)
+
+    def _emitir(self, ejecucion, tipo, dato):
+        try:
+            self.al_evento(ejecucion.id, tipo, dato)
+        except Exception as error:
+            print(f"⚠️ Error notificando evento '{tipo}' de {ejecucion.id}: {error}")
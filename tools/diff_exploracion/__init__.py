@@ -0,0 +1,24 @@
+"""
+Índice incremental de los reportes de exploración y diff de controles visibles por etapa.
+
+Cada corrida con --modo-exploracion deja en screenshots_pruebas/exploracion_<id>/ un meta.json
+(market, ambiente, inicio) y un <timestamp>_<etapa>.json por captura (core/helpers.py). El índice
+(.cache_bot/indice_exploracion.json) guarda por corrida y etapa las firmas de los controles visibles
+(rol + data-test o texto, con dígitos colapsados) y solo re-procesa carpetas nuevas o modificadas.
+
+    python -m tools.diff_exploracion                          # última corrida vs la anterior, por market/ambiente
+    python -m tools.diff_exploracion --modo ambientes         # qa vs tsts/stage, última corrida de cada uno
+    python -m tools.diff_exploracion --market CL --etapa post_confirmacion --historial
+"""
+
+from tools.diff_exploracion.diff import comparar_ambientes, comparar_ejecuciones, diferencia_controles
+from tools.diff_exploracion.indice import actualizar_indice, cargar_indice, guardar_indice
+
+__all__ = [
+    "actualizar_indice",
+    "cargar_indice",
+    "comparar_ambientes",
+    "comparar_ejecuciones",
+    "diferencia_controles",
+    "guardar_indice",
+]
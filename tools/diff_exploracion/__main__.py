@@ -0,0 +1,80 @@
+import argparse
+import json
+import sys
+
+from config.rutas import INDICE_EXPLORACION
+from tools.diff_exploracion.diff import comparar_ambientes, comparar_ejecuciones
+from tools.diff_exploracion.indice import actualizar_indice, cargar_indice, guardar_indice
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Diff de controles visibles entre reportes de exploración")
+    parser.add_argument("--base", default="screenshots_pruebas", help="Carpeta de evidencias")
+    parser.add_argument("--indice", default=INDICE_EXPLORACION, help=f"Índice incremental ({INDICE_EXPLORACION})")
+    parser.add_argument("--reindexar", action="store_true", help="Re-procesa todas las corridas, no solo las nuevas")
+    parser.add_argument(
+        "--modo",
+        choices=("ejecuciones", "ambientes"),
+        default="ejecuciones",
+        help="ejecuciones: cada corrida vs la anterior del mismo market/ambiente; ambientes: vs --referencia",
+    )
+    parser.add_argument("--referencia", default="qa", help="Ambiente base en --modo ambientes (default: qa)")
+    parser.add_argument("--market", type=str.upper, help="Solo este market (PE, CL, AR, BR)")
+    parser.add_argument("--ambiente", type=str.lower, help="Solo este ambiente (--modo ejecuciones)")
+    parser.add_argument("--etapa", help="Solo esta etapa de captura (ej: post_confirmacion)")
+    parser.add_argument("--historial", action="store_true", help="Todos los pares consecutivos, no solo el último")
+    parser.add_argument("--json", metavar="PATH", help="Escribe los cambios en JSON")
+    parser.add_argument("--fallar-si-cambia-cta", action="store_true", help="Sale con código 1 si algún CTA cambió")
+    return parser.parse_args(argv)
+
+
+def _imprimir(cambios):
+    if not cambios:
+        print("✅ Sin cambios de controles visibles.")
+        return
+    for cambio in cambios:
+        contexto = f"{cambio['market']}/{cambio['ambiente']} · {cambio['etapa']}"
+        print(f"\n🔎 {contexto} ({cambio['desde']} -> {cambio['hasta']})")
+        for signo, clave in (("+", "agregados"), ("-", "quitados")):
+            for control in cambio[clave]:
+                marca = " [CTA]" if control["cta"] else ""
+                print(f"   {signo} {control['rol']}: {control['texto'] or control['data_test']}{marca}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    indice = cargar_indice(args.indice)
+    nuevas, actualizadas, eliminadas = actualizar_indice(indice, args.base, reindexar=args.reindexar)
+    guardar_indice(indice, args.indice)
+    print(
+        f"🗂️ Índice: {len(indice['corridas'])} corridas "
+        f"({nuevas} nuevas, {actualizadas} actualizadas, {eliminadas} eliminadas) -> {args.indice}"
+    )
+
+    if args.modo == "ambientes":
+        cambios = comparar_ambientes(indice, args.referencia, market=args.market, etapa=args.etapa)
+    else:
+        cambios = comparar_ejecuciones(
+            indice,
+            market=args.market,
+            ambiente=args.ambiente,
+            etapa=args.etapa,
+            historial=args.historial,
+        )
+    _imprimir(cambios)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as archivo:
+            json.dump(cambios, archivo, ensure_ascii=False, indent=2)
+        print(f"\n🧾 Cambios -> {args.json}")
+
+    cambios_cta = sum(
+        1 for cambio in cambios for control in cambio["agregados"] + cambio["quitados"] if control["cta"]
+    )
+    if cambios_cta:
+        print(f"\n⚠️ {cambios_cta} CTA(s) cambiaron; revisar selectores y docs/BOT_FRICTIONS.md.")
+    return 1 if args.fallar_si_cambia_cta and cambios_cta else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+from tools.diff_exploracion.indice import ROLES_CTA
+
+
+def diferencia_controles(anteriores, actuales):
+    """{"agregados": [...], "quitados": [...]} entre dos mapas firma -> control (CTAs marcados)."""
+
+    def lista(firmas, origen):
+        return [
+            {"firma": firma, **origen[firma], "cta": origen[firma]["rol"] in ROLES_CTA}
+            for firma in sorted(firmas)
+        ]
+
+    return {
+        "agregados": lista(actuales.keys() - anteriores.keys(), actuales),
+        "quitados": lista(anteriores.keys() - actuales.keys(), anteriores),
+    }
+
+
+def _corridas_filtradas(indice, market=None, ambiente=None):
+    corridas = [
+        corrida
+        for corrida in indice["corridas"].values()
+        if (market is None or corrida.get("market") == market)
+        and (ambiente is None or corrida.get("ambiente") == ambiente)
+    ]
+    return sorted(corridas, key=lambda corrida: corrida.get("inicio") or "")
+
+
+def _comparar_etapas(anterior, actual, etapa=None, **contexto):
+    cambios = []
+    comunes = anterior["etapas"].keys() & actual["etapas"].keys()
+    for nombre in sorted(comunes):
+        if etapa is not None and nombre != etapa:
+            continue
+        diferencia = diferencia_controles(
+            anterior["etapas"][nombre]["controles"],
+            actual["etapas"][nombre]["controles"],
+        )
+        if diferencia["agregados"] or diferencia["quitados"]:
+            cambios.append({"etapa": nombre, **contexto, **diferencia})
+    return cambios
+
+
+def comparar_ejecuciones(indice, market=None, ambiente=None, etapa=None, historial=False):
+    """
+    Por market/ambiente compara cada corrida con la anterior en las etapas que ambas capturaron.
+    Sin `historial`, solo la última corrida contra la previa.
+    """
+    grupos = {}
+    for corrida in _corridas_filtradas(indice, market, ambiente):
+        grupos.setdefault((corrida.get("market"), corrida.get("ambiente")), []).append(corrida)
+
+    cambios = []
+    for (market_grupo, ambiente_grupo), corridas in sorted(grupos.items(), key=lambda item: str(item[0])):
+        pares = list(zip(corridas, corridas[1:]))
+        for anterior, actual in pares if historial else pares[-1:]:
+            cambios.extend(
+                _comparar_etapas(
+                    anterior,
+                    actual,
+                    etapa,
+                    market=market_grupo,
+                    ambiente=ambiente_grupo,
+                    desde=anterior["id_ejecucion"],
+                    hasta=actual["id_ejecucion"],
+                )
+            )
+    return cambios
+
+
+def comparar_ambientes(indice, referencia="qa", market=None, etapa=None):
+    """Por market, la última corrida de cada ambiente contra la última de `referencia`."""
+    ultimas = {}
+    for corrida in _corridas_filtradas(indice, market):
+        ultimas[(corrida.get("market"), corrida.get("ambiente"))] = corrida
+
+    cambios = []
+    for (market_corrida, ambiente), corrida in sorted(ultimas.items(), key=lambda item: str(item[0])):
+        base = ultimas.get((market_corrida, referencia))
+        if ambiente == referencia or base is None:
+            continue
+        cambios.extend(
+            _comparar_etapas(
+                base,
+                corrida,
+                etapa,
+                market=market_corrida,
+                ambiente=f"{referencia}->{ambiente}",
+                desde=base["id_ejecucion"],
+                hasta=corrida["id_ejecucion"],
+            )
+        )
+    return cambios
@@ -0,0 +1,150 @@
+import glob
+import json
+import os
+import re
+
+VERSION_INDICE = 1
+
+# Roles que cuentan como control visible; además entra cualquier elemento con data-test, label o título
+ROLES_CONTROL = {
+    "button",
+    "link",
+    "checkbox",
+    "radio",
+    "switch",
+    "textbox",
+    "searchbox",
+    "combobox",
+    "listbox",
+    "option",
+    "tab",
+    "menuitem",
+    "spinbutton",
+    "slider",
+}
+ROLES_CTA = {"button", "link"}
+_TAGS_CONTROL = {"label", "h1", "h2", "h3", "h4"}
+_RE_DIGITOS = re.compile(r"\d+")
+_RE_REPORTE = re.compile(r"^\d{8}_\d{6}_(?P<etapa>.+)\.json$")
+
+
+def _normalizar(texto, largo=80):
+    """Precios, fechas y contadores varían entre corridas: los dígitos se colapsan a '#'."""
+    return _RE_DIGITOS.sub("#", " ".join((texto or "").split()))[:largo]
+
+
+def control_desde_elemento(elemento):
+    """(firma, {rol, texto, data_test}) de un elemento del snapshot, o None si no es un control."""
+    rol = elemento.get("rol") or elemento.get("tag")
+    data_test = elemento.get("data_test")
+    if rol not in ROLES_CONTROL and elemento.get("tag") not in _TAGS_CONTROL and not data_test:
+        return None
+    texto = _normalizar(elemento.get("texto") or elemento.get("aria_label") or elemento.get("placeholder"))
+    identificador = _normalizar(data_test) if data_test else texto
+    if not identificador:
+        identificador = elemento.get("name") or elemento.get("id")
+    if not identificador:
+        return None
+    return f"{rol}:{identificador}", {"rol": rol, "texto": texto, "data_test": data_test}
+
+
+def controles_desde_reporte(reporte):
+    controles = {}
+    for elemento in reporte.get("elementos", []):
+        control = control_desde_elemento(elemento)
+        if control:
+            controles.setdefault(*control)
+    return controles
+
+
+def _firma_carpeta(carpeta):
+    """Cantidad de reportes y mtime más reciente: si no cambian, la corrida no se re-procesa."""
+    reportes = glob.glob(os.path.join(carpeta, "*.json"))
+    mtime = max((os.path.getmtime(path) for path in reportes), default=0)
+    return [len(reportes), round(mtime, 3)]
+
+
+def indexar_corrida(carpeta):
+    """Lee meta.json y los reportes <timestamp>_<etapa>.json; por etapa queda la última captura."""
+    meta = {}
+    try:
+        with open(os.path.join(carpeta, "meta.json"), "r", encoding="utf-8") as archivo:
+            meta = json.load(archivo)
+    except (OSError, ValueError):
+        pass
+
+    etapas = {}
+    for path in sorted(glob.glob(os.path.join(carpeta, "*.json"))):
+        coincidencia = _RE_REPORTE.match(os.path.basename(path))
+        if not coincidencia:
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as archivo:
+                reporte = json.load(archivo)
+        except (OSError, ValueError):
+            continue
+        etapa = reporte.get("etapa") or coincidencia.group("etapa")
+        etapas[etapa] = {
+            "capturado": reporte.get("capturado"),
+            "url": reporte.get("url"),
+            "controles": controles_desde_reporte(reporte),
+        }
+
+    return {
+        "id_ejecucion": meta.get("id_ejecucion") or os.path.basename(carpeta).removeprefix("exploracion_"),
+        "market": meta.get("market"),
+        "ambiente": meta.get("ambiente"),
+        "inicio": meta.get("inicio") or min((e["capturado"] or "" for e in etapas.values()), default=""),
+        "firma": _firma_carpeta(carpeta),
+        "etapas": etapas,
+    }
+
+
+def carpetas_exploracion(base_dir):
+    """exploracion_<id> en base_dir y un nivel más abajo (corridas de matrix.py)."""
+    patrones = (os.path.join(base_dir, "exploracion_*"), os.path.join(base_dir, "*", "exploracion_*"))
+    return sorted(path for patron in patrones for path in glob.glob(patron) if os.path.isdir(path))
+
+
+def cargar_indice(path):
+    try:
+        with open(path, "r", encoding="utf-8") as archivo:
+            indice = json.load(archivo)
+    except (OSError, ValueError):
+        return {"version": VERSION_INDICE, "corridas": {}}
+    if indice.get("version") != VERSION_INDICE:
+        return {"version": VERSION_INDICE, "corridas": {}}
+    return indice
+
+
+def guardar_indice(indice, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporal = f"{path}.tmp"
+    with open(temporal, "w", encoding="utf-8") as archivo:
+        json.dump(indice, archivo, ensure_ascii=False)
+    os.replace(temporal, path)
+
+
+def actualizar_indice(indice, base_dir, reindexar=False):
+    """
+    Procesa solo carpetas nuevas o con reportes nuevos (por firma) y quita las que ya no existen
+    (limpieza de evidencias). Retorna (nuevas, actualizadas, eliminadas).
+    """
+    corridas = indice["corridas"]
+    presentes = set()
+    nuevas = actualizadas = 0
+    for carpeta in carpetas_exploracion(base_dir):
+        clave = os.path.relpath(carpeta, base_dir)
+        presentes.add(clave)
+        previa = corridas.get(clave)
+        if previa and not reindexar and previa.get("firma") == _firma_carpeta(carpeta):
+            continue
+        corridas[clave] = indexar_corrida(carpeta)
+        if previa:
+            actualizadas += 1
+        else:
+            nuevas += 1
+    eliminadas = [clave for clave in corridas if clave not in presentes]
+    for clave in eliminadas:
+        del corridas[clave]
+    return nuevas, actualizadas, len(eliminadas)
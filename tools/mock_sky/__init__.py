@@ -0,0 +1,15 @@
+"""
+Sitio SKY simulado para benchmarks y regresión offline.
+
+Sirve el DOM del que dependen los flujos (home con #origin-id/#destination-id y calendario
+vc-calendar, resultados con is-itinerary-selectFlight/selectRate, /seats, /additional-services,
+formulario is-passengerForm-*, checkout) y stand-ins mínimos de Niubiz, Webpay, Mercado Pago y
+Cielo, con latencia configurable. Apuntar el bot con --url:
+
+    python -m tools.mock_sky --puerto 8765 --latencia-api-ms 300
+    python test_sky.py --market PE --url http://127.0.0.1:8765/es/peru --headless
+"""
+
+from tools.mock_sky.servidor import LatenciaMock, crear_servidor, iniciar_en_hilo
+
+__all__ = ["LatenciaMock", "crear_servidor", "iniciar_en_hilo"]
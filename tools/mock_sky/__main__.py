@@ -0,0 +1,43 @@
+import argparse
+
+from tools.mock_sky.paginas import PAISES
+from tools.mock_sky.servidor import LatenciaMock, crear_servidor
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sitio SKY simulado para benchmarks offline del bot")
+    parser.add_argument("--host", default="127.0.0.1", help="Interfaz de escucha (default: 127.0.0.1)")
+    parser.add_argument("--puerto", type=int, default=8765, help="Puerto (default: 8765)")
+    parser.add_argument("--latencia-ms", type=int, default=0, metavar="MS", help="Latencia de páginas SKY")
+    parser.add_argument("--latencia-api-ms", type=int, default=300, metavar="MS", help="Latencia de transiciones XHR (/api)")
+    parser.add_argument("--latencia-pasarela-ms", type=int, default=500, metavar="MS", help="Latencia de pasarelas e iframes")
+    parser.add_argument("--jitter-ms", type=int, default=0, metavar="MS", help="Variación uniforme ± sobre cada latencia")
+    parser.add_argument("--semilla", type=int, default=None, help="Semilla del jitter (corridas reproducibles)")
+    parser.add_argument("--verbose", action="store_true", help="Loguea cada request")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    latencia = LatenciaMock(
+        latencia_ms=args.latencia_ms,
+        latencia_api_ms=args.latencia_api_ms,
+        latencia_pasarela_ms=args.latencia_pasarela_ms,
+        jitter_ms=args.jitter_ms,
+        semilla=args.semilla,
+    )
+    servidor = crear_servidor(args.host, args.puerto, latencia=latencia, silencioso=not args.verbose)
+    base = f"http://{args.host}:{args.puerto}"
+    print(f"🧪 Sitio SKY simulado en {base}")
+    for pais, (market, idioma, medio) in PAISES.items():
+        print(f"   {market}: {base}/{idioma}/{pais}  ({medio})")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Servidor simulado detenido.")
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""
+HTML de las páginas del sitio simulado. Solo replica el DOM del que dependen los flujos
+(selectores de core/search_flow.py, core/passenger_flow.py y core/payment_flows.py);
+el comportamiento vive en static/mock.js.
+"""
+
+import html
+import json
+
+# pais en la URL -> (market, idioma, medio de pago)
+PAISES = {
+    "peru": ("PE", "es", "Niubiz"),
+    "chile": ("CL", "es", "Webpay"),
+    "argentina": ("AR", "es", "Mercado Pago"),
+    "brasil": ("BR", "pt", "Cielo"),
+}
+
+TEXTOS = {
+    "es": {
+        "solo_ida": "Solo ida",
+        "ida_vuelta": "Ida-Vuelta",
+        "desde": "Desde",
+        "hacia": "Hacia",
+        "fecha_ida": "Fecha de ida",
+        "pasajeros": "Pasajeros",
+        "adultos": "Adultos",
+        "ninos": "Niños",
+        "infantes": "Infantes",
+        "buscar": "Buscar vuelo",
+        "seleccionar": "Seleccionar",
+    },
+    "pt": {
+        "solo_ida": "Somente ida",
+        "ida_vuelta": "Ida e volta",
+        "desde": "Origem",
+        "hacia": "Destino",
+        "fecha_ida": "Fecha de ida",
+        "pasajeros": "Passageiros",
+        "adultos": "Adultos",
+        "ninos": "Crianças",
+        "infantes": "Bebês",
+        "buscar": "Buscar voo",
+        "seleccionar": "Selecionar",
+    },
+}
+
+PAGINAS_SKY = ("resultados", "seats", "additional-services", "passenger-detail", "checkout", "confirmacion")
+
+
+def _documento(titulo, pagina, cuerpo, contexto):
+    # "</" escapado para que un valor del contexto (p. ej. ?retorno=) no cierre el <script>
+    datos = json.dumps(contexto, ensure_ascii=False).replace("</", "<\\/")
+    return f"""<!doctype html>
+<html lang="{html.escape(contexto.get('idioma', 'es'))}">
+<head>
+<meta charset="utf-8">
+<title>{html.escape(titulo)} · SKY mock</title>
+<link rel="stylesheet" href="/static/mock.css">
+<script>window.__MOCK__ = {datos};</script>
+<script src="/static/mock.js" defer></script>
+</head>
+<body data-pagina="{pagina}">
+<header class="top"><span class="logo">SKY</span><span class="mock-tag">mock {html.escape(contexto.get('market', ''))}</span></header>
+<div class="cargando-overlay">Cargando…</div>
+<main>
+{cuerpo}
+</main>
+</body>
+</html>
+"""
+
+
+def contexto_market(idioma, pais):
+    market, idioma_market, medio = PAISES[pais]
+    return {
+        "base": f"/{idioma}/{pais}",
+        "market": market,
+        "idioma": idioma_market,
+        "medio": medio,
+        "textos": TEXTOS[idioma_market],
+    }
+
+
+def pagina_indice():
+    enlaces = "\n".join(
+        f'<li><a href="/{idioma}/{pais}">/{idioma}/{pais}</a> ({market} · {medio})</li>'
+        for pais, (market, idioma, medio) in PAISES.items()
+    )
+    return _documento("Markets", "indice", f"<h1>Sitio simulado</h1><ul>{enlaces}</ul>", {})
+
+
+def pagina_home(contexto):
+    t = contexto["textos"]
+    filas_pax = "\n".join(
+        f"""<div class="fila-pax" data-tipo="{tipo}">
+      <div class="fila-pax__texto"><strong>{etiqueta}</strong><small>{detalle}</small></div>
+      <button type="button" class="sky-select-number_button" data-delta="-1"><span class="sky-select-number_button_icon" aria-label="less">−</span></button>
+      <span class="valor">{inicial}</span>
+      <button type="button" class="sky-select-number_button" data-delta="1"><span class="sky-select-number_button_icon" aria-label="more">+</span></button>
+    </div>"""
+        for tipo, etiqueta, detalle, inicial in (
+            ("adt", t["adultos"], "12+", 1),
+            ("chd", t["ninos"], "2-11", 0),
+            ("inf", t["infantes"], "0-2", 0),
+        )
+    )
+    cuerpo = f"""
+<section class="home">
+  <div class="tipos-viaje">
+    <label class="sky-radiobutton radio-flight-type"><input type="radio" name="tipo" value="ONE_WAY" checked> {t['solo_ida']}</label>
+    <label class="sky-radiobutton radio-flight-type"><input type="radio" name="tipo" value="ROUND_TRIP"> {t['ida_vuelta']}</label>
+  </div>
+  <form id="flight-box" autocomplete="off">
+    <div id="origin-id" class="ciudad"><label>{t['desde']}</label><input placeholder="{t['desde']}"><div class="opciones"></div></div>
+    <div id="destination-id" class="ciudad"><label>{t['hacia']}</label><input placeholder="{t['hacia']}"><div class="opciones"></div></div>
+    <div class="wrapper width-min-calendar"><label>{t['fecha_ida']}</label><input class="textfield_input" readonly><span class="textfield_icon">📅</span></div>
+    <div class="wrapper" id="wrapper-pasajeros"><label>{t['pasajeros']}</label><div class="textfield_input" id="resumen-pax">1 {t['pasajeros']}</div><span class="textfield_icon">👤</span></div>
+    <button type="submit" id="buscar">{t['buscar']}</button>
+  </form>
+  <div class="vc-container" hidden>
+    <button type="button" class="vc-arrow" aria-label="Mes anterior">‹</button>
+    <button type="button" class="vc-arrow" aria-label="Mes siguiente">›</button>
+    <div class="vc-panes"></div>
+  </div>
+  <div class="searchbox-passenger_container" hidden>
+    {filas_pax}
+    <button type="button" class="aplicar">Aplicar</button>
+  </div>
+  <div class="ant-modal" hidden>
+    <div class="ant-modal-body">
+      <p>Viajar con un Infante requiere que un adulto lo lleve en brazos.</p>
+      <button type="button" class="aceptar-infante">Acepto y entiendo las condiciones</button>
+    </div>
+  </div>
+</section>"""
+    return _documento("Home", "home", cuerpo, contexto)
+
+
+def pagina_resultados(contexto):
+    cuerpo = """
+<section class="resultados">
+  <h2 class="titulo-tramo"></h2>
+  <div class="lista-vuelos"></div>
+</section>"""
+    return _documento("Resultados", "resultados", cuerpo, contexto)
+
+
+def pagina_asientos(contexto):
+    cuerpo = """
+<section class="asientos">
+  <h2 class="titulo-tramo"></h2>
+  <div class="seat-map" data-test="seat-map"></div>
+  <button type="button" class="continuar-asientos"></button>
+  <div class="modal-sin-asiento" hidden>
+    <p>¿Quieres continuar sin elegir asiento?</p>
+    <button type="button" class="seguir-sin-elegir">Seguir sin elegir</button>
+    <button type="button" class="elegir-ahora">Elegir asiento ahora</button>
+  </div>
+</section>"""
+    return _documento("Asientos", "seats", cuerpo, contexto)
+
+
+def pagina_servicios(contexto):
+    cuerpo = """
+<section class="servicios-lista">
+  <section class="servicio" data-servicio="cabina"><h3>Equipaje en cabina</h3><p>Hasta 10 kg.</p><button type="button" class="agregar">Agregar</button><span class="cantidad-servicio"></span></section>
+  <section class="servicio" data-servicio="bodega"><h3>Equipaje en bodega</h3><p>Hasta 23 kg.</p><button type="button" class="agregar">Agregar</button><span class="cantidad-servicio"></span></section>
+</section>
+<aside class="panel-lateral" hidden>
+  <h3 class="panel-titulo"></h3>
+  <button type="button" class="sky-select-number_button" data-delta="-1">−</button>
+  <b class="panel-cantidad">0</b>
+  <button type="button" class="sky-select-number_button" data-delta="1">+</button>
+  <button type="button" class="finalizar">Finalizar</button>
+</aside>
+<button type="button" class="continuar-servicios">Continuar</button>"""
+    return _documento("Servicios adicionales", "additional-services", cuerpo, contexto)
+
+
+def pagina_pasajeros(contexto):
+    cuerpo = """
+<section class="pasajeros"></section>
+<footer class="footer-shopping-cart">
+  <button type="button" class="footer-shopping-cart__primary-button" hidden>Continuar al pago</button>
+</footer>"""
+    return _documento("Pasajeros", "passenger-detail", cuerpo, contexto)
+
+
+def pagina_checkout(contexto):
+    medio = contexto["medio"]
+    if medio == "Mercado Pago":
+        item_medio = """<div class="medio" data-test="IS-paymentMethodList-cardFop-mercado-pago">
+      <input type="radio" name="medio" data-test="IS-cardFop-radioButton"><span>Mercado Pago</span></div>"""
+    else:
+        item_medio = f"""<div class="medio" data-test="IS-paymentMethodList-{medio.lower()}">
+      <input type="radio" name="medio"><span>{medio}</span></div>"""
+    boton = "Ir a pagar" if medio in {"Niubiz", "Webpay"} else "Pagar"
+    cuerpo = f"""
+<section class="checkout">
+  <h2>Checkout</h2>
+  <div class="contacto">
+    <div class="campo-contacto"><label>Nombre</label><input class="input"></div>
+    <div class="campo-contacto"><label>Apellido</label><input class="input"></div>
+    <div class="campo-contacto"><label>Correo electrónico</label><input class="input"></div>
+  </div>
+  <div class="medios">{item_medio}</div>
+  <div class="formulario-medio" hidden>
+    <div class="form-niubiz" hidden><iframe name="niubiz" src="/gateway/niubiz"></iframe></div>
+    <div class="form-webpay" hidden><p>Serás redirigido a Webpay para completar el pago.</p></div>
+    <div class="form-mercadopago" hidden>
+      <iframe name="cardNumber" src="/gateway/mercadopago/campo?nombre=cardNumber"></iframe>
+      <div data-test="IS-mercadoPagoForm-inputCardHolderName"><label>Titular</label><input class="input"></div>
+      <iframe name="expirationDate" src="/gateway/mercadopago/campo?nombre=expirationDate"></iframe>
+      <iframe name="securityCode" src="/gateway/mercadopago/campo?nombre=securityCode"></iframe>
+      <div class="desplegable" data-test="IS-mercadoPagoForm-selectInstallment"><div class="textfield_input">Cuotas</div>
+        <ul class="opciones-desplegable" hidden><li>1 cuota</li><li>3 cuotas</li><li>6 cuotas</li></ul></div>
+      <div class="desplegable" data-test="IS-mercadoPagoForm-selectDocType"><div class="textfield_input">Tipo</div>
+        <ul class="opciones-desplegable" hidden><li>DNI</li><li>CI</li><li>LE</li></ul></div>
+      <div data-test="IS-mercadoPagoForm-inputDocNumber"><label>Documento</label><input class="input"></div>
+      <div data-test="IS-mercadoPagoForm-inputEmail"><label>Email</label><input class="input"></div>
+    </div>
+    <div class="form-cielo" hidden>
+      <iframe name="cielo" src="/gateway/cielo"></iframe>
+      <label><input type="radio" name="tipo-tarjeta" value="credito"> Crédito</label>
+      <label><input type="radio" name="tipo-tarjeta" value="debito"> Débito</label>
+    </div>
+  </div>
+  <label class="terminos"><span class="checkbox_icon"></span> Acepto los Términos y condiciones</label>
+  <p class="error-pago" hidden></p>
+  <button type="button" class="pagar">{boton}</button>
+</section>"""
+    return _documento("Checkout", "checkout", cuerpo, contexto)
+
+
+def pagina_confirmacion(contexto):
+    cuerpo = """
+<section class="confirmacion">
+  <h2>¡Compra confirmada!</h2>
+  <p>Código de reserva: <b class="codigo-reserva"></b></p>
+</section>"""
+    return _documento("Confirmación", "confirmacion", cuerpo, contexto)
+
+
+PAGINAS_MARKET = {
+    "": pagina_home,
+    "resultados": pagina_resultados,
+    "seats": pagina_asientos,
+    "additional-services": pagina_servicios,
+    "passenger-detail": pagina_pasajeros,
+    "checkout": pagina_checkout,
+    "confirmacion": pagina_confirmacion,
+}
+
+
+# ==========================================
+# PASARELAS (stand-ins)
+# ==========================================
+
+def _documento_pasarela(titulo, pagina, cuerpo, extra=None):
+    return _documento(titulo, pagina, cuerpo, {"pasarela": True, **(extra or {})})
+
+
+def pasarela_niubiz():
+    cuerpo = """
+<form class="pasarela-iframe">
+  <input name="tarjeta" placeholder="Número de Tarjeta" inputmode="numeric">
+  <input name="nombre" placeholder="Nombre">
+  <input name="apellido" placeholder="Apellido">
+  <input name="fecha" placeholder="MM/AA">
+  <input name="cvv" placeholder="CVV">
+</form>"""
+    return _documento_pasarela("Niubiz", "iframe-niubiz", cuerpo)
+
+
+def pasarela_cielo():
+    cuerpo = """
+<form class="pasarela-iframe">
+  <input name="tarjeta" placeholder="Número do Cartão" inputmode="numeric">
+  <input name="cvv" placeholder="CVV">
+  <input name="fecha" placeholder="MM/AA">
+</form>"""
+    return _documento_pasarela("Cielo", "iframe-cielo", cuerpo)
+
+
+def pasarela_mercadopago_campo(nombre):
+    cuerpo = f"""
+<form class="pasarela-iframe">
+  <input class="hide" name="{html.escape(nombre)}-oculto" tabindex="-1">
+  <input name="{html.escape(nombre)}">
+</form>"""
+    return _documento_pasarela("Mercado Pago", "iframe-mercadopago", cuerpo)
+
+
+def pasarela_webpay(retorno):
+    cuerpo = """
+<section class="webpay">
+  <h2>Webpay · Transbank</h2>
+  <div class="webpay-medios"><button type="button" id="credito">Crédito</button><button type="button" id="debito">Débito</button></div>
+  <form class="webpay-tarjeta" hidden>
+    <input id="card-number" name="card-number" autocomplete="cc-number" placeholder="Número de tarjeta">
+    <input id="card-exp" name="card-exp" autocomplete="cc-exp" placeholder="MM/YY">
+    <input id="card-cvv" name="card-cvv" autocomplete="cc-csc" placeholder="CVV">
+    <button type="button" class="pagar-webpay">Pagar</button>
+  </form>
+</section>"""
+    return _documento_pasarela("Webpay", "webpay", cuerpo, {"retorno": retorno})
+
+
+def pasarela_webpay_autenticacion(retorno):
+    cuerpo = """
+<form class="webpay-auth">
+  <h2>Autenticación</h2>
+  <input id="rutClient" name="rutClient" placeholder="RUT">
+  <input id="passwordClient" name="passwordClient" type="password" placeholder="Clave">
+  <input type="submit" value="Aceptar">
+</form>"""
+    return _documento_pasarela("Webpay autenticación", "webpay-auth", cuerpo, {"retorno": retorno})
+
+
+def pasarela_webpay_confirmacion(retorno):
+    cuerpo = """
+<form class="webpay-confirmar">
+  <h2>Resultado de autorización</h2>
+  <select id="vci" name="vci"><option value="TSY">Aprobada</option><option value="TSN">Rechazada</option></select>
+  <input type="submit" value="Continuar">
+</form>"""
+    return _documento_pasarela("Webpay confirmación", "webpay-confirmar", cuerpo, {"retorno": retorno})
+
+
+def pasarela_cielo_3ds(retorno):
+    cuerpo = """
+<form class="cielo-3ds">
+  <h2>Autenticação 3DS</h2>
+  <input name="code" placeholder="Código de autenticação">
+  <button type="submit">Enviar</button>
+</form>"""
+    return _documento_pasarela("Cielo 3DS", "cielo-3ds", cuerpo, {"retorno": retorno})
@@ -0,0 +1,158 @@
+"""
+Servidor HTTP del sitio simulado (solo stdlib). Un hilo por request, así varias corridas
+concurrentes (matrix.py --en-proceso, bench) comparten el mismo servidor.
+
+Latencia inyectable por tipo de respuesta:
+- páginas SKY (/es/peru, /es/peru/checkout, ...): `latencia_ms`
+- transiciones XHR (/api/<accion>): `latencia_api_ms`
+- pasarelas e iframes (/gateway/...): `latencia_pasarela_ms`
+más un jitter uniforme de ±`jitter_ms` reproducible con `semilla`.
+"""
+
+import json
+import mimetypes
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from tools.mock_sky import paginas
+
+DIRECTORIO_ESTATICOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+
+class LatenciaMock:
+    """Latencias (ms) por tipo de respuesta y jitter reproducible."""
+
+    def __init__(self, latencia_ms=0, latencia_api_ms=300, latencia_pasarela_ms=500, jitter_ms=0, semilla=None):
+        self.latencia_ms = latencia_ms
+        self.latencia_api_ms = latencia_api_ms
+        self.latencia_pasarela_ms = latencia_pasarela_ms
+        self.jitter_ms = jitter_ms
+        self._random = random.Random(semilla)
+        self._lock = threading.Lock()
+
+    def demora_ms(self, tipo):
+        base = {
+            "pagina": self.latencia_ms,
+            "api": self.latencia_api_ms,
+            "pasarela": self.latencia_pasarela_ms,
+        }.get(tipo, 0)
+        if self.jitter_ms:
+            with self._lock:
+                base += self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(0.0, base)
+
+
+class ManejadorMock(BaseHTTPRequestHandler):
+    server_version = "SkyMock/1.0"
+    latencia = LatenciaMock()
+    silencioso = True
+
+    def log_message(self, formato, *args):
+        if not self.silencioso:
+            super().log_message(formato, *args)
+
+    def _responder(self, cuerpo, tipo_contenido="text/html; charset=utf-8", estado=200, tipo_latencia=None):
+        if tipo_latencia:
+            demora = self.latencia.demora_ms(tipo_latencia)
+            if demora:
+                time.sleep(demora / 1000)
+        datos = cuerpo.encode("utf-8") if isinstance(cuerpo, str) else cuerpo
+        self.send_response(estado)
+        self.send_header("Content-Type", tipo_contenido)
+        self.send_header("Content-Length", str(len(datos)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(datos)
+
+    def _no_encontrado(self):
+        self._responder("<h1>404</h1>", estado=404)
+
+    def _estatico(self, nombre):
+        path = os.path.join(DIRECTORIO_ESTATICOS, os.path.basename(nombre))
+        if not os.path.isfile(path):
+            return self._no_encontrado()
+        with open(path, "rb") as archivo:
+            contenido = archivo.read()
+        tipo, _ = mimetypes.guess_type(path)
+        self._responder(contenido, f"{tipo or 'application/octet-stream'}; charset=utf-8")
+
+    def _pasarela(self, partes, query):
+        retorno = (query.get("retorno") or ["/"])[0]
+        rutas = {
+            ("niubiz",): paginas.pasarela_niubiz,
+            ("cielo",): paginas.pasarela_cielo,
+            ("cielo", "3ds"): lambda: paginas.pasarela_cielo_3ds(retorno),
+            ("mercadopago", "campo"): lambda: paginas.pasarela_mercadopago_campo((query.get("nombre") or ["campo"])[0]),
+            ("webpay",): lambda: paginas.pasarela_webpay(retorno),
+            ("webpay", "authenticator"): lambda: paginas.pasarela_webpay_autenticacion(retorno),
+            ("webpay", "confirmar"): lambda: paginas.pasarela_webpay_confirmacion(retorno),
+        }
+        generar = rutas.get(tuple(partes))
+        if not generar:
+            return self._no_encontrado()
+        self._responder(generar(), tipo_latencia="pasarela")
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        partes = [parte for parte in url.path.split("/") if parte]
+        query = parse_qs(url.query)
+
+        if not partes:
+            return self._responder(paginas.pagina_indice())
+        if partes[0] == "static" and len(partes) == 2:
+            return self._estatico(partes[1])
+        if partes[0] == "favicon.ico":
+            return self._responder(b"", "image/x-icon", estado=204)
+        if partes[0] == "api":
+            return self.do_POST()
+        if partes[0] == "gateway":
+            return self._pasarela(partes[1:], query)
+
+        if len(partes) in (2, 3) and partes[1] in paginas.PAISES:
+            pagina = partes[2] if len(partes) == 3 else ""
+            generar = paginas.PAGINAS_MARKET.get(pagina)
+            if generar:
+                return self._responder(generar(paginas.contexto_market(partes[0], partes[1])), tipo_latencia="pagina")
+        self._no_encontrado()
+
+    do_HEAD = do_GET
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        partes = [parte for parte in url.path.split("/") if parte]
+        if len(partes) != 2 or partes[0] != "api":
+            return self._no_encontrado()
+        largo = int(self.headers.get("Content-Length") or 0)
+        if largo:
+            self.rfile.read(largo)
+        self._responder(
+            json.dumps({"ok": True, "accion": partes[1]}),
+            "application/json; charset=utf-8",
+            tipo_latencia="api",
+        )
+
+
+def crear_servidor(host="127.0.0.1", puerto=8765, latencia=None, silencioso=True):
+    """Crea (sin arrancar) el servidor; usar .serve_forever() o iniciar_en_hilo()."""
+    manejador = type(
+        "ManejadorMockConfigurado",
+        (ManejadorMock,),
+        {"latencia": latencia or LatenciaMock(), "silencioso": silencioso},
+    )
+    servidor = ThreadingHTTPServer((host, puerto), manejador)
+    servidor.daemon_threads = True
+    return servidor
+
+
+def iniciar_en_hilo(host="127.0.0.1", puerto=0, latencia=None):
+    """Arranca el servidor en un hilo daemon (puerto 0 = libre). Retorna (servidor, url_base)."""
+    servidor = crear_servidor(host, puerto, latencia=latencia)
+    hilo = threading.Thread(target=servidor.serve_forever, name="mock-sky", daemon=True)
+    hilo.start()
+    host_real, puerto_real = servidor.server_address[:2]
+    return servidor, f"http://{host_real}:{puerto_real}"
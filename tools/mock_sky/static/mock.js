@@ -0,0 +1,561 @@
+// Comportamiento del sitio simulado. Cada página declara body[data-pagina]; las transiciones
+// pasan por /api/<accion> para que la latencia inyectada por el servidor se vea como red real.
+(() => {
+    const M = window.__MOCK__ || {};
+    const T = M.textos || {};
+    const $ = (selector, raiz = document) => raiz.querySelector(selector);
+    const $$ = (selector, raiz = document) => Array.from(raiz.querySelectorAll(selector));
+    const CLAVE = "skyMock";
+
+    const leer = () => {
+        try {
+            return JSON.parse(localStorage.getItem(CLAVE)) || {};
+        } catch (error) {
+            return {};
+        }
+    };
+    const guardar = (datos) => localStorage.setItem(CLAVE, JSON.stringify({ ...leer(), ...datos }));
+    const api = (accion) => fetch(`/api/${accion}`, { method: "POST" }).then((r) => r.json()).catch(() => ({}));
+    const cargando = (activo) => document.body.classList.toggle("cargando", activo);
+    const navegar = async (ruta, accion) => {
+        cargando(true);
+        await api(accion);
+        location.href = ruta;
+    };
+    const normalizar = (texto) =>
+        (texto || "").normalize("NFD").replace(/[\u0300-\u036f]/g, "").toLowerCase().trim();
+    const mostrarError = (selector, mensaje) => {
+        const nodo = $(selector);
+        if (!nodo) return;
+        nodo.textContent = mensaje;
+        nodo.hidden = !mensaje;
+    };
+    const busqueda = () => leer().busqueda || { tipo: "ONE_WAY", adt: 1, chd: 0, inf: 0 };
+    // Fechas locales como YYYY-MM-DD (toISOString correría el día según la zona horaria).
+    const isoLocal = (fecha) =>
+        [fecha.getFullYear(), String(fecha.getMonth() + 1).padStart(2, "0"), String(fecha.getDate()).padStart(2, "0")].join("-");
+    const desdeIsoLocal = (texto) => {
+        const [anio, mes, dia] = texto.split("-").map(Number);
+        return new Date(anio, mes - 1, dia);
+    };
+
+    const MESES = {
+        es: ["enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre"],
+        pt: ["janeiro", "fevereiro", "março", "abril", "maio", "junho", "julho", "agosto", "setembro", "outubro", "novembro", "dezembro"],
+    };
+    const CIUDADES = [
+        "Santiago", "Buenos Aires", "Lima", "Cusco", "Arequipa", "Puerto Montt", "Antofagasta",
+        "Mendoza", "Córdoba", "São Paulo", "Rio de Janeiro", "Florianópolis", "Montevideo", "Punta Cana",
+    ];
+
+    // Desplegables custom (pasajeros y Mercado Pago): click abre, click en opción fija el texto.
+    const activarDesplegables = (raiz = document) => {
+        $$(".desplegable", raiz).forEach((desplegable) => {
+            const lista = $(".opciones-desplegable", desplegable);
+            desplegable.addEventListener("click", (evento) => {
+                const opcion = evento.target.closest("li");
+                if (opcion && lista.contains(opcion)) {
+                    $(".textfield_input", desplegable).textContent = opcion.textContent;
+                    desplegable.dataset.valor = opcion.textContent;
+                    lista.hidden = true;
+                    evento.stopPropagation();
+                    return;
+                }
+                $$(".opciones-desplegable").forEach((otra) => {
+                    if (otra !== lista) otra.hidden = true;
+                });
+                lista.hidden = !lista.hidden;
+            });
+        });
+    };
+
+    // ==========================================
+    // HOME
+    // ==========================================
+
+    const iniciarHome = () => {
+        const seleccion = { origen: null, destino: null, ida: null, vuelta: null, tipo: "ONE_WAY", adt: 1, chd: 0, inf: 0 };
+        const calendario = $(".vc-container");
+        const inputFecha = $(".width-min-calendar input");
+        const labelFecha = $(".width-min-calendar label");
+        const hoy = new Date();
+        hoy.setHours(0, 0, 0, 0);
+        let mesInicio = new Date(hoy.getFullYear(), hoy.getMonth(), 1);
+
+        $$('input[name="tipo"]').forEach((radio) => {
+            radio.addEventListener("change", () => {
+                seleccion.tipo = radio.value;
+                seleccion.vuelta = null;
+                labelFecha.textContent = radio.value === "ROUND_TRIP" ? "Fecha de ida y vuelta" : T.fecha_ida;
+                actualizarFecha();
+            });
+        });
+
+        $$(".ciudad").forEach((contenedor) => {
+            const input = $("input", contenedor);
+            const opciones = $(".opciones", contenedor);
+            const campo = contenedor.id === "origin-id" ? "origen" : "destino";
+            contenedor.addEventListener("click", (evento) => {
+                const opcion = evento.target.closest('[role="option"]');
+                if (opcion) {
+                    input.value = opcion.textContent;
+                    seleccion[campo] = opcion.textContent;
+                    opciones.innerHTML = "";
+                    return;
+                }
+                input.focus();
+            });
+            input.addEventListener("input", () => {
+                seleccion[campo] = null;
+                const texto = normalizar(input.value);
+                if (!texto) {
+                    opciones.innerHTML = "";
+                    return;
+                }
+                const coincidencias = CIUDADES.filter((ciudad) => normalizar(ciudad).includes(texto));
+                const lista = coincidencias.length ? coincidencias : [input.value.trim()];
+                opciones.innerHTML = lista.map((ciudad) => `<div role="option">${ciudad}</div>`).join("");
+            });
+        });
+
+        const formatear = (fecha) => `${fecha.getDate()} de ${MESES[M.idioma][fecha.getMonth()]} de ${fecha.getFullYear()}`;
+        const actualizarFecha = () => {
+            if (!seleccion.ida) {
+                inputFecha.value = "";
+                return;
+            }
+            inputFecha.value = seleccion.vuelta
+                ? `${formatear(seleccion.ida)} - ${formatear(seleccion.vuelta)}`
+                : formatear(seleccion.ida);
+        };
+        const fechaCompleta = () => seleccion.ida && (seleccion.tipo === "ONE_WAY" || seleccion.vuelta);
+
+        const renderCalendario = () => {
+            const panes = [0, 1].map((desplazamiento) => {
+                const mes = new Date(mesInicio.getFullYear(), mesInicio.getMonth() + desplazamiento, 1);
+                const diasMes = new Date(mes.getFullYear(), mes.getMonth() + 1, 0).getDate();
+                const vacios = (mes.getDay() + 6) % 7;
+                let celdas = '<div class="vc-day is-not-in-month"></div>'.repeat(vacios);
+                for (let dia = 1; dia <= diasMes; dia += 1) {
+                    const fecha = new Date(mes.getFullYear(), mes.getMonth(), dia);
+                    const deshabilitado = fecha < hoy;
+                    const clases = ["vc-day-content", deshabilitado ? "vc-disabled" : ""].join(" ").trim();
+                    celdas += `<div class="vc-day"><div class="${clases}" role="button" tabindex="0"
+                        aria-disabled="${deshabilitado}" data-fecha="${isoLocal(fecha)}">${dia}</div></div>`;
+                }
+                const titulo = `${MESES[M.idioma][mes.getMonth()]} ${mes.getFullYear()}`;
+                return `<div class="vc-pane"><button type="button" class="vc-title">${titulo}</button><div class="vc-weeks">${celdas}</div></div>`;
+            });
+            $(".vc-panes", calendario).innerHTML = panes.join("");
+        };
+        const abrirCalendario = () => {
+            renderCalendario();
+            calendario.hidden = false;
+        };
+
+        $(".width-min-calendar").addEventListener("click", abrirCalendario);
+        calendario.addEventListener("click", (evento) => {
+            const flecha = evento.target.closest(".vc-arrow");
+            if (flecha) {
+                const delta = flecha.getAttribute("aria-label") === "Mes siguiente" ? 1 : -1;
+                mesInicio = new Date(mesInicio.getFullYear(), mesInicio.getMonth() + delta, 1);
+                renderCalendario();
+                return;
+            }
+            const dia = evento.target.closest(".vc-day-content");
+            if (!dia || dia.getAttribute("aria-disabled") === "true") return;
+            const fecha = desdeIsoLocal(dia.dataset.fecha);
+            if (seleccion.tipo === "ROUND_TRIP" && seleccion.ida && !seleccion.vuelta && fecha >= seleccion.ida) {
+                seleccion.vuelta = fecha;
+            } else {
+                seleccion.ida = fecha;
+                seleccion.vuelta = null;
+            }
+            actualizarFecha();
+            if (fechaCompleta()) calendario.hidden = true;
+        });
+
+        const modalPax = $(".searchbox-passenger_container");
+        const modalInfante = $(".ant-modal");
+        const resumenPax = () => {
+            const total = seleccion.adt + seleccion.chd + seleccion.inf;
+            $("#resumen-pax").textContent = `${total} ${T.pasajeros}`;
+            $$(".fila-pax").forEach((fila) => {
+                $(".valor", fila).textContent = seleccion[fila.dataset.tipo];
+            });
+        };
+        $("#wrapper-pasajeros").addEventListener("click", () => {
+            calendario.hidden = true;
+            modalPax.hidden = false;
+        });
+        modalPax.addEventListener("click", (evento) => {
+            const boton = evento.target.closest(".sky-select-number_button");
+            if (boton) {
+                const tipo = boton.closest(".fila-pax").dataset.tipo;
+                const delta = Number(boton.dataset.delta);
+                const total = seleccion.adt + seleccion.chd + seleccion.inf;
+                const nuevo = seleccion[tipo] + delta;
+                const minimo = tipo === "adt" ? 1 : 0;
+                if (nuevo < minimo || (delta > 0 && total >= 9) || (tipo === "inf" && nuevo > seleccion.adt)) return;
+                seleccion[tipo] = nuevo;
+                if (tipo === "inf" && delta > 0) modalInfante.hidden = false;
+                resumenPax();
+                return;
+            }
+            if (evento.target.closest(".aplicar")) modalPax.hidden = true;
+        });
+        $(".aceptar-infante").addEventListener("click", () => {
+            modalInfante.hidden = true;
+        });
+
+        document.addEventListener("keydown", (evento) => {
+            if (evento.key !== "Escape") return;
+            calendario.hidden = true;
+            if (modalInfante.hidden) modalPax.hidden = true;
+        });
+
+        $("#flight-box").addEventListener("submit", (evento) => {
+            evento.preventDefault();
+            if (!seleccion.origen || !seleccion.destino || !fechaCompleta()) return;
+            const parametros = new URLSearchParams({
+                origen: seleccion.origen,
+                destino: seleccion.destino,
+                ida: isoLocal(seleccion.ida),
+                tipo: seleccion.tipo,
+                adt: seleccion.adt,
+                chd: seleccion.chd,
+                inf: seleccion.inf,
+            });
+            if (seleccion.vuelta) parametros.set("vuelta", isoLocal(seleccion.vuelta));
+            navegar(`${M.base}/resultados?${parametros}`, "buscar");
+        });
+    };
+
+    // ==========================================
+    // RESULTADOS
+    // ==========================================
+
+    const iniciarResultados = () => {
+        const parametros = new URLSearchParams(location.search);
+        const datos = {
+            origen: parametros.get("origen") || "Origen",
+            destino: parametros.get("destino") || "Destino",
+            ida: parametros.get("ida"),
+            vuelta: parametros.get("vuelta"),
+            tipo: parametros.get("tipo") || "ONE_WAY",
+            adt: Number(parametros.get("adt") || 1),
+            chd: Number(parametros.get("chd") || 0),
+            inf: Number(parametros.get("inf") || 0),
+        };
+        guardar({ busqueda: datos });
+        const HORARIOS = [["06:10", "08:25"], ["09:40", "11:55"], ["14:05", "16:20"], ["20:30", "22:45"]];
+        const TARIFAS = [["light", "Light"], ["plus", "Plus"], ["full", "Full"]];
+        let tramo = "IDA";
+
+        const render = () => {
+            const [desde, hacia] = tramo === "IDA" ? [datos.origen, datos.destino] : [datos.destino, datos.origen];
+            $(".titulo-tramo").textContent = `${tramo === "IDA" ? "Vuelo de ida" : "Vuelo de vuelta"}: ${desde} → ${hacia}`;
+            $(".lista-vuelos").innerHTML = HORARIOS.map(
+                ([sale, llega], indice) => `<article class="itinerario" data-indice="${indice}">
+                    <span>${sale} → ${llega}</span>
+                    <button type="button" data-test="is-itinerary-selectFlight-${indice}">Elegir vuelo</button>
+                    <div class="tarifas"></div>
+                </article>`
+            ).join("");
+        };
+
+        $(".lista-vuelos").addEventListener("click", async (evento) => {
+            const botonVuelo = evento.target.closest('[data-test^="is-itinerary-selectFlight"]');
+            if (botonVuelo) {
+                await api("vuelo");
+                $$(".tarifas").forEach((nodo) => {
+                    nodo.innerHTML = "";
+                });
+                $(".tarifas", botonVuelo.closest(".itinerario")).innerHTML = TARIFAS.map(
+                    ([clave, nombre]) => `<div data-test="is-itinerary-selectRate-${clave}"><span>${nombre}</span>
+                        <button type="button">${T.seleccionar}</button></div>`
+                ).join("");
+                return;
+            }
+            const botonTarifa = evento.target.closest('[data-test^="is-itinerary-selectRate"] button');
+            if (!botonTarifa) return;
+            if (datos.tipo === "ROUND_TRIP" && tramo === "IDA") {
+                cargando(true);
+                await api("tarifa");
+                tramo = "VUELTA";
+                render();
+                cargando(false);
+                return;
+            }
+            navegar(`${M.base}/seats`, "tarifa");
+        });
+        render();
+    };
+
+    // ==========================================
+    // ASIENTOS Y SERVICIOS
+    // ==========================================
+
+    const iniciarAsientos = () => {
+        const tramos = busqueda().tipo === "ROUND_TRIP" ? 2 : 1;
+        let tramo = 0;
+        let asiento = null;
+        const modal = $(".modal-sin-asiento");
+
+        const render = () => {
+            asiento = null;
+            $(".titulo-tramo").textContent = `Vuelo ${tramo + 1} de ${tramos}`;
+            let botones = "";
+            for (let fila = 1; fila <= 8; fila += 1) {
+                for (const letra of "ABCDEF") {
+                    const ocupado = (fila * letra.charCodeAt(0)) % 3 === 0;
+                    botones += `<button type="button" class="seat${ocupado ? " ocupado" : ""}" ${ocupado ? "disabled" : ""}>${fila}${letra}</button>`;
+                }
+            }
+            $(".seat-map").innerHTML = botones;
+            $(".continuar-asientos").textContent = tramo < tramos - 1 ? "Continuar al siguiente vuelo" : "Continuar";
+        };
+        const avanzar = async () => {
+            if (tramo < tramos - 1) {
+                cargando(true);
+                await api("asientos");
+                tramo += 1;
+                render();
+                cargando(false);
+                return;
+            }
+            navegar(`${M.base}/additional-services`, "asientos");
+        };
+
+        $(".seat-map").addEventListener("click", (evento) => {
+            const boton = evento.target.closest("button.seat:not([disabled])");
+            if (!boton) return;
+            $$(".seat.seleccionado").forEach((otro) => otro.classList.remove("seleccionado"));
+            boton.classList.add("seleccionado");
+            asiento = boton.textContent;
+        });
+        $(".continuar-asientos").addEventListener("click", () => {
+            if (asiento) avanzar();
+            else modal.hidden = false;
+        });
+        $(".seguir-sin-elegir").addEventListener("click", () => {
+            modal.hidden = true;
+            avanzar();
+        });
+        $(".elegir-ahora").addEventListener("click", () => {
+            modal.hidden = true;
+        });
+        render();
+    };
+
+    const iniciarServicios = () => {
+        const panel = $(".panel-lateral");
+        let servicio = null;
+        let cantidad = 0;
+        $$(".servicio .agregar").forEach((boton) => {
+            boton.addEventListener("click", () => {
+                servicio = boton.closest(".servicio");
+                cantidad = Number(servicio.dataset.cantidad || 0);
+                $(".panel-titulo", panel).textContent = $("h3", servicio).textContent;
+                $(".panel-cantidad", panel).textContent = cantidad;
+                panel.hidden = false;
+            });
+        });
+        $$(".sky-select-number_button", panel).forEach((boton) => {
+            boton.addEventListener("click", () => {
+                cantidad = Math.max(0, Math.min(4, cantidad + Number(boton.dataset.delta)));
+                $(".panel-cantidad", panel).textContent = cantidad;
+            });
+        });
+        $(".finalizar", panel).addEventListener("click", async () => {
+            await api("servicio");
+            servicio.dataset.cantidad = cantidad;
+            $(".cantidad-servicio", servicio).textContent = cantidad ? `x${cantidad}` : "";
+            panel.hidden = true;
+        });
+        $(".continuar-servicios").addEventListener("click", () => navegar(`${M.base}/passenger-detail`, "servicios"));
+    };
+
+    // ==========================================
+    // PASAJEROS
+    // ==========================================
+
+    const iniciarPasajeros = () => {
+        const datos = busqueda();
+        const tipos = [
+            ...Array(datos.adt).fill("Adulto"),
+            ...Array(datos.chd).fill("Niño"),
+            ...Array(datos.inf).fill("Infante"),
+        ];
+        const desplegable = (dataTest, titulo, opciones) => `<div class="desplegable" data-test="${dataTest}">
+            <div class="textfield_input">${titulo}</div>
+            <ul class="opciones-desplegable" hidden>${opciones.map((opcion) => `<li>${opcion}</li>`).join("")}</ul></div>`;
+        const campo = (dataTest, etiqueta) => `<div data-test="${dataTest}"><label>${etiqueta}</label><input></div>`;
+
+        $(".pasajeros").innerHTML = tipos.map((tipo, posicion) => `<article class="card-passenger" data-indice="${posicion + 1}">
+            <div class="form-header"><span class="form-header__titulo">Pasajero ${posicion + 1} (${tipo})</span></div>
+            <div class="card-passenger__passenger-form" hidden>
+                ${campo("is-passengerForm-textFieldName", "Nombre")}
+                ${campo("is-passengerForm-textFieldLastname", "Apellido")}
+                <div data-test="is-passengerForm-textFieldBirthdate"><label>Fecha de nacimiento</label>
+                    <input placeholder="DD"><input placeholder="MM"><input placeholder="AAAA"></div>
+                ${desplegable("is-thirdStep-dropdownGender", "Género", ["Masculino", "Femenino"])}
+                ${desplegable("is-thirdStep-dropdownCountryIssue", "País de emisión", ["Argentina", "Brasil", "Chile", "Perú"])}
+                ${desplegable("is-thirdStep-dropdownDocumentType", "Tipo de documento", ["DNI", "Pasaporte"])}
+                ${campo("is-passengerForm-textFieldDocumentNumber", "Número de documento")}
+                ${campo("is-passengerForm-textFieldEmail", "Email")}
+                ${campo("is-passengerForm-textFieldPrefix", "Prefijo")}
+                ${campo("is-passengerForm-textFieldPhone", "Teléfono")}
+                <p class="error-form" hidden></p>
+                <button type="button" data-test="is-passengerForm-saveButton">Guardar datos</button>
+            </div>
+        </article>`).join("");
+        activarDesplegables($(".pasajeros"));
+
+        const tarjetas = $$(".card-passenger");
+        const abrir = (tarjeta) => {
+            tarjetas.forEach((otra) => {
+                $(".card-passenger__passenger-form", otra).hidden = otra !== tarjeta;
+            });
+        };
+        const completo = () => tarjetas.every((tarjeta) => tarjeta.dataset.guardado === "1");
+
+        tarjetas.forEach((tarjeta) => {
+            const formulario = $(".card-passenger__passenger-form", tarjeta);
+            $(".form-header", tarjeta).addEventListener("click", () => {
+                if (formulario.hidden) abrir(tarjeta);
+                else formulario.hidden = true;
+            });
+            $('[data-test="is-passengerForm-saveButton"]', tarjeta).addEventListener("click", async () => {
+                const obligatorios = [
+                    '[data-test="is-passengerForm-textFieldName"] input',
+                    '[data-test="is-passengerForm-textFieldLastname"] input',
+                    '[data-test="is-passengerForm-textFieldDocumentNumber"] input',
+                ];
+                const vacios = obligatorios.filter((selector) => !$(selector, tarjeta).value.trim());
+                const fechaIncompleta = $$('[data-test="is-passengerForm-textFieldBirthdate"] input', tarjeta).some((input) => !input.value.trim());
+                if (vacios.length || fechaIncompleta) {
+                    const error = $(".error-form", tarjeta);
+                    error.textContent = "Completa los campos obligatorios.";
+                    error.hidden = false;
+                    return;
+                }
+                $(".error-form", tarjeta).hidden = true;
+                await api("pasajero");
+                tarjeta.dataset.guardado = "1";
+                const header = $(".form-header", tarjeta);
+                if (!$(".form-header__success", header)) header.insertAdjacentHTML("beforeend", '<span class="form-header__success">✔</span>');
+                formulario.hidden = true;
+                const siguiente = tarjetas.find((otra) => otra.dataset.guardado !== "1");
+                if (siguiente) abrir(siguiente);
+                $(".footer-shopping-cart__primary-button").hidden = !completo();
+            });
+        });
+        $(".footer-shopping-cart__primary-button").addEventListener("click", () => {
+            if (completo()) navegar(`${M.base}/checkout`, "pasajeros");
+        });
+        if (tarjetas.length) abrir(tarjetas[0]);
+    };
+
+    // ==========================================
+    // CHECKOUT Y PASARELAS
+    // ==========================================
+
+    const valorIframe = (nombre, selector) => {
+        try {
+            const documento = document.querySelector(`iframe[name="${nombre}"]`).contentDocument;
+            return (documento.querySelector(selector).value || "").replace(/\s+/g, "");
+        } catch (error) {
+            return "";
+        }
+    };
+    const validarPago = () => {
+        switch (M.medio) {
+            case "Niubiz":
+                return valorIframe("niubiz", '[name="tarjeta"]').length >= 13 && valorIframe("niubiz", '[name="cvv"]').length >= 3;
+            case "Mercado Pago":
+                return valorIframe("cardNumber", "input:not(.hide)").length >= 13
+                    && $('[data-test="IS-mercadoPagoForm-inputDocNumber"] input').value.trim() !== "";
+            case "Cielo":
+                return valorIframe("cielo", '[name="tarjeta"]').length >= 13;
+            default:
+                return true;
+        }
+    };
+
+    const iniciarCheckout = () => {
+        const formularios = {
+            Niubiz: ".form-niubiz",
+            Webpay: ".form-webpay",
+            "Mercado Pago": ".form-mercadopago",
+            Cielo: ".form-cielo",
+        };
+        let medioElegido = false;
+        let aceptado = false;
+        activarDesplegables($(".checkout"));
+        $(".medio").addEventListener("click", () => {
+            medioElegido = true;
+            $('input[type="radio"]', $(".medio")).checked = true;
+            $(".formulario-medio").hidden = false;
+            $(formularios[M.medio]).hidden = false;
+        });
+        $(".terminos").addEventListener("click", () => {
+            aceptado = !aceptado;
+            $(".terminos").classList.toggle("marcado", aceptado);
+        });
+        $(".pagar").addEventListener("click", () => {
+            if (!medioElegido) return mostrarError(".error-pago", "Selecciona un medio de pago.");
+            if (!aceptado) return mostrarError(".error-pago", "Debes aceptar los términos y condiciones.");
+            if (!validarPago()) return mostrarError(".error-pago", "Revisa los datos de la tarjeta.");
+            mostrarError(".error-pago", "");
+            const retorno = encodeURIComponent(`${M.base}/confirmacion`);
+            if (M.medio === "Webpay") return navegar(`/gateway/webpay?retorno=${retorno}`, "pago");
+            if (M.medio === "Cielo") return navegar(`/gateway/cielo/3ds?retorno=${retorno}`, "pago");
+            return navegar(`${M.base}/confirmacion`, "pago");
+        });
+    };
+
+    const retorno = () => (M.retorno && M.retorno.startsWith("/") ? M.retorno : "/");
+
+    const iniciarWebpay = () => {
+        $("#credito").addEventListener("click", () => {
+            $(".webpay-tarjeta").hidden = false;
+        });
+        $("#debito").addEventListener("click", () => {
+            $(".webpay-tarjeta").hidden = false;
+        });
+        $(".pagar-webpay").addEventListener("click", () => {
+            if ($("#card-number").value.replace(/\s+/g, "").length < 13) return;
+            navegar(`/gateway/webpay/authenticator?retorno=${encodeURIComponent(retorno())}`, "webpay");
+        });
+    };
+
+    const alEnviar = (selector, accion) => {
+        $(selector).addEventListener("submit", (evento) => {
+            evento.preventDefault();
+            accion();
+        });
+    };
+
+    const PAGINAS = {
+        home: iniciarHome,
+        resultados: iniciarResultados,
+        seats: iniciarAsientos,
+        "additional-services": iniciarServicios,
+        "passenger-detail": iniciarPasajeros,
+        checkout: iniciarCheckout,
+        confirmacion: () => {
+            $(".codigo-reserva").textContent = Math.random().toString(36).slice(2, 8).toUpperCase();
+        },
+        webpay: iniciarWebpay,
+        "webpay-auth": () => alEnviar(".webpay-auth", () => {
+            if (!$("#rutClient").value.trim() || !$("#passwordClient").value.trim()) return;
+            navegar(`/gateway/webpay/confirmar?retorno=${encodeURIComponent(retorno())}`, "webpay");
+        }),
+        "webpay-confirmar": () => alEnviar(".webpay-confirmar", () => navegar(retorno(), "webpay")),
+        "cielo-3ds": () => alEnviar(".cielo-3ds", () => navegar(retorno(), "cielo")),
+    };
+
+    const iniciar = PAGINAS[document.body.dataset.pagina];
+    if (iniciar) iniciar();
+})();